@@ -43,6 +43,8 @@ class CMFBTreeFolder(BTreeFolder2Base, PortalFolderBase):
 
     security = ClassSecurityInfo()
 
+    _catalog_listing_sorted = True
+
     def __init__(self, id, title=''):
         PortalFolderBase.__init__(self, id, title)
         BTreeFolder2Base.__init__(self, id)
@@ -13,8 +13,14 @@
 """Caching tool implementation.
 """
 
+import time as _time
+from _thread import allocate_lock
+from collections import OrderedDict
+
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
+from Acquisition import aq_base
+from Acquisition import aq_parent
 from App.special_dtml import DTMLFile
 from DateTime.DateTime import DateTime
 from OFS.Cache import ZCM_MANAGERS
@@ -27,6 +33,7 @@ from Persistence import PersistentMapping
 from Products.PageTemplates.Expressions import SecureModuleImporter
 from Products.PageTemplates.Expressions import getEngine
 from zope.component import getUtility
+from zope.component import queryUtility
 from zope.datetime import rfc1123_date
 from zope.interface import implementer
 from zope.lifecycleevent.interfaces import IObjectMovedEvent
@@ -49,6 +56,30 @@ from .utils import registerToolInterface
 VIEW_METATYPES = ('Page Template', 'DTML Method', 'DTML Document',
                   'Filesystem DTML Method', 'Filesystem Page Template')
 
+# Upper bound for the number of (view, portal_type, meta_type) keys whose
+# candidate policies are remembered by a policy index.
+MAX_INDEXED_KEYS = 1000
+
+# Upper bound for the number of rendered results kept by a CPMCache.
+MAX_CACHE_ENTRIES = 1000
+
+# Name of the request attribute holding policy evaluations.
+EVALUATIONS = '__CPM_EVALUATIONS__'
+
+caches = {}
+
+
+def _normalizeFilter(value):
+    """ Turn a pre-filter specification into a tuple of strings.
+
+    o Strings are split on newlines and commas, sequences are taken as is.
+    """
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.replace(',', '\n').splitlines()
+    return tuple([x.strip() for x in value if x and x.strip()])
+
 
 def createCPContext(content, view_method, keywords, time=None):
     """
@@ -79,41 +110,213 @@ def createCPContext(content, view_method, keywords, time=None):
     return getEngine().getContext(data)
 
 
+def _getPath(ob):
+    getPhysicalPath = getattr(ob, 'getPhysicalPath', None)
+    if getPhysicalPath is None:
+        return ()
+    return getPhysicalPath()
+
+
+def _sharedMaxAge(policy):
+    """ Return for how many seconds a shared cache may keep the output.
+    """
+    if policy.getNoCache() or policy.getNoStore() or policy.getPrivate():
+        return 0
+    max_age = policy.getSMaxAgeSecs()
+    if max_age is None:
+        max_age = policy.getMaxAgeSecs()
+    return max_age or 0
+
+
 class CPMCache(Cache):
-    """ Simple OFS.Cache-implementation
+    """ OFS.Cache implementation storing rendered output in RAM
+
+    Output is only stored if the manager enables it (see
+    'CachingPolicyManager._ram_cache'), and only for anonymous GET requests
+    which are matched by a caching policy allowing shared caching
+    ('max_age_secs' or 's_max_age_secs' set, no 'no_cache', 'no_store' or
+    'private' token).
+    Entries expire after the policy's max age, when the object or its
+    content is modified or when the object is invalidated.
+
+    Objects of this class are neither persistent nor acquisition-aware,
+    they live in the module level 'caches' mapping.
     """
     security = ClassSecurityInfo()
 
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # (base key, vary values) -> (data, expires, mtime, content type)
+        self._entries = OrderedDict()
+        # base key -> [names of varying request headers, number of entries]
+        self._vary = {}
+        self._lock = allocate_lock()
+
+    @security.private
+    def clear(self):
+        """ Remove all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._vary.clear()
+
+    @security.private
+    def countEntries(self):
+        """ Return the number of stored entries.
+        """
+        return len(self._entries)
+
+    def _getBaseKey(self, ob, view_name, keywords):
+        """ Key data independent of the policy, or None if not cacheable.
+        """
+        manager = queryUtility(ICachingPolicyManager)
+        if manager is None or not manager._ram_cache:
+            return None
+        request = getattr(ob, 'REQUEST', None)
+        if request is None or not hasattr(request, 'getHeader'):
+            return None
+        if request.get('REQUEST_METHOD', 'GET') not in ('GET', 'HEAD'):
+            return None
+
+        mtool = queryUtility(IMembershipTool)
+        if mtool is None or not mtool.isAnonymousUser():
+            return None
+
+        if keywords:
+            local_index = sorted([(str(k), str(v))
+                                  for k, v in keywords.items()])
+        else:
+            local_index = ()
+        return (_getPath(ob), _getPath(aq_parent(ob)), str(view_name),
+                tuple(local_index), request.get('QUERY_STRING', ''))
+
+    def _getVaryValues(self, ob, names):
+        request = ob.REQUEST
+        return tuple([request.getHeader(name, '') for name in names])
+
+    def _getModTime(self, ob, mtime_func):
+        mtime = ob.ZCacheable_getModTime(mtime_func)
+        content = aq_base(aq_parent(ob))
+        return max(getattr(content, '_p_mtime', 0) or 0, mtime)
+
     @security.private
     def ZCache_invalidate(self, ob):
         """ An object is forced out of the cache
 
-        This implementation stores nothing and does not attempt to
-        communicate with cache servers, so this is a no-op.
+        Entries for the object and entries rendered for it as content
+        are removed.  This implementation does not attempt to communicate
+        with cache servers.
         """
-        pass
+        path = _getPath(ob)
+        with self._lock:
+            for key in list(self._entries):
+                if path in key[0][:2]:
+                    self._removeEntry(key)
+
+    def _removeEntry(self, key):
+        # Remove an entry, and the vary record of its base key with the
+        # last entry for it.  Must be called with the lock held.
+        del self._entries[key]
+        vary = self._vary.get(key[0])
+        if vary is not None:
+            vary[1] -= 1
+            if vary[1] <= 0:
+                del self._vary[key[0]]
 
     @security.private
     def ZCache_get(self, ob, view_name, keywords, mtime_func, default):
         """ An object is retrieved from the cache
-
-        This implementation stores nothing - a no-op.
         """
-        pass
+        base_key = self._getBaseKey(ob, view_name, keywords)
+        if base_key is None:
+            return default
+        vary = self._vary.get(base_key)
+        if vary is None:
+            with self._lock:
+                self.misses += 1
+            return default
+
+        key = (base_key, self._getVaryValues(ob, vary[0]))
+        mtime = self._getModTime(ob, mtime_func)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                data, expires, stored_mtime, content_type = entry
+                if expires < _time.time() or stored_mtime < mtime:
+                    self._removeEntry(key)
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+
+        response = getattr(ob.REQUEST, 'RESPONSE', None)
+        if content_type and response is not None and \
+                response.getHeader('Content-Type') is None:
+            response.setHeader('Content-Type', content_type)
+        if ob.meta_type not in VIEW_METATYPES:
+            ob = _ViewEmulator().__of__(ob)
+        _setCacheHeaders(ob, extra_context={})
+        return data
 
     @security.private
     def ZCache_set(self, ob, data, view_name, keywords, mtime_func):
         """ An object is pushed into the cache
 
-        Even though this cache implementation does not cache anything per se,
-        this method is used as a suitable hook to activate the real heavy
-        lifting done by the CachePolicyManager.
+        Besides storing cacheable output, this method is used as a
+        suitable hook to activate the real heavy lifting done by the
+        CachePolicyManager.
         """
+        if data is not None:
+            self._store(ob, data, view_name, keywords, mtime_func)
+
         if ob.meta_type not in VIEW_METATYPES:
             ob = _ViewEmulator().__of__(ob)
 
         return _setCacheHeaders(ob, extra_context={})
 
+    def _store(self, ob, data, view_name, keywords, mtime_func):
+        base_key = self._getBaseKey(ob, view_name, keywords)
+        if base_key is None:
+            return
+
+        manager = queryUtility(ICachingPolicyManager)
+        if manager is None:
+            return
+        if ob.meta_type in VIEW_METATYPES:
+            content, view_method = aq_parent(ob), ob.getId()
+        else:
+            content, view_method = ob, ''
+        policy = manager._findPolicy(content, view_method, {})
+        if policy is None:
+            return
+        max_age = _sharedMaxAge(policy)
+        if max_age <= 0:
+            return
+
+        names = tuple([x.strip() for x in policy.getVary().split(',')
+                       if x.strip()])
+        key = (base_key, self._getVaryValues(ob, names))
+        mtime = self._getModTime(ob, mtime_func)
+        response = getattr(ob.REQUEST, 'RESPONSE', None)
+        content_type = None
+        if response is not None:
+            content_type = response.getHeader('Content-Type')
+        with self._lock:
+            if key in self._entries:
+                self._removeEntry(key)
+            vary = self._vary.setdefault(base_key, [names, 0])
+            vary[0] = names
+            vary[1] += 1
+            self._entries[key] = (data, _time.time() + max_age, mtime,
+                                  content_type)
+            while len(self._entries) > self.max_entries:
+                self._removeEntry(next(iter(self._entries)))
+
 
 InitializeClass(CPMCache)
 
@@ -204,6 +407,13 @@ class CachingPolicy:
             here: http://msdn.microsoft.com/workshop/author/perf/perftips.asp
             Unfortunately these are needed to make IE behave correctly.
 
+          - 'view_names', 'portal_types' and 'meta_types' are optional
+            pre-filters.  If one of them is not empty, the policy only
+            applies to requests whose view name, content portal type or
+            content meta type is listed, and the predicate is not even
+            evaluated for other requests.  The caching policy manager
+            indexes these filters to find candidate policies cheaply.
+
     """
 
     def __init__(self,
@@ -224,7 +434,10 @@ class CachingPolicy:
                  enable_304s=0,
                  last_modified=1,
                  pre_check=None,
-                 post_check=None):
+                 post_check=None,
+                 view_names=(),
+                 portal_types=(),
+                 meta_types=()):
         if not predicate:
             predicate = 'python:1'
 
@@ -273,6 +486,10 @@ class CachingPolicy:
         self._last_modified = int(last_modified)
         self._pre_check = pre_check
         self._post_check = post_check
+        self._view_names = _normalizeFilter(view_names)
+        self._portal_types = _normalizeFilter(portal_types)
+        self._meta_types = _normalizeFilter(meta_types)
+        self._cache_control = self._buildCacheControl()
 
     def getPolicyId(self):
         """
@@ -369,6 +586,72 @@ class CachingPolicy:
         """
         return getattr(self, '_post_check', None)
 
+    def getViewNames(self):
+        """
+        """
+        return getattr(self, '_view_names', ())
+
+    def getPortalTypes(self):
+        """
+        """
+        return getattr(self, '_portal_types', ())
+
+    def getMetaTypes(self):
+        """
+        """
+        return getattr(self, '_meta_types', ())
+
+    def _buildCacheControl(self):
+        """ Compute the static value of the Cache-control header.
+        """
+        control = []
+
+        if self.getMaxAgeSecs() is not None:
+            control.append('max-age=%d' % self._max_age_secs)
+
+        if self.getSMaxAgeSecs() is not None:
+            control.append('s-maxage=%d' % self._s_max_age_secs)
+
+        if self.getNoCache():
+            control.append('no-cache')
+
+        if self.getNoStore():
+            control.append('no-store')
+
+        if self.getPublic():
+            control.append('public')
+
+        if self.getPrivate():
+            control.append('private')
+
+        if self.getMustRevalidate():
+            control.append('must-revalidate')
+
+        if self.getProxyRevalidate():
+            control.append('proxy-revalidate')
+
+        if self.getNoTransform():
+            control.append('no-transform')
+
+        pre_check = self.getPreCheck()
+        if pre_check is not None:
+            control.append('pre-check=%d' % pre_check)
+
+        post_check = self.getPostCheck()
+        if post_check is not None:
+            control.append('post-check=%d' % post_check)
+
+        return ', '.join(control)
+
+    def _getCacheControl(self):
+        """ Return the precomputed value of the Cache-control header.
+        """
+        control = getattr(self, '_cache_control', None)
+        if control is None:
+            # Policies created before the value was precomputed
+            control = self._cache_control = self._buildCacheControl()
+        return control
+
     def testPredicate(self, expr_context):
         """ Does this request match our predicate?"""
         return self._predicate(expr_context)
@@ -379,71 +662,157 @@ class CachingPolicy:
             sequence of caching headers as ( key, value ) tuples.
             Otherwise, return an empty sequence.
         """
-        headers = []
-
-        if self.testPredicate(expr_context):
-
-            if self.getLastModified():
-                mtime = self._mtime_func(expr_context)
-                if isinstance(mtime, str):
-                    mtime = DateTime(mtime)
-                if mtime is not None:
-                    mtime_str = rfc1123_date(mtime.timeTime())
-                    headers.append(('Last-modified', mtime_str))
-
-            control = []
-
-            if self.getMaxAgeSecs() is not None:
-                now = expr_context.vars['time']
-                exp_time_str = rfc1123_date(now.timeTime()
-                                            + self._max_age_secs)
-                headers.append(('Expires', exp_time_str))
-                control.append('max-age=%d' % self._max_age_secs)
+        if not self.testPredicate(expr_context):
+            return []
+
+        mtime = etag = None
+        if self.getLastModified():
+            mtime = self._evaluateMTime(expr_context)
+        if self.getETagFunc():
+            etag = self._etag_func(expr_context)
+        return self._buildHeaders(mtime, expr_context.vars['time'], etag)
+
+    def _evaluateMTime(self, expr_context):
+        """ Evaluate 'mtime_func', returning a DateTime or None.
+        """
+        mtime = self._mtime_func(expr_context)
+        if isinstance(mtime, str):
+            mtime = DateTime(mtime)
+        return mtime
 
-            if self.getSMaxAgeSecs() is not None:
-                control.append('s-maxage=%d' % self._s_max_age_secs)
+    def _buildHeaders(self, mtime, now, etag):
+        """ Return the caching headers for already evaluated values.
+        """
+        headers = []
 
-            if self.getNoCache():
-                control.append('no-cache')
-                # The following is for HTTP 1.0 clients
-                headers.append(('Pragma', 'no-cache'))
+        if self.getLastModified() and mtime is not None:
+            mtime_str = rfc1123_date(mtime.timeTime())
+            headers.append(('Last-modified', mtime_str))
 
-            if self.getNoStore():
-                control.append('no-store')
+        if self.getMaxAgeSecs() is not None:
+            exp_time_str = rfc1123_date(now.timeTime() + self._max_age_secs)
+            headers.append(('Expires', exp_time_str))
 
-            if self.getPublic():
-                control.append('public')
+        if self.getNoCache():
+            # The following is for HTTP 1.0 clients
+            headers.append(('Pragma', 'no-cache'))
 
-            if self.getPrivate():
-                control.append('private')
+        control = self._getCacheControl()
+        if control:
+            headers.append(('Cache-control', control))
 
-            if self.getMustRevalidate():
-                control.append('must-revalidate')
+        if self.getVary():
+            headers.append(('Vary', self._vary))
 
-            if self.getProxyRevalidate():
-                control.append('proxy-revalidate')
+        if self.getETagFunc():
+            headers.append(('ETag', etag))
 
-            if self.getNoTransform():
-                control.append('no-transform')
+        return headers
 
-            pre_check = self.getPreCheck()
-            if pre_check is not None:
-                control.append('pre-check=%d' % pre_check)
 
-            post_check = self.getPostCheck()
-            if post_check is not None:
-                control.append('post-check=%d' % post_check)
+class _PolicyEvaluation:
+    """ Lazily evaluated policy data for one content object and view.
 
-            if control:
-                headers.append(('Cache-control', ', '.join(control)))
+    Evaluations are remembered on the request, so that checking a
+    conditional GET and setting the caching headers afterwards share
+    the evaluated predicates.  The expression context, modification times
+    and ETags are computed again after 'refresh', as the content may have
+    changed and time passed in between.
+    """
 
-            if self.getVary():
-                headers.append(('Vary', self._vary))
+    def __init__(self, index, content, view_method, keywords, time=None):
+        self.index = index
+        self.content = aq_base(content)
+        self.keywords = keywords
+        self.policies = index.getCandidates(
+            view_method,
+            getattr(self.content, 'portal_type', None),
+            getattr(self.content, 'meta_type', None))
+        self._args = (content, view_method, keywords, time)
+        self._context = None
+        self._matches = {}
+        self._mtimes = {}
+        self._etags = {}
+
+    def refresh(self):
+        self._context = None
+        self._mtimes = {}
+        self._etags = {}
+
+    def getContext(self):
+        if self._context is None:
+            content, view_method, keywords, time = self._args
+            self._context = createCPContext(content, view_method, keywords,
+                                            time=time)
+        return self._context
+
+    def getTime(self):
+        return self.getContext().vars['time']
+
+    def testPredicate(self, policy):
+        key = id(policy)
+        try:
+            return self._matches[key]
+        except KeyError:
+            result = self._matches[key] = policy.testPredicate(
+                self.getContext())
+            return result
+
+    def getMTime(self, policy):
+        key = id(policy)
+        try:
+            return self._mtimes[key]
+        except KeyError:
+            result = self._mtimes[key] = policy._evaluateMTime(
+                self.getContext())
+            return result
+
+    def getETag(self, policy):
+        key = id(policy)
+        try:
+            return self._etags[key]
+        except KeyError:
+            result = self._etags[key] = policy._etag_func(self.getContext())
+            return result
+
+
+class _PolicyIndex:
+    """ Find the policies which may apply to a request without TALES.
+
+    Candidates are computed from the cheap pre-filters of the policies
+    ('view_names', 'portal_types', 'meta_types') and remembered per
+    (view name, portal type, meta type) key.
+    """
 
-            if self.getETagFunc():
-                headers.append(('ETag', self._etag_func(expr_context)))
+    def __init__(self, policies):
+        self._policies = tuple(policies)
+        self._filters = tuple([(frozenset(p.getViewNames()),
+                                frozenset(p.getPortalTypes()),
+                                frozenset(p.getMetaTypes()))
+                               for p in self._policies])
+        self._candidates = {}
 
-        return headers
+    def getCandidates(self, view_method, portal_type, meta_type):
+        """ Return the policies whose pre-filters accept the request.
+        """
+        key = (view_method, portal_type, meta_type)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            candidates = []
+            for policy, filters in zip(self._policies, self._filters):
+                view_names, portal_types, meta_types = filters
+                if view_names and view_method not in view_names:
+                    continue
+                if portal_types and portal_type not in portal_types:
+                    continue
+                if meta_types and meta_type not in meta_types:
+                    continue
+                candidates.append(policy)
+            candidates = tuple(candidates)
+            if len(self._candidates) >= MAX_INDEXED_KEYS:
+                self._candidates.clear()
+            self._candidates[key] = candidates
+        return candidates
 
 
 @implementer(ICachingPolicyManager)
@@ -457,12 +826,20 @@ class CachingPolicyManager(SimpleItem, CacheManager):
     meta_type = 'CMF Caching Policy Manager'
     zmi_icon = 'fa fa-rocket'
     _isCacheManager = 1  # Dead chicken. Yum.
+    _v_policy_index = None
+    # Store rendered output in RAM, not only set the caching headers.  The
+    # output is shared by all anonymous visitors, keyed only by path, view,
+    # query string and the request headers named in 'vary' of the policy:
+    # only enable it if anonymous output depends on nothing else, e.g. on
+    # cookies.
+    _ram_cache = False
 
     security = ClassSecurityInfo()
 
     def __init__(self):
         self._policy_ids = ()
         self._policies = PersistentMapping()
+        self._v_policy_index = None
 
     #
     #   ZMI
@@ -503,7 +880,10 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                   enable_304s=0,  # boolean (def. 0)
                   last_modified=1,  # boolean (def. 1)
                   pre_check=None,  # integer, default None
-                  post_check=None):  # integer, default None
+                  post_check=None,  # integer, default None
+                  view_names=(),  # sequence of view names (def. ())
+                  portal_types=(),  # sequence of portal types (def. ())
+                  meta_types=()):  # sequence of meta types (def. ())
         """
             Add a caching policy.
         """
@@ -544,7 +924,10 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                         enable_304s,
                         last_modified,
                         pre_check,
-                        post_check)
+                        post_check,
+                        view_names,
+                        portal_types,
+                        meta_types)
         if REQUEST is not None:
             REQUEST['RESPONSE'].redirect(self.absolute_url()
                                          + '/manage_cachingPolicies'
@@ -571,7 +954,10 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                      enable_304s=0,  # boolean (def. 0)
                      last_modified=1,  # boolean (def. 1)
                      pre_check=0,  # integer, default=None
-                     post_check=0):  # integer, default=None
+                     post_check=0,  # integer, default=None
+                     view_names=(),  # sequence of view names (def. ())
+                     portal_types=(),  # sequence of portal types (def. ())
+                     meta_types=()):  # sequence of meta types (def. ())
         """
             Update a caching policy.
         """
@@ -612,7 +998,10 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                            enable_304s,
                            last_modified,
                            pre_check,
-                           post_check)
+                           post_check,
+                           view_names,
+                           portal_types,
+                           meta_types)
         if REQUEST is not None:
             REQUEST['RESPONSE'].redirect(self.absolute_url()
                                          + '/manage_cachingPolicies'
@@ -685,7 +1074,10 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                    enable_304s=0,
                    last_modified=1,
                    pre_check=None,
-                   post_check=None):
+                   post_check=None,
+                   view_names=(),
+                   portal_types=(),
+                   meta_types=()):
         """
             Add a policy to our registry.
         """
@@ -714,10 +1106,14 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                                                   enable_304s,
                                                   last_modified,
                                                   pre_check,
-                                                  post_check)
+                                                  post_check,
+                                                  view_names,
+                                                  portal_types,
+                                                  meta_types)
         idlist = list(self._policy_ids)
         idlist.append(policy_id)
         self._policy_ids = tuple(idlist)
+        self._invalidatePolicyIndex()
 
     @security.private
     def _updatePolicy(self,
@@ -738,7 +1134,10 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                       enable_304s=0,
                       last_modified=1,
                       pre_check=None,
-                      post_check=None):
+                      post_check=None,
+                      view_names=(),
+                      portal_types=(),
+                      meta_types=()):
         """
             Update a policy in our registry.
         """
@@ -762,7 +1161,11 @@ class CachingPolicyManager(SimpleItem, CacheManager):
                                                   enable_304s,
                                                   last_modified,
                                                   pre_check,
-                                                  post_check)
+                                                  post_check,
+                                                  view_names,
+                                                  portal_types,
+                                                  meta_types)
+        self._invalidatePolicyIndex()
 
     @security.private
     def _reorderPolicy(self, policy_id, newIndex):
@@ -778,6 +1181,7 @@ class CachingPolicyManager(SimpleItem, CacheManager):
         idlist = idlist[:ndx] + idlist[ndx + 1:]
         idlist.insert(newIndex, pred)
         self._policy_ids = tuple(idlist)
+        self._invalidatePolicyIndex()
 
     @security.private
     def _removePolicy(self, policy_id):
@@ -792,6 +1196,68 @@ class CachingPolicyManager(SimpleItem, CacheManager):
         ndx = idlist.index(policy_id)
         idlist = idlist[:ndx] + idlist[ndx + 1:]
         self._policy_ids = tuple(idlist)
+        self._invalidatePolicyIndex()
+
+    @security.private
+    def _invalidatePolicyIndex(self):
+        """ Forget the policy index after the policies were changed.
+        """
+        self._v_policy_index = None
+        # Policies live in a separate mapping: mark ourselves as changed,
+        # so other ZODB connections drop their index as well.
+        self._p_changed = True
+
+    @security.private
+    def _findPolicy(self, content, view_method, keywords, time=None):
+        """ Return the first policy matching the request, or None.
+        """
+        evaluation = self._getEvaluation(content, view_method, keywords,
+                                         time)
+        for policy in evaluation.policies:
+            if evaluation.testPredicate(policy):
+                return policy
+        return None
+
+    @security.private
+    def _getPolicyIndex(self):
+        """ Return the index of policy pre-filters.
+        """
+        index = self._v_policy_index
+        if index is None:
+            policies = [policy for _id, policy in self.listPolicies()]
+            index = self._v_policy_index = _PolicyIndex(policies)
+        return index
+
+    @security.private
+    def _getEvaluation(self, content, view_method, keywords, time=None):
+        """ Return the policy evaluation for content and view.
+
+        Without an explicit time, the predicates evaluated are memoized on
+        the request per (content, view_method) as long as the keywords and
+        policies do not change.
+        """
+        index = self._getPolicyIndex()
+        request = getattr(content, 'REQUEST', None)
+        if time is not None or request is None or isinstance(request, dict):
+            return _PolicyEvaluation(index, content, view_method, keywords,
+                                     time)
+
+        evaluations = getattr(request, EVALUATIONS, None)
+        if evaluations is None:
+            evaluations = {}
+            setattr(request, EVALUATIONS, evaluations)
+
+        key = (id(aq_base(self)), id(aq_base(content)), view_method)
+        evaluation = evaluations.get(key)
+        if evaluation is None or evaluation.index is not index or \
+                evaluation.content is not aq_base(content) or \
+                evaluation.keywords != keywords:
+            evaluation = _PolicyEvaluation(index, content, view_method,
+                                           keywords)
+            evaluations[key] = evaluation
+        else:
+            evaluation.refresh()
+        return evaluation
 
     #
     #   'portal_caching' interface methods
@@ -802,12 +1268,17 @@ class CachingPolicyManager(SimpleItem, CacheManager):
             Return a list of HTTP caching headers based on 'content',
             'view_method', and 'keywords'.
         """
-        context = createCPContext(content, view_method, keywords, time=time)
-        for _policy_id, policy in self.listPolicies():
-
-            headers = policy.getHeaders(context)
-            if headers:
-                return headers
+        evaluation = self._getEvaluation(content, view_method, keywords,
+                                         time)
+        for policy in evaluation.policies:
+            if evaluation.testPredicate(policy):
+                mtime = etag = None
+                if policy.getLastModified():
+                    mtime = evaluation.getMTime(policy)
+                if policy.getETagFunc():
+                    etag = evaluation.getETag(policy)
+                return policy._buildHeaders(mtime, evaluation.getTime(),
+                                            etag)
 
         return ()
 
@@ -818,17 +1289,16 @@ class CachingPolicyManager(SimpleItem, CacheManager):
             set_last_modified_header), where modification_time is a DateTime,
             or None.
         """
-        context = createCPContext(content, view_method, keywords, time=time)
-        for _policy_id, policy in self.listPolicies():
-            if policy.getEnable304s() and policy.testPredicate(context):
+        evaluation = self._getEvaluation(content, view_method, keywords,
+                                         time)
+        for policy in evaluation.policies:
+            if policy.getEnable304s() and evaluation.testPredicate(policy):
 
-                last_modified = policy._mtime_func(context)
-                if isinstance(last_modified, str):
-                    last_modified = DateTime(last_modified)
+                last_modified = evaluation.getMTime(policy)
 
                 content_etag = None
                 if policy.getETagFunc():
-                    content_etag = policy._etag_func(context)
+                    content_etag = evaluation.getETag(policy)
 
                 return (last_modified, content_etag, policy.getLastModified())
 
@@ -841,13 +1311,11 @@ class CachingPolicyManager(SimpleItem, CacheManager):
     def ZCacheManager_getCache(self):
         """ Retrieve a cache object
         """
-        cache = getattr(self, '_cache', None)
-
-        if cache is None:
-            self._cache = CPMCache()
-            cache = self._cache
-
-        return cache
+        cache_id = '/'.join(self.getPhysicalPath())
+        try:
+            return caches[cache_id]
+        except KeyError:
+            return caches.setdefault(cache_id, CPMCache())
 
 
 InitializeClass(CachingPolicyManager)
@@ -38,6 +38,7 @@ from .permissions import AccessContentsInformation as ACI
 from .permissions import ManagePortal
 from .utils import ProductsPath
 from .utils import _dtmldir
+from .utils import _getModTime
 from .utils import getPackageLocation
 from .utils import getPackageName
 
@@ -167,7 +168,10 @@ class DirectoryInformation:
         mtime = 0.0
         filelist = []
         try:
-            mtime = os.stat(self._filepath).st_mtime
+            mtime = _getModTime(self._filepath)
+            if not mtime:
+                # Missing or unreadable, stat again for the error to log.
+                mtime = os.stat(self._filepath).st_mtime
             if not self.use_dir_mtime:
                 # some Windows directories don't change mtime
                 # when a file is added to or deleted from them :-(
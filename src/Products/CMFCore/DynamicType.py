@@ -16,12 +16,14 @@
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from Acquisition import aq_get
+from zope.component import getSiteManager
 from zope.component import getUtility
-from zope.component import queryMultiAdapter
 from zope.component import queryUtility
+from zope.interface import Interface
 from zope.interface import implementer
+from zope.interface import providedBy
 from zope.interface.interfaces import ComponentLookupError
-from zope.publisher.defaultview import queryDefaultViewName
+from zope.publisher.interfaces import IDefaultViewName
 
 from .Expression import getExprContext
 from .interfaces import IDynamicType
@@ -29,6 +31,52 @@ from .interfaces import ITypesTool
 from .interfaces import IURLTool
 
 
+# Maximum number of default views remembered per adapter registry.
+MAX_DEFAULT_VIEWS = 1000
+
+
+def _queryDefaultView(ob, request):
+    """ Return the name of the Zope3-style default view of 'ob', if the
+        corresponding view exists, else None.
+
+    o The view name and factory only depend on the interfaces provided by
+      'ob' and 'request' (its layers), and are cached on the adapter
+      registry until the registry changes.  The view is still created, as
+      its factory may return None.
+    """
+    adapters = getSiteManager().adapters
+    specs = (providedBy(ob), providedBy(request))
+    # Without the generation of the registry, changes can't be noticed.
+    generation = getattr(adapters, '_generation', None)
+    if generation is None:
+        found = _lookupDefaultView(adapters, specs)
+    else:
+        cache = getattr(adapters, '_v_cmf_default_views', None)
+        if cache is None or cache[0] != generation or \
+                len(cache[1]) >= MAX_DEFAULT_VIEWS:
+            cache = adapters._v_cmf_default_views = (generation, {})
+        try:
+            found = cache[1][specs]
+        except KeyError:
+            found = cache[1][specs] = _lookupDefaultView(adapters, specs)
+    if found is None:
+        return None
+    viewname, factory = found
+    if factory(ob, request) is None:
+        return None
+    return viewname
+
+
+def _lookupDefaultView(adapters, specs):
+    # Return the default view name and view factory for 'specs', or None.
+    viewname = adapters.lookup(specs, IDefaultViewName)
+    if viewname:
+        factory = adapters.lookup(specs, Interface, viewname)
+        if factory is not None:
+            return viewname, factory
+    return None
+
+
 @implementer(IDynamicType)
 class DynamicType:
 
@@ -153,15 +201,14 @@ class DynamicType:
         # corresponding view exists, take that in favour of the FTI's
         # default view
         if key == '(Default)':
-            viewname = queryDefaultViewName(self, REQUEST)
-            if viewname and \
-               queryMultiAdapter((self, REQUEST), name=viewname) is not None:
+            viewname = _queryDefaultView(self, REQUEST)
+            if viewname is not None:
                 stack.append(viewname)
                 REQUEST._hacked_path = 1
                 return
 
         ti = self.getTypeInfo()
-        method_id = ti and ti.queryMethodID(key, context=self)
+        method_id = ti is not None and ti.queryMethodID(key, context=self)
         if method_id:
             if key != '(Default)':
                 stack.pop()
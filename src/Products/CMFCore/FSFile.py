@@ -14,7 +14,6 @@
 """
 
 import codecs
-import os
 from warnings import warn
 
 from AccessControl.class_init import InitializeClass
@@ -33,6 +32,7 @@ from .permissions import ViewManagementScreens
 from .utils import _checkConditionalGET
 from .utils import _dtmldir
 from .utils import _FSCacheHeaders
+from .utils import _getModTime
 from .utils import _setCacheHeaders
 from .utils import _ViewEmulator
 
@@ -100,10 +100,7 @@ class FSFile(FSObject):
             file.close()
 
         if reparse or self.content_type == 'unknown/unknown':
-            try:
-                mtime = os.stat(self._filepath).st_mtime
-            except Exception:
-                mtime = 0.0
+            mtime = _getModTime(self._filepath)
             if mtime != self._file_mod_time or mtime == 0.0:
                 self.ZCacheable_invalidate()
                 self._file_mod_time = mtime
@@ -13,7 +13,6 @@
 """ Customizable image objects that come from the filesystem.
 """
 
-import os
 
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
@@ -30,6 +29,7 @@ from .permissions import ViewManagementScreens
 from .utils import _checkConditionalGET
 from .utils import _dtmldir
 from .utils import _FSCacheHeaders
+from .utils import _getModTime
 from .utils import _setCacheHeaders
 from .utils import _ViewEmulator
 
@@ -73,10 +73,7 @@ class FSImage(FSObject):
             file.close()
 
         if reparse or self.content_type == 'unknown/unknown':
-            try:
-                mtime = os.stat(self._filepath).st_mtime
-            except Exception:
-                mtime = 0.0
+            mtime = _getModTime(self._filepath)
             if mtime != self._file_mod_time or mtime == 0.0:
                 self.ZCacheable_invalidate()
                 self._file_mod_time = mtime
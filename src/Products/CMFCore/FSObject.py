@@ -14,6 +14,8 @@
 """
 
 import os
+import tempfile
+from hashlib import sha1
 
 from AccessControl.class_init import InitializeClass
 from AccessControl.Permission import Permission
@@ -36,6 +38,36 @@ from .interfaces import ISkinsTool
 from .permissions import ManagePortal
 from .permissions import View
 from .permissions import ViewManagementScreens
+from .utils import _getModTime
+
+
+# Directory shared by all processes for text cooked from filesystem objects.
+RENDER_CACHE_ENV_KEY = 'CMF_RENDER_CACHE_DIR'
+RENDER_CACHE_DIR = os.environ.get(RENDER_CACHE_ENV_KEY) or None
+
+
+def _readRenderCache(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def _writeRenderCache(path, text):
+    # Write to a temporary file first, so other processes never read a
+    # partially written file.
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with open(fd, 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
 
 
 class FSObject(Implicit, Item, RoleManager, Cacheable):
@@ -71,10 +103,9 @@ class FSObject(Implicit, Item, RoleManager, Cacheable):
         self.__name__ = id  # __name__ is used in traceback reporting
         self._filepath = filepath
 
-        try:
-            self._file_mod_time = os.stat(filepath).st_mtime
-        except Exception:
-            pass
+        mtime = _getModTime(filepath)
+        if mtime:
+            self._file_mod_time = mtime
         self._readFile(0)
 
     @security.protected(ViewManagementScreens)
@@ -163,10 +194,7 @@ class FSObject(Implicit, Item, RoleManager, Cacheable):
     def _updateFromFS(self):
         parsed = self._parsed
         if not parsed or getConfiguration().debug_mode:
-            try:
-                mtime = os.stat(self._filepath).st_mtime
-            except Exception:
-                mtime = 0.0
+            mtime = _getModTime(self._filepath)
             if not parsed or mtime != self._file_mod_time:
                 self._readFile(1)
                 if mtime != self._file_mod_time or mtime == 0.0:
@@ -174,6 +202,33 @@ class FSObject(Implicit, Item, RoleManager, Cacheable):
                     self._file_mod_time = mtime
                 self._parsed = 1
 
+    def _getCooked(self, cook, *options):
+        """Return the text cooked from our raw source by 'cook'.
+
+        The text is kept until the file is read again, which only happens
+        when its modification time changes. If a render cache directory
+        is configured, it is shared with other processes, keyed by the
+        source and the cooking options.
+        """
+        cooked = getattr(self, '_v_cooked', None)
+        if cooked is not None:
+            return cooked
+
+        path = None
+        if RENDER_CACHE_DIR is not None:
+            key = repr((self.meta_type, options, self.raw))
+            path = os.path.join(RENDER_CACHE_DIR,
+                                sha1(key.encode('utf-8')).hexdigest())
+            cooked = _readRenderCache(path)
+
+        if cooked is None:
+            cooked = cook(self.raw)
+            if path is not None:
+                _writeRenderCache(path, cooked)
+
+        self._v_cooked = cooked
+        return cooked
+
     @security.protected(View)
     def get_size(self):
         """Get the size of the underlying file."""
@@ -112,6 +112,7 @@ class FSReSTMethod(FSObject):
         finally:
             file.close()
         self.raw = data
+        self._v_cooked = None
 
         if reparse:
             self.cook()
@@ -133,22 +134,24 @@ class FSReSTMethod(FSObject):
     default_content_type = 'text/html'
 
     def cook(self):
-        if not hasattr(self, '_v_cooked'):
-            settings = {'halt_level': 6,
-                        'report_level': self.report_level,
-                        'input_encoding': self.input_encoding,
-                        'output_encoding': self.output_encoding,
-                        'initial_header_level': 1,
-                        'stylesheet': None,
-                        'stylesheet_path': None,
-                        'pub.settings.warning_stream': Warnings(),
-                        'file_insertion_enabled': 0,
-                        'raw_enabled': 0}
-
-            parts = publish_parts(self.raw, writer=Writer(),
-                                  settings_overrides=settings)
-            self._v_cooked = parts['html_body']
-        return self._v_cooked
+        return self._getCooked(self._cook, self.report_level,
+                               self.input_encoding, self.output_encoding)
+
+    def _cook(self, raw):
+        settings = {'halt_level': 6,
+                    'report_level': self.report_level,
+                    'input_encoding': self.input_encoding,
+                    'output_encoding': self.output_encoding,
+                    'initial_header_level': 1,
+                    'stylesheet': None,
+                    'stylesheet_path': None,
+                    'pub.settings.warning_stream': Warnings(),
+                    'file_insertion_enabled': 0,
+                    'raw_enabled': 0}
+
+        parts = publish_parts(raw, writer=Writer(),
+                              settings_overrides=settings)
+        return parts['html_body']
 
     _default_template = ZopePageTemplate('restmethod_view',
                                          _DEFAULT_TEMPLATE_ZPT, 'text/html')
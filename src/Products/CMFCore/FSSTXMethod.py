@@ -117,6 +117,7 @@ class FSSTXMethod(FSObject):
         finally:
             file.close()
         self.raw = data
+        self._v_cooked = None
 
         if reparse:
             self.cook()
@@ -138,9 +139,10 @@ class FSSTXMethod(FSObject):
     default_content_type = 'text/html'
 
     def cook(self):
-        if not hasattr(self, '_v_cooked'):
-            self._v_cooked = stx2html(self.raw, level=1, header=0)
-        return self._v_cooked
+        return self._getCooked(self._cook)
+
+    def _cook(self, raw):
+        return stx2html(raw, level=1, header=0)
 
     _default_DTML_template = DTML_HTML(_DEFAULT_TEMPLATE_DTML)
     _default_ZPT_template = ZopePageTemplate('stxmethod_view',
@@ -14,10 +14,14 @@
 """
 
 import logging
+from collections import OrderedDict
+from threading import Lock
+from time import time
 
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from Acquisition import ImplicitAcquisitionWrapper
+from Acquisition import aq_base
 from App.config import getConfiguration
 from App.special_dtml import DTMLFile
 
@@ -26,6 +30,7 @@ from Products.ZSQLMethods.SQL import SQL
 from .DirectoryView import registerFileExtension
 from .DirectoryView import registerMetaType
 from .FSObject import FSObject
+from .permissions import ManagePortal
 from .permissions import View
 from .permissions import ViewManagementScreens
 from .utils import _dtmldir
@@ -33,6 +38,75 @@ from .utils import _dtmldir
 
 logger = logging.getLogger('CMFCore.FSZSQLMethod')
 
+# Maximum number of results kept in the shared result cache
+MAX_SHARED_RESULTS = 1000
+
+
+class SharedResultCache:
+
+    """ Process wide cache for the results of filesystem SQL methods.
+
+    Entries are keyed by file path, rendered query, maximum number of rows
+    and connection, expire after the cache time of the method and the
+    least recently used are dropped when the cache is full.
+    """
+
+    def __init__(self, max_size=MAX_SHARED_RESULTS):
+        self.max_size = max_size
+        self._lock = Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._results = OrderedDict()
+            self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                if entry[0] > time():
+                    self._results.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._results[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, result, cache_time):
+        with self._lock:
+            self._results[key] = (time() + cache_time, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, filepath=None, connection=None):
+        """ Drop the results of a file and/or connection, or all results.
+        """
+        with self._lock:
+            for key in list(self._results):
+                if filepath is not None and key[0] != filepath:
+                    continue
+                if connection is not None and key[3] != connection:
+                    continue
+                del self._results[key]
+
+    def getStatistics(self):
+        with self._lock:
+            return {'size': len(self._results),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
+
+
+_shared_results = SharedResultCache()
+
+
+def getSharedResultCache():
+    return _shared_results
+
 
 class FSZSQLMethod(SQL, FSObject):
 
@@ -41,6 +115,9 @@ class FSZSQLMethod(SQL, FSObject):
 
     meta_type = 'Filesystem Z SQL Method'
 
+    # Cache results in the shared result cache instead of the instance
+    shared_cache_ = False
+
     manage_options = (
         {'label': 'Customize', 'action': 'manage_customise'},
         {'label': 'Test', 'action': 'manage_testForm',
@@ -121,6 +198,9 @@ class FSZSQLMethod(SQL, FSObject):
         class_file = parameters.get('class_file', '')
         connection_hook = parameters.get('connection_hook', None)
         direct = parameters.get('allow_simple_one_argument_traversal', None)
+        shared_cache = parameters.get('shared_cache', '')
+        self.shared_cache_ = shared_cache.lower() in ('1', 'true', 'yes',
+                                                      'on')
 
         self.manage_edit(title, connection_id, arguments, template=data)
 
@@ -132,7 +212,32 @@ class FSZSQLMethod(SQL, FSObject):
                              connection_hook=connection_hook,
                              direct=direct)
 
-        # do we need to do anything on reparse?
+        if reparse and self._parsed:
+            # The file changed since it was parsed.
+            _shared_results.invalidate(self._filepath)
+
+    def _cached_result(self, DB__, query, max_rows, conn_id):
+        if not self.shared_cache_:
+            return SQL._cached_result(self, DB__, query, max_rows, conn_id)
+
+        # Connections of the same id in different places are different
+        connection = getattr(self, conn_id, None)
+        if getattr(aq_base(connection), 'getPhysicalPath', None) is not None:
+            connection = '/'.join(connection.getPhysicalPath())
+        else:
+            connection = conn_id
+        key = (self._filepath, query, max_rows, connection)
+        result = _shared_results.get(key)
+        if result is None:
+            result = DB__.query(query, max_rows)
+            _shared_results.set(key, result, self.cache_time_)
+        return result
+
+    @security.protected(ManagePortal)
+    def invalidateSharedCache(self):
+        """ Drop the results of this method from the shared result cache.
+        """
+        _shared_results.invalidate(self._filepath)
 
     if getConfiguration().debug_mode:
         # Provide an opportunity to update the properties.
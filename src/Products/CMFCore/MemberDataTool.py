@@ -13,6 +13,7 @@
 """ Basic member data tool.
 """
 
+import transaction
 from AccessControl.class_init import InitializeClass
 from AccessControl.interfaces import IUser
 from AccessControl.SecurityInfo import ClassSecurityInfo
@@ -21,6 +22,8 @@ from Acquisition import aq_inner
 from Acquisition import aq_parent
 from App.special_dtml import DTMLFile
 from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
+from BTrees.OOBTree import intersection
 from DateTime.DateTime import DateTime
 from OFS.PropertyManager import PropertyManager
 from OFS.SimpleItem import SimpleItem
@@ -29,6 +32,7 @@ from zope.component import adapts
 from zope.component import getMultiAdapter
 from zope.component import getUtility
 from zope.component import queryUtility
+from zope.globalrequest import getRequest
 from zope.interface import implementer
 from ZPublisher.Converters import type_converters
 
@@ -47,6 +51,18 @@ from .utils import registerToolInterface
 
 _marker = []  # Create a new marker object.
 
+# Name of the request attribute holding the member property defaults.
+PROPERTY_DEFAULTS = '__CMF_MEMBER_PROPERTY_DEFAULTS__'
+
+
+def _getDefaultsRequest():
+    """ Return the current request if it can memoize the defaults.
+    """
+    request = getRequest()
+    if request is None or isinstance(request, dict):
+        return None
+    return request
+
 
 @implementer(IMemberDataTool)
 class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
@@ -89,6 +105,9 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
     security.declareProtected(ViewManagementScreens, 'manage_showContents')
     manage_showContents = DTMLFile('memberdataContents', _dtmldir)
 
+    # Mapping of property ID to MemberPropertyIndex, if any are indexed
+    _property_indexes = None
+
     def __init__(self):
         self._members = OOBTree()
 
@@ -101,19 +120,8 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
         Return the number of members stored in the _members
         BTree and some other useful info
         """
-        mtool = getUtility(IMembershipTool)
-        members = self._members
-        user_list = mtool.listMemberIds()
-        member_list = list(members)
-        member_count = len(member_list)
-        orphan_count = 0
-
-        for member in member_list:
-            if member not in user_list:
-                orphan_count = orphan_count + 1
-
-        return [{'member_count': member_count,
-                 'orphan_count': orphan_count}]
+        return [{'member_count': len(self._members),
+                 'orphan_count': len(self._listOrphanIds())}]
 
     @security.private
     def searchMemberData(self, search_param, search_term, attributes=()):
@@ -131,7 +139,11 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
         if search_param == 'username':
             search_param = 'id'
 
-        for user_id in self._members:
+        user_ids = self.searchMemberIds(search_param, search_term)
+        if user_ids is None:
+            user_ids = self._members
+
+        for user_id in user_ids:
             u = mtool.getMemberById(user_id)
 
             if u is not None:
@@ -161,7 +173,11 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
 
         mtool = getUtility(IMembershipTool)
 
-        for member_id in self._members:
+        member_ids = self.searchMemberIds(search_param, search_term)
+        if member_ids is None:
+            member_ids = self._members
+
+        for member_id in member_ids:
 
             user_wrapper = mtool.getMemberById(member_id)
 
@@ -176,16 +192,114 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
         return res
 
     @security.private
-    def pruneMemberDataContents(self):
-        """ Delete data contents of all members not listet in acl_users.
+    def searchMemberIds(self, search_param, search_term, exact=False):
+        """ Return the IDs of the members whose value of the property
+            'search_param' contains or, if 'exact' is true, equals
+            'search_term', or None if the property isn't indexed.
+
+        Only the values stored in the member data are indexed.  Members
+        without a stored value get the tool's default or the value of
+        their user object, like in 'getProperty', which have to be
+        checked one by one unless the default is set and doesn't match.
         """
+        if search_param == 'username':
+            search_param = 'id'
+        index = (self._property_indexes or {}).get(search_param)
+        if index is None or not (search_term or exact):
+            # Empty terms also match the default values.
+            return None
+        member_ids = index.search(search_term, exact)
+        missing_ids = [member_id for member_id in self._members.keys()
+                       if not index.hasValue(member_id)]
+        default = self._getPropertyDefaults().get(search_param)
+        if not missing_ids or \
+                default and not _matches(default, search_term, exact):
+            return member_ids
         mtool = getUtility(IMembershipTool)
-        members = self._members
-        user_list = mtool.listMemberIds()
+        for member_id in missing_ids:
+            member = mtool.getMemberById(member_id)
+            if member is not None and _matches(
+                    member.getProperty(search_param, None), search_term,
+                    exact):
+                member_ids.append(member_id)
+        return sorted(member_ids)
+
+    @security.protected(ManagePortal)
+    def getIndexedProperties(self):
+        """ Return the IDs of the indexed member properties.
+        """
+        return tuple(self._property_indexes or ())
+
+    @security.protected(ManagePortal)
+    def setIndexedProperties(self, ids):
+        """ Index the values of the member properties 'ids' stored in
+            the member data, to search them without loading all members.
+        """
+        old_indexes = self._property_indexes or {}
+        indexes = OOBTree()
+        for id in ids:
+            index = old_indexes.get(id)
+            if index is None:
+                index = MemberPropertyIndex(id)
+                for member_id, m in self._members.items():
+                    index.index(member_id, getattr(m, id, None))
+            indexes[id] = index
+        self._property_indexes = indexes or None
+
+    @security.private
+    def pruneMemberDataContents(self, batch_size=1000, commit=False):
+        """ Delete data contents of all members not listet in acl_users.
 
-        for member_id in list(members):
-            if member_id not in user_list:
+        A savepoint is made every 'batch_size' deletions, or the
+        transaction is committed if 'commit' is true; scripts only.
+        """
+        members = self._members
+        orphan_ids = self._listOrphanIds()
+        batch_size = max(int(batch_size), 1)
+        for batch_start in range(0, len(orphan_ids), batch_size):
+            for member_id in orphan_ids[batch_start:batch_start + batch_size]:
                 del members[member_id]
+                self._unindexMemberData(member_id)
+            if commit:
+                transaction.commit()
+                if self._p_jar is not None:
+                    self._p_jar.cacheGC()
+            else:
+                transaction.savepoint(optimistic=True)
+
+    def _listOrphanIds(self):
+        # IDs of the members not found in the user folder.
+        user_ids = set(getUtility(IMembershipTool).listMemberIds())
+        return [member_id for member_id in self._members.keys()
+                if member_id not in user_ids]
+
+    def _getPropertyDefaults(self):
+        # Mapping of the tool's property IDs to their values, memoized on
+        # the request so member adapters don't look them up one by one.
+        request = _getDefaultsRequest()
+        tool = aq_base(self)
+        if request is not None:
+            memo = getattr(request, PROPERTY_DEFAULTS, None)
+            if memo is not None and memo[0] is tool:
+                return memo[1]
+        defaults = {id: self.getProperty(id) for id in self.propertyIds()}
+        if request is not None:
+            setattr(request, PROPERTY_DEFAULTS, (tool, defaults))
+        return defaults
+
+    def _clearPropertyDefaults(self):
+        request = _getDefaultsRequest()
+        if request is not None and \
+                getattr(request, PROPERTY_DEFAULTS, None) is not None:
+            setattr(request, PROPERTY_DEFAULTS, None)
+
+    def _setPropValue(self, id, value):
+        PropertyManager._setPropValue(self, id, value)
+        self._clearPropertyDefaults()
+
+    def _delProperty(self, id):
+        PropertyManager._delProperty(self, id)
+        self._clearPropertyDefaults()
 
     @security.private
     def wrapUser(self, u):
@@ -200,6 +314,8 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
         """ Add the given member data to the _members btree.
         """
         self._members[id] = aq_base(m)
+        for name, index in (self._property_indexes or {}).items():
+            index.index(id, getattr(aq_base(m), name, None))
 
     @security.private
     def deleteMemberData(self, member_id):
@@ -208,15 +324,104 @@ class MemberDataTool(UniqueObject, SimpleItem, PropertyManager):
         members = self._members
         if member_id in members:
             del members[member_id]
+            self._unindexMemberData(member_id)
             return 1
         else:
             return 0
 
+    def _unindexMemberData(self, member_id):
+        for index in (self._property_indexes or {}).values():
+            index.unindex(member_id)
+
 
 InitializeClass(MemberDataTool)
 registerToolInterface('portal_memberdata', IMemberDataTool)
 
 
+def _trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _matches(value, term, exact):
+    if not isinstance(value, str):
+        return False
+    return value == term if exact else term in value
+
+
+class MemberPropertyIndex(Persistent):
+
+    """ Index of the string values of a member property.
+
+    Values are indexed as a whole for exact matches and by their trigrams
+    for substring matches.
+    """
+
+    def __init__(self, id):
+        self.id = id
+        self._values = OOBTree()  # member ID -> value
+        self._exact = OOBTree()  # value -> member IDs
+        self._trigrams = OOBTree()  # trigram -> member IDs
+
+    def index(self, member_id, value):
+        if not isinstance(value, str):
+            value = None
+        if self._values.get(member_id) == value:
+            return
+        self.unindex(member_id)
+        if value is None:
+            return
+        self._values[member_id] = value
+        self._insert(self._exact, value, member_id)
+        for trigram in _trigrams(value):
+            self._insert(self._trigrams, trigram, member_id)
+
+    def unindex(self, member_id):
+        value = self._values.pop(member_id, None)
+        if value is None:
+            return
+        self._remove(self._exact, value, member_id)
+        for trigram in _trigrams(value):
+            self._remove(self._trigrams, trigram, member_id)
+
+    def hasValue(self, member_id):
+        return member_id in self._values
+
+    def search(self, term, exact=False):
+        """ Return the sorted IDs of the members whose value equals or
+            contains 'term'.
+        """
+        if exact:
+            return list(self._exact.get(term, ()))
+        trigrams = _trigrams(term)
+        if not trigrams:
+            # Too short for the trigrams, check all values.
+            return [member_id for member_id, value in self._values.items()
+                    if term in value]
+        result = None
+        for trigram in trigrams:
+            member_ids = self._trigrams.get(trigram)
+            if member_ids is None:
+                return []
+            result = member_ids if result is None else \
+                intersection(result, member_ids)
+        values = self._values
+        return [member_id for member_id in result
+                if term in values[member_id]]
+
+    def _insert(self, tree, key, member_id):
+        member_ids = tree.get(key)
+        if member_ids is None:
+            member_ids = tree[key] = OOTreeSet()
+        member_ids.insert(member_id)
+
+    def _remove(self, tree, key, member_id):
+        member_ids = tree.get(key)
+        if member_ids is not None and member_id in member_ids:
+            member_ids.remove(member_id)
+            if not member_ids:
+                del tree[key]
+
+
 class MemberData(Persistent):
 
     def __init__(self, id):
@@ -291,13 +496,26 @@ class MemberAdapter:
 
     @security.public
     def getProperty(self, id, default=_marker):
+        return self._getProperty(id, default,
+                                 self._tool._getPropertyDefaults())
+
+    @security.public
+    def getProperties(self, ids=None, default=_marker):
+        """ Return a mapping of the given property IDs to their values.
+        """
+        defaults = self._tool._getPropertyDefaults()
+        if ids is None:
+            ids = defaults.keys()
+        return {id: self._getProperty(id, default, defaults) for id in ids}
+
+    def _getProperty(self, id, default, defaults):
         # First, check the wrapper (w/o acquisition).
         value = getattr(self._md, id, _marker)
         if value is not _marker:
             return value
 
         # Then, check the tool and the user object for a value.
-        tool_value = self._tool.getProperty(id, _marker)
+        tool_value = defaults.get(id, _marker)
         user_value = getattr(self._user, id, _marker)
 
         # If the tool doesn't have the property, use user_value or default
@@ -14,12 +14,15 @@
 """
 
 import logging
+from itertools import islice
 from warnings import warn
 
+import transaction
 from AccessControl.class_init import InitializeClass
 from AccessControl.requestmethod import postonly
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from AccessControl.SecurityManagement import getSecurityManager
+from AccessControl.userfolder import UserFolder
 from AccessControl.users import nobody
 from Acquisition import aq_base
 from Acquisition import aq_inner
@@ -39,6 +42,8 @@ from ZPublisher.BaseRequest import RequestContainer
 
 from .exceptions import AccessControl_Unauthorized
 from .exceptions import BadRequest
+from .indexing import processQueue
+from .interfaces import ICatalogTool
 from .interfaces import ICookieCrumbler
 from .interfaces import IMemberDataTool
 from .interfaces import IMembershipTool
@@ -62,6 +67,27 @@ from .utils import registerToolInterface
 
 logger = logging.getLogger('CMFCore.MembershipTool')
 
+# Name of the request attribute holding the wrapped authenticated member.
+AUTHENTICATED_MEMBER = '__CMF_AUTHENTICATED_MEMBER__'
+
+
+def _getMemberRequest():
+    """ Return the current request if it can memoize the member.
+    """
+    request = getRequest()
+    if request is None or isinstance(request, dict):
+        return None
+    return request
+
+
+def _clearAuthenticatedMember():
+    """ Forget the authenticated member memoized on the current request.
+    """
+    request = _getMemberRequest()
+    if request is not None and \
+            getattr(request, AUTHENTICATED_MEMBER, None) is not None:
+        setattr(request, AUTHENTICATED_MEMBER, None)
+
 
 @implementer(IMembershipTool)
 class MembershipTool(UniqueObject, Folder):
@@ -78,6 +104,11 @@ class MembershipTool(UniqueObject, Folder):
     memberareaCreationFlag = 1
     _HOME_FOLDER_FACTORY_NAME = 'cmf.folder.home.bbb1'
 
+    # Find the local roles to delete recursively with the
+    # allowedRolesAndUsers index instead of visiting all subobjects;
+    # for large sites.
+    _catalog_local_roles = False
+
     security = ClassSecurityInfo()
 
     manage_options = (
@@ -112,6 +143,7 @@ class MembershipTool(UniqueObject, Folder):
                 if failMessage is not None:
                     raise BadRequest(failMessage)
             member.setSecurityProfile(password=password, domains=domains)
+            _clearAuthenticatedMember()
         else:
             raise BadRequest('Not logged in.')
 
@@ -124,7 +156,19 @@ class MembershipTool(UniqueObject, Folder):
         u = getSecurityManager().getUser()
         if u is None:
             u = nobody
-        return self.wrapUser(u)
+        request = _getMemberRequest()
+        if request is None:
+            return self.wrapUser(u)
+
+        # The wrapped member is memoized on the request as long as neither
+        # the user nor the membership tool change.
+        user, tool = aq_base(u), aq_base(self)
+        memo = getattr(request, AUTHENTICATED_MEMBER, None)
+        if memo is not None and memo[0] is user and memo[1] is tool:
+            return memo[2]
+        member = self.wrapUser(u)
+        setattr(request, AUTHENTICATED_MEMBER, (user, tool, member))
+        return member
 
     @security.private
     def wrapUser(self, u, wrap_anon=0):
@@ -273,6 +317,76 @@ class MembershipTool(UniqueObject, Folder):
         if hasattr(aq_base(members), member_id):
             return None
 
+        factory, portal_type_name = self._getHomeFolderFactory()
+        return self._createMemberArea(members, member, factory,
+                                      portal_type_name)
+
+    security.declarePublic('createMemberarea')  # NOQA: flake8: D001
+    createMemberarea = createMemberArea
+
+    @security.private
+    def createMemberAreas(self, member_ids, batch_size=1000, commit=False,
+                          progress=None):
+        """ Create the member areas of the members 'member_ids'.
+
+        o Members which already have a member area are skipped.
+
+        o Every 'batch_size' members the queued indexing operations are
+          processed and a savepoint is made, or the transaction is
+          committed if 'commit' is true; scripts only.
+
+        o 'progress', if passed, is called with the number of processed
+          members and the total after each batch.
+
+        o An error aborts the creation for that member only.
+
+        o Return a list of the IDs of the members whose area was created and
+          a list of (member ID, exception) for the others.
+        """
+        created = []
+        errors = []
+        if not self.getMemberareaCreationFlag():
+            return created, errors
+        members = self.getMembersFolder()
+        if members is None:
+            return created, errors
+
+        factory, portal_type_name = self._getHomeFolderFactory()
+        member_ids = list(member_ids)
+        total = len(member_ids)
+        batch_size = max(int(batch_size), 1)
+        for batch_start in range(0, total, batch_size):
+            batch = member_ids[batch_start:batch_start + batch_size]
+            for member_id in batch:
+                if hasattr(aq_base(members), member_id):
+                    continue
+                savepoint = transaction.savepoint(optimistic=True)
+                try:
+                    member = self.getMemberById(member_id)
+                    if member is None:
+                        raise ValueError('No such member: %s' % member_id)
+                    self._createMemberArea(members, member, factory,
+                                           portal_type_name)
+                except ConflictError:
+                    raise
+                except Exception as exc:
+                    savepoint.rollback()
+                    errors.append((member_id, exc))
+                else:
+                    created.append(member_id)
+            processQueue()
+            if commit:
+                transaction.commit()
+                if self._p_jar is not None:
+                    self._p_jar.cacheGC()
+            else:
+                transaction.savepoint(optimistic=True)
+            if progress is not None:
+                progress(batch_start + len(batch), total)
+        return created, errors
+
+    def _getHomeFolderFactory(self):
+        # Return the home folder factory and portal type name.
         factory_name = self._HOME_FOLDER_FACTORY_NAME
         portal_type_name = 'Folder'
         ttool = queryUtility(ITypesTool)
@@ -281,8 +395,10 @@ class MembershipTool(UniqueObject, Folder):
             if portal_type is not None:
                 factory_name = portal_type.factory
                 portal_type_name = portal_type.getId()
+        return getUtility(IFactory, factory_name), portal_type_name
 
-        factory = getUtility(IFactory, factory_name)
+    def _createMemberArea(self, members, member, factory, portal_type_name):
+        member_id = member.getId()
         obj = factory(id=member_id)
         obj._setPortalTypeName(portal_type_name)
         members._setObject(member_id, obj)
@@ -290,9 +406,6 @@ class MembershipTool(UniqueObject, Folder):
         f.changeOwnership(member)
         return f
 
-    security.declarePublic('createMemberarea')  # NOQA: flake8: D001
-    createMemberarea = createMemberArea
-
     @security.protected(ManageUsers)
     @postonly
     def deleteMemberArea(self, member_id, REQUEST=None):
@@ -347,6 +460,7 @@ class MembershipTool(UniqueObject, Folder):
         Note that this call should *not* cause any change at all to user
         databases.
         """
+        _clearAuthenticatedMember()
         if not self.isAnonymousUser():
             user = getSecurityManager().getUser()
             name = user.getUserName()
@@ -397,19 +511,59 @@ class MembershipTool(UniqueObject, Folder):
         return self.acl_users
 
     @security.protected(ManageUsers)
-    def listMemberIds(self):
-        """Lists the ids of all members.  This may eventually be
-        replaced with a set of methods for querying pieces of the
-        list rather than the entire list at once.
+    def listMemberIds(self, b_start=0, b_size=None, sort_on=None):
+        """Lists the ids of all members, or 'b_size' of them starting at
+        'b_start'.
         """
-        user_folder = self.acl_users
-        return [x.getId() for x in user_folder.getUsers()]
+        return list(self.iterMemberIds(b_start, b_size, sort_on))
 
     @security.protected(ManageUsers)
-    def listMembers(self):
-        """Gets the list of all members.
+    def listMembers(self, b_start=0, b_size=None, sort_on=None):
+        """Gets the list of all members, or 'b_size' of them starting at
+        'b_start'.
         """
-        return list(map(self.wrapUser, self.acl_users.getUsers()))
+        return list(self.iterMembers(b_start, b_size, sort_on))
+
+    @security.protected(ManageUsers)
+    def iterMemberIds(self, start=0, limit=None, sort_on=None):
+        """Iterates over the ids of the members.
+        """
+        return (id for id, user in self._iterUsers(start, limit, sort_on))
+
+    @security.protected(ManageUsers)
+    def iterMembers(self, start=0, limit=None, sort_on=None):
+        """Iterates over the members, wrapping only the users returned.
+        """
+        acl_users = self.acl_users
+        for id, user in self._iterUsers(start, limit, sort_on):
+            if user is None:
+                user = acl_users.getUserById(id)
+                if user is None:
+                    continue
+            yield self.wrapUser(user)
+
+    def _iterUsers(self, start=0, limit=None, sort_on=None):
+        # Iterate over (user ID, user or None) pairs.  User folders which
+        # can list their user IDs don't have to load the users.
+        if sort_on not in (None, 'id'):
+            raise ValueError('Members can only be sorted on id.')
+        acl_users = self.acl_users
+        if isinstance(aq_base(acl_users), UserFolder):
+            # The stock user folder uses the user names as IDs.
+            ids = acl_users.getUserNames()
+            pairs = ((id, None) for id in ids)
+        elif getattr(aq_base(acl_users), 'getUserIds', None) is not None:
+            ids = acl_users.getUserIds()
+            if sort_on is not None:
+                ids = sorted(ids)
+            pairs = ((id, None) for id in ids)
+        else:
+            users = acl_users.getUsers()
+            if sort_on is not None:
+                users = sorted(users, key=lambda user: user.getId())
+            pairs = ((user.getId(), user) for user in users)
+        stop = None if limit is None else start + limit
+        return islice(pairs, start, stop)
 
     @security.protected(ListPortalMembers)
     def searchMembers(self, search_param, search_term):
@@ -466,6 +620,16 @@ class MembershipTool(UniqueObject, Folder):
                     changed = True
                     break
 
+        if recursive and self._catalog_local_roles:
+            # reindexObjectSecurity is always recursive
+            found = self._deleteCatalogLocalRoles(obj, member_ids,
+                                                  reindex and not changed)
+            if found is not None:
+                if reindex and changed \
+                        and hasattr(aq_base(obj), 'reindexObjectSecurity'):
+                    obj.reindexObjectSecurity()
+                return changed or found
+
         if recursive and hasattr(aq_base(obj), 'contentValues'):
             for subobj in obj.contentValues():
                 if self.deleteLocalRoles(subobj, member_ids, 0, 1):
@@ -478,6 +642,57 @@ class MembershipTool(UniqueObject, Folder):
 
         return changed
 
+    def _deleteCatalogLocalRoles(self, obj, member_ids, reindex,
+                                 batch_size=1000):
+        # Delete the local roles of the members below 'obj' from the objects
+        # the catalog finds them on.  Return None if the catalog can't be
+        # used, else whether local roles were deleted.
+        catalog = queryUtility(ICatalogTool)
+        if catalog is None or \
+                'allowedRolesAndUsers' not in catalog.indexes():
+            return None
+        path = '/'.join(obj.getPhysicalPath())
+        brains = catalog.unrestrictedSearchResults(
+            path=path,
+            allowedRolesAndUsers=['user:%s' % id for id in member_ids])
+        # Parents come first, so that their reindexing covers children.
+        brains = sorted((brain for brain in brains
+                         if brain.getPath() != path),
+                        key=lambda brain: brain.getPath())
+        reindexed = set()
+        changed = False
+        fixed = 0
+        for brain in brains:
+            try:
+                ob = brain._unrestrictedGetObject()
+            except (AttributeError, KeyError):
+                # don't fail on catalog inconsistency
+                continue
+            if ob is None or not _checkPermission(ChangeLocalRoles, ob):
+                continue
+            for member_id in member_ids:
+                if ob.get_local_roles_for_userid(userid=member_id):
+                    break
+            else:
+                continue
+            ob.manage_delLocalRoles(userids=member_ids)
+            changed = True
+            fixed += 1
+            if reindex and hasattr(aq_base(ob), 'reindexObjectSecurity'):
+                ob_path = brain.getPath()
+                steps = ob_path.split('/')
+                if not any('/'.join(steps[:i]) in reindexed
+                           for i in range(1, len(steps))):
+                    ob.reindexObjectSecurity()
+                reindexed.add(ob_path)
+            if fixed % batch_size == 0:
+                processQueue()
+                transaction.savepoint(optimistic=True)
+                # The queued reindexing is done, later changes to children
+                # aren't covered by it anymore.
+                reindexed.clear()
+        return changed
+
     @security.private
     def addMember(self, id, password, roles, domains, properties=None):
         """Adds a new member to the user folder.  Security checks will have
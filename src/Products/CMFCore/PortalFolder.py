@@ -15,6 +15,8 @@
 
 import json
 import re
+from itertools import islice
+from operator import itemgetter
 
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
@@ -28,12 +30,14 @@ from zope.component import getUtility
 from zope.component import queryUtility
 from zope.component.factory import Factory
 from zope.interface import implementer
+from ZTUtils.Lazy import LazyMap
 
 from .CMFCatalogAware import OpaqueItemManager
 from .DynamicType import DynamicType
 from .exceptions import AccessControl_Unauthorized
 from .exceptions import BadRequest
 from .exceptions import zExceptions_Unauthorized
+from .interfaces import ICatalogTool
 from .interfaces import IContentTypeRegistry
 from .interfaces import IFolderish
 from .interfaces import IMutableMinimalDublinCore
@@ -51,6 +55,12 @@ from .utils import base64_decode
 from .utils import base64_encode
 
 
+# Catalog indexes matching the criteria of a ContentFilter.
+CATALOG_CRITERIA = {'Creator': 'listCreators', 'Subject': 'Subject',
+                    'Type': 'Type', 'portal_type': 'portal_type',
+                    'created': 'created', 'modified': 'modified'}
+
+
 @implementer(IFolderish, IMutableMinimalDublinCore)
 class PortalFolderBase(DynamicType, OpaqueItemManager, Folder):
 
@@ -61,6 +71,20 @@ class PortalFolderBase(DynamicType, OpaqueItemManager, Folder):
 
     description = ''
 
+    # Answer content listings from the catalog instead of waking up and
+    # filtering all subobjects; for large folders.
+    _catalog_listing = False
+
+    # Set if the subobjects are listed sorted by ID, e.g. for folders
+    # storing them in a BTree, so catalog listings can be sorted without
+    # walking all IDs of the folder.
+    _catalog_listing_sorted = False
+
+    # Answer contentIds for portal type filters from the meta types of the
+    # subobjects, without waking them up; for folders whose subobjects
+    # keep the portal type their meta type implies.
+    _meta_type_listing = False
+
     manage_options = (Folder.manage_options[:1]
                       + ({'label': 'Components',
                           'action': 'manage_components'},)
@@ -137,12 +161,11 @@ class PortalFolderBase(DynamicType, OpaqueItemManager, Folder):
 
         return [t for t in result if t.isConstructionAllowed(self)]
 
-    def _filteredItems(self, ids, filt):
-        """
-            Apply filter, a mapping, to child objects indicated by 'ids',
-            returning a sequence of (id, obj) tuples.
+    def _restrictContentFilter(self, filt):
+        """ Restrict the portal types of filter, a mapping, to the
+            registered content types, returning a copy or None if no
+            types remain.
         """
-        # Restrict allowed content types
         if filt is None:
             filt = {}
         else:
@@ -160,50 +183,254 @@ class PortalFolderBase(DynamicType, OpaqueItemManager, Folder):
         if not pt:
             # After filtering, no types remain, so nothing should be
             # returned.
-            return []
+            return None
         filt['portal_type'] = pt
+        return filt
+
+    def _filteredItems(self, ids, filt, b_start=0, b_size=None):
+        """
+            Apply filter, a mapping, to child objects indicated by 'ids',
+            returning a sequence of (id, obj) tuples.
+
+            Only 'b_size' items starting at 'b_start' are returned, if
+            'b_size' is passed.
+        """
+        b_end = None if b_size is None else b_start + b_size
+        return list(islice(self._iterFilteredItems(ids, filt), b_start,
+                           b_end))
+
+    def _iterFilteredItems(self, ids, filt):
+        """
+            Apply filter, a mapping, to child objects indicated by 'ids',
+            yielding (id, obj) tuples.
+        """
+        filt = self._restrictContentFilter(filt)
+        if filt is None:
+            return
 
         query = ContentFilter(**filt)
-        result = []
-        append = result.append
         get = self._getOb
         for id in ids:
             obj = get(id)
             if query(obj):
-                append((id, obj))
-        return result
+                yield id, obj
+
+    def _metaTypeContentIds(self, filt):
+        """
+            Return the IDs of the child objects matching filter, a mapping,
+            from the meta types recorded by the folder, without loading
+            the objects, or None if the objects have to be checked.
+
+            Only filters on portal_type can be answered, and only if each
+            meta type of the selected types belongs to selected types only.
+        """
+        if filt and [key for key in filt if key != 'portal_type']:
+            return None
+        filt = self._restrictContentFilter(filt)
+        if filt is None:
+            return ()
+        portal_types = set(filt['portal_type'])
+        infos = []
+        for ti in getUtility(ITypesTool).listTypeInfo():
+            if getattr(ti, 'Metatype', None) is None:
+                return None
+            infos.append((ti.getId(), ti.Metatype()))
+        meta_types = set()
+        for portal_type, meta_type in infos:
+            if portal_type in portal_types:
+                if not meta_type:
+                    return None
+                meta_types.add(meta_type)
+        for portal_type, meta_type in infos:
+            if meta_type in meta_types and portal_type not in portal_types:
+                return None
+        if not meta_types:
+            return ()
+        return self.objectIds(sorted(meta_types))
+
+    def _catalogItems(self, filt, b_start=0, b_size=None, restricted=False,
+                      ids=False):
+        """
+            Query the catalog for the child objects matching filter, a
+            mapping, returning a sequence of (id, obj) tuples, or of IDs
+            if 'ids' is True, or None if the catalog can't be used.
+            The order is that of 'objectItems'.
+
+            Criteria without a matching index, and the regular expressions
+            of Title and Description, are applied to the found objects.
+        """
+        catalog = queryUtility(ICatalogTool)
+        if catalog is None:
+            return None
+        indexes = catalog.indexes()
+        if 'path' not in indexes:
+            return None
+        filt = self._restrictContentFilter(filt)
+        if filt is None:
+            return []
+
+        path = '/'.join(self.getPhysicalPath())
+        # Only extended path indexes can restrict the depth.
+        depth = 'depth' in getattr(catalog.Indexes['path'], 'query_options',
+                                   ())
+        if depth:
+            query = {'path': {'query': path, 'depth': 1}}
+        else:
+            query = {'path': path}
+        rest = {}
+        for key, value in filt.items():
+            index = CATALOG_CRITERIA.get(key)
+            if key in ('created', 'modified'):
+                usage = filt.get(key + '_usage', 'range:min')
+                if index in indexes and usage in ('range:min', 'range:max'):
+                    query[index] = {'query': value, 'range': usage[6:]}
+                    continue
+            elif key.endswith('_usage'):
+                continue
+            elif index in indexes:
+                if value:
+                    query[index] = value
+                continue
+            rest[key] = value
+            if key + '_usage' in filt:
+                rest[key + '_usage'] = filt[key + '_usage']
+
+        if restricted:
+            # Only filter on the roles, like 'validate' does later on;
+            # searchResults would drop inactive content as well.
+            if 'allowedRolesAndUsers' not in indexes or \
+                    not hasattr(aq_base(catalog), '_listAllowedRolesAndUsers'):
+                return None
+            user = getSecurityManager().getUser()
+            query['allowedRolesAndUsers'] = \
+                catalog._listAllowedRolesAndUsers(user)
+        brains = catalog.unrestrictedSearchResults(**query)
+        # Drop catalog records of removed objects.
+        found = []
+        for brain in brains:
+            parent, id = brain.getPath().rsplit('/', 1)
+            if (depth or parent == path) and self.hasObject(id):
+                found.append(id)
+        if self._catalog_listing_sorted:
+            found.sort()
+        elif len(found) > 1:
+            # Merge in the order of objectItems.
+            found = set(found)
+            found = [id for id in self.objectIds() if id in found]
+
+        b_end = None if b_size is None else b_start + b_size
+        if not rest:
+            found = found[b_start:b_end]
+            if ids:
+                return found
+            return LazyMap(self._getContentItem, found)
+
+        # Apply the remaining criteria in Python.
+        content_filter = ContentFilter(**rest)
+        result = []
+        for id in found:
+            if len(result) == b_end:
+                break
+            obj = self._getOb(id, None)
+            if obj is not None and content_filter(obj):
+                result.append(ids and id or (id, obj))
+        return result[b_start:b_end]
+
+    def _getContentItem(self, id):
+        return id, self._getOb(id)
+
+    def _contentItems(self, filt, b_start=0, b_size=None, restricted=False):
+        items = None
+        if self._catalog_listing:
+            items = self._catalogItems(filt, b_start, b_size, restricted)
+        if items is None:
+            items = self._filteredItems(self.objectIds(), filt, b_start,
+                                        b_size)
+        return items
+
+    def _contentIds(self, filt):
+        # Content IDs which can be found without loading all objects.
+        if self._catalog_listing:
+            return self._catalogItems(filt, ids=True)
+        if self._meta_type_listing:
+            return self._metaTypeContentIds(filt)
+        return None
+
+    def _iterContentItems(self, filt, start=0, limit=None):
+        if self._catalog_listing:
+            items = self._catalogItems(filt, start, limit)
+            if items is not None:
+                return iter(items)
+        stop = None if limit is None else start + limit
+        return islice(self._iterFilteredItems(self.objectIds(), filt), start,
+                      stop)
 
     #
     #   'IFolderish' interface methods
     #
     @security.public
-    def contentItems(self, filter=None):
+    def contentItems(self, filter=None, b_start=0, b_size=None):
         # List contentish and folderish sub-objects and their IDs.
         # (method is without docstring to disable publishing)
         #
-        ids = self.objectIds()
-        return self._filteredItems(ids, filter)
+        return self._contentItems(filter, b_start, b_size)
 
     @security.public
-    def contentIds(self, filter=None):
+    def contentIds(self, filter=None, b_start=0, b_size=None):
         # List IDs of contentish and folderish sub-objects.
         # (method is without docstring to disable publishing)
         #
-        return [item[0] for item in self.contentItems(filter)]
+        ids = self._contentIds(filter)
+        if ids is not None:
+            b_end = None if b_size is None else b_start + b_size
+            return list(islice(ids, b_start, b_end))
+        return [item[0] for item in self.contentItems(filter, b_start, b_size)]
 
     @security.public
-    def contentValues(self, filter=None):
+    def contentValues(self, filter=None, b_start=0, b_size=None):
         # List contentish and folderish sub-objects.
         # (method is without docstring to disable publishing)
         #
-        return [item[1] for item in self.contentItems(filter)]
+        items = self.contentItems(filter, b_start, b_size)
+        if isinstance(items, LazyMap):
+            return LazyMap(itemgetter(1), items)
+        return [item[1] for item in items]
+
+    @security.public
+    def iterContentItems(self, filter=None, start=0, limit=None):
+        # Iterate over contentish and folderish sub-objects and their IDs.
+        # (method is without docstring to disable publishing)
+        #
+        return self._iterContentItems(filter, start, limit)
+
+    @security.public
+    def iterContentIds(self, filter=None, start=0, limit=None):
+        # Iterate over IDs of contentish and folderish sub-objects.
+        # (method is without docstring to disable publishing)
+        #
+        ids = self._contentIds(filter)
+        if ids is not None:
+            stop = None if limit is None else start + limit
+            return islice(ids, start, stop)
+        return (item[0] for item in self._iterContentItems(filter, start,
+                                                           limit))
+
+    @security.public
+    def iterContentValues(self, filter=None, start=0, limit=None):
+        # Iterate over contentish and folderish sub-objects.
+        # (method is without docstring to disable publishing)
+        #
+        return (item[1] for item in self._iterContentItems(filter, start,
+                                                           limit))
 
     @security.protected(ListFolderContents)
-    def listFolderContents(self, contentFilter=None):
+    def listFolderContents(self, contentFilter=None, b_start=0, b_size=None):
         """ List viewable contentish and folderish sub-objects.
         """
         fc_list = []
-        for id, obj in self.contentItems(contentFilter):
+        items = self._contentItems(contentFilter, b_start, b_size,
+                                   restricted=True)
+        for id, obj in items:
             # validate() can either raise Unauthorized or return 0 to
             # mean unauthorized.
             try:
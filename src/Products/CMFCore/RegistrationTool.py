@@ -16,13 +16,16 @@
 import re
 from random import choice
 
+import transaction
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from App.special_dtml import DTMLFile
 from OFS.SimpleItem import SimpleItem
+from ZODB.POSException import ConflictError
 from zope.component import getUtility
 from zope.interface import implementer
 
+from .indexing import processQueue
 from .interfaces import IMembershipTool
 from .interfaces import IRegistrationTool
 from .permissions import AddPortalMember
@@ -140,6 +143,64 @@ class RegistrationTool(UniqueObject, SimpleItem):
         # role that can always be granted); these conditions should be
         # detected before the fact so that a cleaner message can be printed.
 
+        mtool = getUtility(IMembershipTool)
+        return self._addMember(mtool, id, password, roles, domains,
+                               properties)
+
+    @security.private
+    def addMembers(self, records, batch_size=1000, commit=False,
+                   progress=None):
+        """ Create a member for each mapping of 'records'.
+
+        o The keys of the mappings are the arguments of 'addMember'.
+
+        o Every 'batch_size' records the queued indexing operations are
+          processed and a savepoint is made, or the transaction is
+          committed if 'commit' is true; scripts only.
+
+        o 'progress', if passed, is called with the number of processed
+          records and the total after each batch.
+
+        o An error aborts the creation of that member only.
+
+        o Return a list of the IDs of the created members and a list of
+          (record, exception) for the others.
+        """
+        created = []
+        errors = []
+        mtool = getUtility(IMembershipTool)
+        granted = set()
+        records = list(records)
+        total = len(records)
+        batch_size = max(int(batch_size), 1)
+        for batch_start in range(0, total, batch_size):
+            batch = records[batch_start:batch_start + batch_size]
+            for record in batch:
+                savepoint = transaction.savepoint(optimistic=True)
+                try:
+                    kw = dict(record)
+                    self._addMember(mtool, granted=granted, **kw)
+                except ConflictError:
+                    raise
+                except Exception as exc:
+                    savepoint.rollback()
+                    errors.append((record, exc))
+                else:
+                    created.append(kw['id'])
+            processQueue()
+            if commit:
+                transaction.commit()
+                if self._p_jar is not None:
+                    self._p_jar.cacheGC()
+            else:
+                transaction.savepoint(optimistic=True)
+            if progress is not None:
+                progress(batch_start + len(batch), total)
+        return created, errors
+
+    def _addMember(self, mtool, id, password, roles=('Member',), domains='',
+                   properties=None, granted=None):
+        # 'granted' is a set of the role tuples already checked.
         if not self.isMemberIdAllowed(id):
             raise ValueError(_('The login name you selected is already in '
                                'use or is not valid. Please choose another.'))
@@ -155,9 +216,11 @@ class RegistrationTool(UniqueObject, SimpleItem):
 
         # Limit the granted roles.
         # Anyone is always allowed to grant the 'Member' role.
-        _limitGrantedRoles(roles, self, ('Member',))
+        if granted is None or tuple(roles) not in granted:
+            _limitGrantedRoles(roles, self, ('Member',))
+            if granted is not None:
+                granted.add(tuple(roles))
 
-        mtool = getUtility(IMembershipTool)
         mtool.addMember(id, password, roles, domains, properties)
 
         member = mtool.getMemberById(id)
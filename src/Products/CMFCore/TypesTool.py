@@ -61,6 +61,58 @@ logger = logging.getLogger('CMFCore.TypesTool')
 
 _marker = []  # Create a new marker.
 
+# Name of the request attribute holding construction checks.
+CONSTRUCTION_CHECKS = '__CMF_CONSTRUCTION_CHECKS__'
+
+
+def _getConstructionChecks():
+    """ Return the construction checks memoized on the current request.
+    """
+    request = getRequest()
+    if request is None or isinstance(request, dict):
+        return None
+    checks = getattr(request, CONSTRUCTION_CHECKS, None)
+    if checks is None:
+        checks = {}
+        setattr(request, CONSTRUCTION_CHECKS, checks)
+    return checks
+
+
+def _getSecurityKey():
+    """ Return the objects the result of a permission check depends on.
+
+    o These are the user and the executable on top of the stack, whose
+      owner and proxy roles are taken into account.
+    """
+    sm = getSecurityManager()
+    stack = sm._context.stack
+    return (sm.getUser(), aq_base(stack[-1]) if stack else None)
+
+
+def _getMetaTypePermissions(container):
+    """ Map the meta types addable to 'container' to their permissions.
+
+    o Memoized on the current request per container.
+    """
+    checks = _getConstructionChecks()
+    key = ('meta_types', id(aq_base(container)))
+    if checks is not None:
+        cached = checks.get(key)
+        if cached is not None and cached[0] is aq_base(container):
+            return cached[1]
+
+    meta_types = container.all_meta_types
+    if callable(meta_types):
+        meta_types = meta_types()
+    permissions = {}
+    for d in meta_types:
+        # The first entry for a meta type wins.
+        permissions.setdefault(d['name'], d.get('permission'))
+
+    if checks is not None:
+        checks[key] = (aq_base(container), permissions)
+    return permissions
+
 
 @implementer(IAction)
 class TypeInformation(SimpleItemWithProperties, ActionProviderBase):
@@ -300,7 +352,9 @@ class TypeInformation(SimpleItemWithProperties, ActionProviderBase):
         Builds the instance in 'container', using 'id' as its id.
         Returns the object.
         """
-        if not self.isConstructionAllowed(container):
+        # Don't trust a result memoized before local roles, workflow state
+        # or the container changed in this request.
+        if not self._checkConstructionAllowed(container):
             raise AccessControl_Unauthorized('Cannot create %s' % self.getId())
 
         return self._constructInstance(container, id, *args, **kw)
@@ -343,6 +397,37 @@ class TypeInformation(SimpleItemWithProperties, ActionProviderBase):
             method_id = method_id[0]
         return method_id
 
+    @security.public
+    def isConstructionAllowed(self, container):
+        """ Return True if the current user is allowed to construct an
+            instance of this type in 'container', else False.
+
+        o The result is memoized on the request per type, container, user
+          and executable.
+        """
+        checks = _getConstructionChecks()
+        if checks is None or container is None:
+            return self._checkConstructionAllowed(container)
+
+        refs = (aq_base(self), aq_base(container)) + _getSecurityKey()
+        key = tuple(map(id, refs))
+        cached = checks.get(key)
+        if cached is not None and all(
+                a is b for a, b in zip(cached[0], refs)):
+            return cached[1]
+        allowed = self._checkConstructionAllowed(container)
+        checks[key] = (refs, allowed)
+        return allowed
+
+    @security.private
+    def _checkConstructionAllowed(self, container):
+        """ Check if the current user may construct an instance.
+
+        o Subclasses add the checks of their factories; here, only the
+          workflows can veto the creation.
+        """
+        return self._checkWorkflowAllowed(container)
+
     @security.private
     def _checkWorkflowAllowed(self, container):
         """ Check if a workflow veto object creation
@@ -491,8 +576,8 @@ class FactoryTypeInformation(TypeInformation):
 
         return default
 
-    @security.public
-    def isConstructionAllowed(self, container):
+    @security.private
+    def _checkConstructionAllowed(self, container):
         """
         a. Does the factory method exist?
 
@@ -514,15 +599,11 @@ class FactoryTypeInformation(TypeInformation):
             # newstyle factory
             m = queryUtility(IFactory, self.factory, None)
             if m is not None:
-                meta_types = container.all_meta_types
-                if callable(meta_types):
-                    meta_types = meta_types()
-                for d in meta_types:
-                    if d['name'] == self.content_meta_type:
-                        sm = getSecurityManager()
-                        ti_check = sm.checkPermission(d['permission'],
-                                                      container)
-                        break
+                permission = _getMetaTypePermissions(container).get(
+                    self.content_meta_type)
+                if permission is not None:
+                    sm = getSecurityManager()
+                    ti_check = sm.checkPermission(permission, container)
 
         if not ti_check:
             return False
@@ -596,8 +677,8 @@ class ScriptableTypeInformation(TypeInformation):
     #
     #   Agent methods
     #
-    @security.public
-    def isConstructionAllowed(self, container):
+    @security.private
+    def _checkConstructionAllowed(self, container):
         """
         Does the current user have the permission required in
         order to construct an instance?
@@ -651,6 +732,7 @@ class TypesTool(UniqueObject, IFAwareObjectManager, OrderedFolder,
     id = 'portal_types'
     meta_type = 'CMF Types Tool'
     _product_interfaces = (ITypeInformation,)
+    _v_type_index = None  # (_objects, infos, infos by id, sorted type ids)
 
     security = ClassSecurityInfo()
 
@@ -682,6 +764,14 @@ class TypesTool(UniqueObject, IFAwareObjectManager, OrderedFolder,
                   if mt['name'] in allowedTypes]
         return tuple(all) + tuple(others)
 
+    def _setOb(self, id, object):
+        OrderedFolder._setOb(self, id, object)
+        self._v_type_index = None
+
+    def _delOb(self, id):
+        OrderedFolder._delOb(self, id)
+        self._v_type_index = None
+
     #
     #   other methods
     #
@@ -742,6 +832,10 @@ class TypesTool(UniqueObject, IFAwareObjectManager, OrderedFolder,
                     return None
             else:
                 return None
+        ob = self._getTypeIndex()[2].get(contentType)
+        if ob is not None:
+            return ob.__of__(self)
+        # Not a subobject, but maybe set or acquired as an attribute.
         ob = getattr(self, contentType, None)
         if ITypeInformation.providedBy(ob):
             return ob
@@ -755,14 +849,7 @@ class TypesTool(UniqueObject, IFAwareObjectManager, OrderedFolder,
             TypeInformation interface, one for each content
             type registered in the portal.
         """
-        rval = []
-        for t in self.objectValues():
-            # Filter out things that aren't TypeInformation and
-            # types for which the user does not have adequate permission.
-            if ITypeInformation.providedBy(t):
-                rval.append(t)
-        # Skip items with no ID:  old signal for "not ready"
-        rval = [t for t in rval if t.getId()]
+        rval = [t.__of__(self) for t in self._getTypeIndex()[1]]
         # check we're allowed to access the type object
         if container is not None:
             rval = [t for t in rval if t.isConstructionAllowed(container)]
@@ -776,6 +863,9 @@ class TypesTool(UniqueObject, IFAwareObjectManager, OrderedFolder,
         correspond 1:1 to an underlying meta_type). This argument will be
         removed when CMFCore/dtml/catalogFind.dtml doesn't need it anymore.
         """
+        if container is None and not by_metatype:
+            return list(self._getTypeIndex()[3])
+
         typenames = {}
         for t in self.listTypeInfo(container):
 
@@ -811,6 +901,29 @@ class TypesTool(UniqueObject, IFAwareObjectManager, OrderedFolder,
 
         return ob.getId()
 
+    @security.private
+    def _getTypeIndex(self):
+        """ Return the type information objects, indexed by id.
+
+        o The index is rebuilt whenever the tool's contents have changed,
+          which always replaces its '_objects' tuple.
+        """
+        index = self._v_type_index
+        if index is None or index[0] is not self._objects:
+            infos = []
+            by_id = {}
+            for id, t in self.objectItems():
+                if not ITypeInformation.providedBy(t):
+                    continue
+                by_id[id] = aq_base(t)
+                # Skip items with no ID:  old signal for "not ready"
+                if t.getId():
+                    infos.append(aq_base(t))
+            ids = tuple(sorted({t.getId() for t in infos}))
+            index = (self._objects, tuple(infos), by_id, ids)
+            self._v_type_index = index
+        return index
+
     @security.private
     def listActions(self, info=None, object=None):
         """ List all the actions defined by a provider.
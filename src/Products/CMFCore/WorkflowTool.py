@@ -14,17 +14,22 @@
 """
 
 import sys
+from bisect import bisect_right
 
+import transaction
 from AccessControl.class_init import InitializeClass
 from AccessControl.requestmethod import postonly
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from Acquisition import aq_base
 from Acquisition import aq_inner
 from Acquisition import aq_parent
+from Acquisition.interfaces import IAcquirer
 from App.special_dtml import DTMLFile
 from OFS.Folder import Folder
 from OFS.ObjectManager import IFAwareObjectManager
+from Persistence import Persistent
 from Persistence import PersistentMapping
+from ZODB.POSException import ConflictError
 from zope.component import adapter
 from zope.component import adapts
 from zope.component import getMultiAdapter
@@ -34,7 +39,9 @@ from zope.event import notify
 from zope.interface import implementer
 
 from .ActionProviderBase import ActionProviderBase
+from .interfaces import ICatalogTool
 from .interfaces import IConfigurableWorkflowTool
+from .interfaces import IIndexableWorkflowDefinition
 from .interfaces import ITypesTool
 from .interfaces import IWorkflowAware
 from .interfaces import IWorkflowDefinition
@@ -71,6 +78,8 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
     _chains_by_type = None  # PersistentMapping
     _default_chain = ('default_workflow',)
     _default_cataloging = 1
+    _role_mappings_cursor = None  # (workflow ids, last updated path)
+    _v_workflow_chains = None  # {chain: (workflow definition, ...)}
 
     security = ClassSecurityInfo()
 
@@ -181,14 +190,13 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
 
         for wf_id in chain:
             did[wf_id] = 1
-            wf = self.getWorkflowById(wf_id)
-            if wf is not None:
-                a = wf.listObjectActions(info)
-                if a is not None:
-                    actions.extend(a)
-                a = wf.listGlobalActions(info)
-                if a is not None:
-                    actions.extend(a)
+        for wf in self._getWorkflowsForChain(chain):
+            a = wf.listObjectActions(info)
+            if a is not None:
+                actions.extend(a)
+            a = wf.listGlobalActions(info)
+            if a is not None:
+                actions.extend(a)
 
         wf_ids = self.getWorkflowIds()
         for wf_id in wf_ids:
@@ -220,33 +228,76 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
                 vars.update(v)
         return vars
 
+    @security.private
+    def getCatalogVariableNamesFor(self, ob):
+        """ Get the names of the "workflow-relevant" attributes of 'ob'.
+
+        o Workflows providing 'IIndexableWorkflowDefinition' report them
+          without computing the values.
+        """
+        names = []
+        for wf in self.getWorkflowsFor(ob):
+            if IIndexableWorkflowDefinition.providedBy(wf):
+                v = wf.getCatalogVariableNames()
+            else:
+                v = wf.getCatalogVariablesFor(ob)
+            for name in v or ():
+                if name not in names:
+                    names.append(name)
+        return names
+
     @security.public
     def doActionFor(self, ob, action, wf_id=None, *args, **kw):
         """ Perform the given workflow action on 'ob'.
         """
-        wfs = self.getWorkflowsFor(ob)
-        if wfs is None:
-            wfs = ()
-        if wf_id is None:
-            if not wfs:
-                raise WorkflowException(_('No workflows found.'))
-            found = 0
-            for wf in wfs:
-                if wf.isActionSupported(ob, action, **kw):
-                    found = 1
-                    break
-            if not found:
-                msg = _("No workflow provides the '${action_id}' action.",
-                        mapping={'action_id': action})
-                raise WorkflowException(msg)
-        else:
-            wf = self.getWorkflowById(wf_id)
-            if wf is None:
-                raise WorkflowException(
-                    _('Requested workflow definition not found.'))
+        wfs, wf = self._getWorkflowForAction(ob, action, wf_id, kw)
         return self._invokeWithNotification(
             wfs, ob, action, wf.doActionFor, (ob, action) + args, kw)
 
+    @security.public
+    def doActionForMany(self, objects, action, wf_id=None, *args, **kw):
+        """ Perform the given workflow action on each of 'objects'.
+
+        o Notifications are dispatched per object, as in 'doActionFor'.
+
+        o The workflow variables and the security of the objects are
+          reindexed in one pass after all actions have been performed.
+
+        o An error aborts the action on that object only, its changes are
+          rolled back to a savepoint.  The error is raised instead if the
+          changes can't be rolled back.
+
+        o Return a list of (object, result) for the objects the action was
+          performed on and a list of (object, exception) for the others.
+        """
+        results = []
+        errors = []
+        reindex = []
+        savepoint = None
+        for ob in objects:
+            if savepoint is None:
+                # A savepoint stays valid after a rollback, a new one is
+                # only needed once an action succeeded.
+                savepoint = transaction.savepoint(optimistic=True)
+            try:
+                wfs, wf = self._getWorkflowForAction(ob, action, wf_id, kw)
+                res = self._invokeWithNotification(
+                    wfs, ob, action, wf.doActionFor, (ob, action) + args, kw,
+                    reindex)
+            except ConflictError:
+                raise
+            except Exception as exc:
+                try:
+                    savepoint.rollback()
+                except Exception:
+                    raise exc
+                errors.append((ob, exc))
+            else:
+                results.append((ob, res))
+                savepoint = None
+        self._reindexWorkflowVariablesForMany(reindex)
+        return results, errors
+
     @security.public
     def getInfoFor(self, ob, name, default=_marker, wf_id=None, *args, **kw):
         """ Get the given bit of workflow information for the object.
@@ -439,11 +490,7 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
     def updateRoleMappings(self, REQUEST=None):
         """ Allow workflows to update the role-permission mappings.
         """
-        wfs = {}
-        for id in self.objectIds():
-            wf = self.getWorkflowById(id)
-            if hasattr(aq_base(wf), 'updateRoleMappingsFor'):
-                wfs[id] = wf
+        wfs = self._getRoleMappingWorkflows()
         portal = aq_parent(aq_inner(self))
         count = self._recursiveUpdateRoleMappings(portal, wfs)
         if REQUEST is not None:
@@ -453,6 +500,66 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
         else:
             return count
 
+    @security.private
+    def updateRoleMappingsInBatches(self, wf_ids=None, batch_size=1000,
+                                    commit=False, progress=None):
+        """ Update the role-permission mappings of cataloged content.
+
+        o Only content whose portal type has one of the workflows 'wf_ids'
+          (default: all workflows) in its chain is updated.
+
+        o Every 'batch_size' objects a savepoint is made together with a
+          cursor.  Scripts pass 'commit' to commit the transaction instead;
+          after an interruption, calling this method again with the same
+          'wf_ids' resumes after the last committed batch.
+
+        o 'progress', if passed, is called with the number of processed
+          objects and the total after each batch.
+
+        o Return the number of objects whose mappings changed.
+        """
+        wfs = self._getRoleMappingWorkflows(wf_ids)
+        key = tuple(sorted(wfs))
+        catalog = queryUtility(ICatalogTool)
+        if not wfs or catalog is None:
+            return 0
+
+        pt_names = [ti.getId() for ti in self._listTypeInfo()
+                    if wfs.keys() & set(self.getChainFor(ti.getId()))]
+        if not pt_names:
+            return 0
+        paths = sorted(b.getPath() for b in
+                       catalog.unrestrictedSearchResults(portal_type=pt_names))
+        total = len(paths)
+
+        start = 0
+        cursor = self._role_mappings_cursor
+        if cursor is not None and cursor[0] == key:
+            start = bisect_right(paths, cursor[1])
+
+        count = 0
+        batch_size = max(int(batch_size), 1)
+        for batch_start in range(start, total, batch_size):
+            batch = paths[batch_start:batch_start + batch_size]
+            for path in batch:
+                ob = self.unrestrictedTraverse(path, None)
+                if ob is not None and self._updateRoleMappingsFor(ob, wfs):
+                    count += 1
+            self._role_mappings_cursor = (key, batch[-1])
+            if commit:
+                transaction.commit()
+                if self._p_jar is not None:
+                    self._p_jar.cacheGC()
+            else:
+                transaction.savepoint(optimistic=True)
+            if progress is not None:
+                progress(batch_start + len(batch), total)
+
+        self._role_mappings_cursor = None
+        if commit:
+            transaction.commit()
+        return count
+
     @security.private
     def getWorkflowById(self, wf_id):
         """ Retrieve a given workflow.
@@ -486,12 +593,7 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
     def getWorkflowsFor(self, ob):
         """ Find the workflows for the type of the given object.
         """
-        res = []
-        for wf_id in self.getChainFor(ob):
-            wf = self.getWorkflowById(wf_id)
-            if wf is not None:
-                res.append(wf)
-        return res
+        return list(self._getWorkflowsForChain(self.getChainFor(ob)))
 
     #
     #   Helper methods
@@ -506,14 +608,88 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
         return ()
 
     @security.private
-    def _invokeWithNotification(self, wfs, ob, action, func, args, kw):
+    def _getWorkflowsForChain(self, chain):
+        """ Resolve a chain of workflow ids to the workflow definitions.
+
+        o Resolved chains are cached until the tool's contents change.
+        """
+        if not isinstance(chain, tuple):
+            chain = tuple(chain)
+        cache = self._v_workflow_chains
+        if cache is None:
+            cache = self._v_workflow_chains = {}
+        wfs = cache.get(chain)
+        if wfs is None:
+            wfs = []
+            for wf_id in chain:
+                wf = self.getWorkflowById(wf_id)
+                if wf is not None:
+                    wf = aq_base(wf)
+                    wfs.append((wf, IAcquirer.providedBy(wf)))
+            wfs = cache[chain] = tuple(wfs)
+        # Don't cache wrappers, they would keep the request alive.
+        return tuple(wf.__of__(self) if wrap else wf for wf, wrap in wfs)
+
+    @security.private
+    def _invalidateWorkflowChains(self):
+        """ Forget the resolved workflow chains.
+        """
+        self._v_workflow_chains = None
+
+    def _setOb(self, id, object):
+        Folder._setOb(self, id, object)
+        self._invalidateWorkflowChains()
+
+    def _delOb(self, id):
+        Folder._delOb(self, id)
+        self._invalidateWorkflowChains()
+
+    @security.private
+    def _getWorkflowForAction(self, ob, action, wf_id, kw):
+        """ Find the workflows of 'ob' and the one supplying 'action'.
+        """
+        wfs = self.getWorkflowsFor(ob)
+        if wfs is None:
+            wfs = ()
+        if wf_id is None:
+            if not wfs:
+                raise WorkflowException(_('No workflows found.'))
+            found = 0
+            for wf in wfs:
+                if wf.isActionSupported(ob, action, **kw):
+                    found = 1
+                    break
+            if not found:
+                msg = _("No workflow provides the '${action_id}' action.",
+                        mapping={'action_id': action})
+                raise WorkflowException(msg)
+        else:
+            wf = self.getWorkflowById(wf_id)
+            if wf is None:
+                raise WorkflowException(
+                    _('Requested workflow definition not found.'))
+        return wfs, wf
+
+    @security.private
+    def _invokeWithNotification(self, wfs, ob, action, func, args, kw,
+                                deferred=None):
         """ Private utility method:  call 'func', and deal with exceptions
             indicating that the object has been deleted or moved.
+
+        o If 'deferred' is a list, (ob, security_changed) is appended to it
+          instead of reindexing 'ob'.
+
+        o The security is assumed to have changed, unless all workflows
+          declare that they only change the security settings of 'ob'
+          itself, and these didn't change.
         """
         reindex = 1
         for w in wfs:
             w.notifyBefore(ob, action)
             notify(ActionWillBeInvokedEvent(ob, w, action))
+        settings = None
+        if _changesLocalSecurityOnly(wfs):
+            settings = _getSecuritySettings(ob)
         try:
             res = func(*args, **kw)
         except ObjectDeleted as ex:
@@ -522,6 +698,7 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
         except ObjectMoved as ex:
             res = ex.getResult()
             ob = ex.getNewObject()
+            settings = None
         except Exception:
             exc = sys.exc_info()
             try:
@@ -535,9 +712,51 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
             w.notifySuccess(ob, action, res)
             notify(ActionSucceededEvent(ob, w, action, res))
         if reindex:
-            self._reindexWorkflowVariables(ob)
+            security_changed = settings is None or \
+                settings != _getSecuritySettings(ob)
+            if deferred is not None:
+                deferred.append((ob, security_changed))
+            else:
+                self._reindexWorkflowVariables(ob, security_changed)
         return res
 
+    @security.private
+    def _getRoleMappingWorkflows(self, wf_ids=None):
+        """ Map the ids of workflows which can update role mappings to them.
+        """
+        if isinstance(wf_ids, str):
+            wf_ids = (wf_ids,)
+        wfs = {}
+        for id in self.objectIds():
+            if wf_ids is not None and id not in wf_ids:
+                continue
+            wf = self.getWorkflowById(id)
+            if hasattr(aq_base(wf), 'updateRoleMappingsFor'):
+                wfs[id] = wf
+        return wfs
+
+    @security.private
+    def _updateRoleMappingsFor(self, ob, wfs):
+        """ Update roles-permission mappings of 'ob', and
+            reindex special index.
+        """
+        # Returns True if any mapping changed.
+        changed = False
+        for wf_id in self.getChainFor(ob):
+            wf = wfs.get(wf_id, None)
+            if wf is not None:
+                did = wf.updateRoleMappingsFor(ob)
+                if did:
+                    changed = True
+        if changed and hasattr(aq_base(ob), 'reindexObject'):
+            # Reindex security-related indexes
+            try:
+                ob.reindexObject(idxs=['allowedRolesAndUsers'])
+            except TypeError:
+                # Catch attempts to reindex portal_catalog.
+                pass
+        return changed
+
     @security.private
     def _recursiveUpdateRoleMappings(self, ob, wfs):
         """ Update roles-permission mappings recursively, and
@@ -545,24 +764,8 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
         """
         # Returns a count of updated objects.
         count = 0
-        wf_ids = self.getChainFor(ob)
-        if wf_ids:
-            changed = 0
-            for wf_id in wf_ids:
-                wf = wfs.get(wf_id, None)
-                if wf is not None:
-                    did = wf.updateRoleMappingsFor(ob)
-                    if did:
-                        changed = 1
-            if changed:
-                count = count + 1
-                if hasattr(aq_base(ob), 'reindexObject'):
-                    # Reindex security-related indexes
-                    try:
-                        ob.reindexObject(idxs=['allowedRolesAndUsers'])
-                    except TypeError:
-                        # Catch attempts to reindex portal_catalog.
-                        pass
+        if self._updateRoleMappingsFor(ob, wfs):
+            count = count + 1
         if hasattr(aq_base(ob), 'objectItems'):
             obs = ob.objectItems()
             if obs:
@@ -583,29 +786,86 @@ class WorkflowTool(UniqueObject, IFAwareObjectManager, Folder,
         self._default_cataloging = bool(value)
 
     @security.private
-    def _reindexWorkflowVariables(self, ob):
+    def _reindexWorkflowVariables(self, ob, security_changed=True):
         """ Reindex the variables that the workflow may have changed.
 
-        Also reindexes the security.
+        Also reindexes the security, unless 'security_changed' is false.
         """
         if not self._default_cataloging:
             return
 
         if hasattr(aq_base(ob), 'reindexObject'):
-            # XXX We only need the keys here, no need to compute values.
-            mapping = self.getCatalogVariablesFor(ob) or {}
-            vars = list(mapping)
-            ob.reindexObject(idxs=vars)
+            ob.reindexObject(idxs=self.getCatalogVariableNamesFor(ob))
 
         # Reindex security of subobjects.
-        if hasattr(aq_base(ob), 'reindexObjectSecurity'):
+        if security_changed and hasattr(aq_base(ob), 'reindexObjectSecurity'):
             ob.reindexObjectSecurity()
 
+    @security.private
+    def _reindexWorkflowVariablesForMany(self, items):
+        """ Reindex the workflow variables of many objects.
+
+        o 'items' is a sequence of (ob, security_changed).
+
+        o The security of subobjects of an object whose security is
+          reindexed as well is not reindexed again.
+        """
+        if not self._default_cataloging:
+            return
+
+        secured = {}
+        for ob, security_changed in items:
+            if hasattr(aq_base(ob), 'reindexObject'):
+                ob.reindexObject(idxs=self.getCatalogVariableNamesFor(ob))
+            if security_changed and \
+                    hasattr(aq_base(ob), 'reindexObjectSecurity'):
+                secured[ob.getPhysicalPath()] = ob
+
+        # Sorted paths put containers right before their subobjects.
+        done = None
+        for path in sorted(secured):
+            if done is not None and path[:len(done)] == done:
+                continue
+            secured[path].reindexObjectSecurity()
+            done = path
+
 
 InitializeClass(WorkflowTool)
 registerToolInterface('portal_workflow', IWorkflowTool)
 
 
+def _changesLocalSecurityOnly(wfs):
+    """ Do the workflows 'wfs' declare to only change local security?
+    """
+    if not wfs:
+        return False
+    for wf in wfs:
+        if not IIndexableWorkflowDefinition.providedBy(wf) or \
+                not wf.changesLocalSecurityOnly():
+            return False
+    return True
+
+
+def _getSecuritySettings(ob):
+    """ Return a comparable snapshot of the local security settings of 'ob'.
+
+    o Workflows change security by setting role mappings of permissions and
+      local roles on the object itself; subobjects only acquire them.
+    """
+    ob = aq_base(ob)
+    settings = []
+    for k, v in sorted(getattr(ob, '__dict__', {}).items()):
+        if k.startswith('_') and k.endswith('_Permission'):
+            # A list acquires, a tuple doesn't.
+            settings.append((k, isinstance(v, tuple), tuple(v or ())))
+    local_roles = getattr(ob, '__ac_local_roles__', None) or {}
+    if not callable(local_roles):
+        for k, v in sorted(local_roles.items()):
+            settings.append((k, tuple(v)))
+    settings.append(bool(getattr(ob, '__ac_local_roles_block__', False)))
+    return settings
+
+
 @implementer(IWorkflowStatus)
 class DefaultWorkflowStatus:
     adapts(IWorkflowAware, IWorkflowDefinition)
@@ -625,11 +885,120 @@ class DefaultWorkflowStatus:
         history = getattr(self.context, 'workflow_history', None)
         if history is None:
             history = self.context.workflow_history = PersistentMapping()
-        wfh = list(history.get(self.wf_id, ()))
+        wfh = history.get(self.wf_id, ())
+        if isinstance(wfh, WorkflowHistory):
+            wfh.append(status)
+            return
+        wfh = list(wfh)
         wfh.append(status)
         history[self.wf_id] = tuple(wfh)
 
 
+class BucketedWorkflowStatus(DefaultWorkflowStatus):
+
+    """ Store new workflow history records in a 'WorkflowHistory'.
+
+    o Register it with 'bucketedhistory.zcml' to replace the default status
+      adapter.
+    """
+
+    def set(self, status):
+        history = getattr(self.context, 'workflow_history', None)
+        if history is None:
+            history = self.context.workflow_history = PersistentMapping()
+        wfh = history.get(self.wf_id, ())
+        if not isinstance(wfh, WorkflowHistory):
+            wfh = history[self.wf_id] = WorkflowHistory(wfh)
+        wfh.append(status)
+
+
+class _HistoryBucket(Persistent):
+
+    """ Full bucket of workflow history records, loaded on demand.
+    """
+
+    def __init__(self, records):
+        self.records = tuple(records)
+
+
+class WorkflowHistory(Persistent):
+
+    """ Append-only sequence of workflow history records.
+
+    o The latest records are stored with the history itself, older records
+      in separate buckets of 'bucket_size' records.
+    """
+
+    def __init__(self, records=(), bucket_size=100):
+        self._bucket_size = bucket_size
+        self._buckets = ()
+        self._head = ()
+        self._length = 0
+        for record in records:
+            self.append(record)
+
+    def append(self, record):
+        head = self._head + (record,)
+        size = self._bucket_size
+        if len(head) > size:
+            # Keep the latest record in the head, it is the one read most.
+            self._buckets = self._buckets + (_HistoryBucket(head[:size]),)
+            head = head[size:]
+        self._head = head
+        self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('workflow history index out of range')
+        bucket, index = divmod(index, self._bucket_size)
+        if bucket == len(self._buckets):
+            return self._head[index]
+        return self._buckets[bucket].records[index]
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket.records
+        yield from self._head
+
+    def __reversed__(self):
+        yield from reversed(self._head)
+        for bucket in reversed(self._buckets):
+            yield from reversed(bucket.records)
+
+    def __eq__(self, other):
+        # Compares equal to tuples with the same records, like the tuples
+        # stored by the default status adapter.
+        if isinstance(other, WorkflowHistory):
+            other = tuple(other)
+        elif not isinstance(other, tuple):
+            return NotImplemented
+        return tuple(self) == other
+
+    __hash__ = None
+
+    def index(self, record, *args):
+        return tuple(self).index(record, *args)
+
+    def count(self, record):
+        return tuple(self).count(record)
+
+    def __add__(self, other):
+        return tuple(self) + tuple(other)
+
+    def __radd__(self, other):
+        return tuple(other) + tuple(self)
+
+    def __repr__(self):
+        return '<WorkflowHistory with %d record(s)>' % self._length
+
+
 @implementer(IWorkflowHistory)
 @adapter(IWorkflowAware, IWorkflowDefinition)
 def default_workflow_history(context, workflow):
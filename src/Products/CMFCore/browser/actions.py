@@ -24,6 +24,15 @@ from Products.GenericSetup.interfaces import ISetupTool
 
 from ..ActionInformation import Action
 from ..ActionInformation import ActionCategory
+from ..exportimport.actions import iterActionPaths
+
+
+# Action paths found in profiles:
+# {(setup tool path, profile id, meta type): (modification time, paths)}
+_action_paths = {}
+
+# Maximum number of profiles remembered in '_action_paths'.
+MAX_ACTION_PATHS = 100
 
 
 class ActionAddView(AddWithPresettingsViewBase):
@@ -39,34 +48,40 @@ class ActionAddView(AddWithPresettingsViewBase):
         profiles = []
         stool = queryUtility(ISetupTool)
         if stool:
+            stool_path = stool.getPhysicalPath()
             for info in stool.listContextInfos():
-                obj_ids = []
                 context = stool._getImportContext(info['id'])
-                body = context.readDataFile('actions.xml')
-                if body is None:
+                obj_ids = self._getActionPaths(
+                    context, (stool_path, info['id'], self.klass.meta_type))
+                if obj_ids is None:
                     continue
-                root = parseString(body).documentElement
-                for node in root.childNodes:
-                    if node.nodeName != 'object':
-                        continue
-                    obj_ids += self._extractChildren(node)
                 profiles.append({'id': info['id'],
                                  'title': info['title'],
-                                 'obj_ids': tuple(sorted(obj_ids))})
+                                 'obj_ids': obj_ids})
         return tuple(profiles)
 
-    def _extractChildren(self, node):
-        action_paths = []
-        category_id = node.getAttribute('name')
-        for child in node.childNodes:
-            if child.nodeName != 'object':
-                continue
-            if child.getAttribute('meta_type') == self.klass.meta_type:
-                action_id = child.getAttribute('name')
-                action_paths.append(action_id)
-            else:
-                action_paths += self._extractChildren(child)
-        return [f'{category_id}/{path}' for path in action_paths]
+    def _getActionPaths(self, context, key):
+        """Return the sorted action paths of a profile, or None.
+
+        Results are cached until the profile's actions.xml is modified, if
+        its modification time is known.
+        """
+        mtime = context.getLastModified('actions.xml')
+        cached = _action_paths.get(key)
+        if cached is not None and mtime is not None and cached[0] == mtime:
+            return cached[1]
+
+        body = context.readDataFile('actions.xml')
+        if body is None:
+            obj_ids = None
+        else:
+            obj_ids = tuple(sorted(iterActionPaths(body,
+                                                   self.klass.meta_type)))
+        if mtime is not None:
+            if len(_action_paths) >= MAX_ACTION_PATHS:
+                _action_paths.clear()
+            _action_paths[key] = (mtime, obj_ids)
+        return obj_ids
 
     def _initSettings(self, obj, profile_id, obj_path):
         stool = queryUtility(ISetupTool)
@@ -13,6 +13,9 @@
 """Actions tool node adapters.
 """
 
+from io import BytesIO
+from xml.etree.ElementTree import iterparse
+
 from zope.component import adapts
 from zope.component import getSiteManager
 
@@ -255,6 +258,29 @@ class ActionsToolXMLAdapter(XMLAdapterBase, ObjectManagerHelpers):
         self._initObjects(fragment)
 
 
+def iterActionPaths(body, meta_type='CMF Action'):
+    """Yield the paths of all actions defined in an actions.xml body.
+
+    Actions are the objects of 'meta_type' below the tool.  Paths are
+    relative to the actions tool, e.g. 'object/edit'.  The body
+    is parsed incrementally and without building a DOM, so that large
+    action trees can be indexed cheaply.
+    """
+    stack = []  # object names, None for other elements
+    for event, elem in iterparse(BytesIO(body), events=('start', 'end')):
+        if event == 'end':
+            stack.pop()
+            elem.clear()
+            continue
+        if elem.tag != 'object' or None in stack:
+            stack.append(None)
+            continue
+        name = elem.get('name')
+        if len(stack) > 1 and elem.get('meta_type') == meta_type:
+            yield '/'.join(stack[1:] + [name])
+        stack.append(name)
+
+
 def importActionProviders(context):
     """Import actions tool.
     """
@@ -28,6 +28,12 @@ from ..interfaces import ICachingPolicy
 from ..interfaces import ICachingPolicyManager
 
 
+# Pre-filter child elements of 'caching-policy' nodes
+_FILTER_NODES = (('view-name', 'view_names', 'getViewNames'),
+                 ('portal-type', 'portal_types', 'getPortalTypes'),
+                 ('meta-type', 'meta_types', 'getMetaTypes'))
+
+
 class CachingPolicyNodeAdapter(NodeAdapterBase):
 
     """Node im- and exporter for CachingPolicy.
@@ -66,6 +72,11 @@ class CachingPolicyNodeAdapter(NodeAdapterBase):
         post_check = obj.getPostCheck()
         if post_check is not None:
             node.setAttribute('post_check', str(post_check))
+        for node_name, _key, getter in _FILTER_NODES:
+            for value in getattr(obj, getter)():
+                child = self._doc.createElement(node_name)
+                child.setAttribute('value', value)
+                node.appendChild(child)
         return node
 
     def _importNode(self, node):
@@ -104,6 +115,10 @@ class CachingPolicyNodeAdapter(NodeAdapterBase):
         post_check = node.getAttribute('post_check')
         if post_check != '':
             info['post_check'] = int(post_check)
+        for node_name, key, _getter in _FILTER_NODES:
+            info[key] = [str(child.getAttribute('value'))
+                         for child in node.childNodes
+                         if child.nodeName == node_name]
         self.context.__init__(**info)
 
     node = property(_exportNode, _importNode)
@@ -166,6 +181,8 @@ class CachingPolicyManagerXMLAdapter(XMLAdapterBase):
             if importer:
                 importer.node = child
 
+        self.context._invalidatePolicyIndex()
+
 
 def importCachingPolicyManager(context):
     """Import caching policy manager settings from an XML file.
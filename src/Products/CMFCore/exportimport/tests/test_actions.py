@@ -594,6 +594,123 @@ class importActionProvidersTests(_ActionSetup):
         self.assertEqual(atool.listActionProviders(), ['portal_foo'])
 
 
+class iterActionPathsTests(unittest.TestCase):
+
+    def _callFUT(self, body, *args):
+        from ..actions import iterActionPaths
+
+        return list(iterActionPaths(body, *args))
+
+    def test_empty(self):
+        self.assertEqual(self._callFUT(_EMPTY_EXPORT), [])
+
+    def test_oldstyle(self):
+        self.assertEqual(self._callFUT(_OLD_EXPORT), [])
+
+    def test_normal(self):
+        self.assertEqual(self._callFUT(_ACTIONSTOOL_BODY),
+                         ['foo_category/foo_action'])
+
+    def test_nested_categories(self):
+        body = b"""\
+<?xml version="1.0"?>
+<object name="portal_actions" meta_type="CMF Actions Tool">
+ <object name="top" meta_type="CMF Action">
+  <property name="title"></property>
+ </object>
+ <object name="outer" meta_type="CMF Action Category">
+  <object name="inner" meta_type="CMF Action Category">
+   <object name="foo" meta_type="CMF Action"/>
+  </object>
+  <object name="bar" meta_type="CMF Action"/>
+ </object>
+</object>
+"""
+        self.assertEqual(self._callFUT(body), ['outer/inner/foo', 'outer/bar'])
+
+    def test_meta_type(self):
+        body = b"""\
+<?xml version="1.0"?>
+<object name="portal_actions" meta_type="CMF Actions Tool">
+ <object name="outer" meta_type="CMF Action Category">
+  <object name="foo" meta_type="CMF Action"/>
+  <object name="bar" meta_type="Other Action"/>
+ </object>
+</object>
+"""
+        self.assertEqual(self._callFUT(body, 'Other Action'), ['outer/bar'])
+
+
+class DummyProfileContext:
+
+    def __init__(self, body, mtime):
+        self.body = body
+        self.mtime = mtime
+        self.reads = 0
+
+    def getLastModified(self, path):
+        return self.mtime
+
+    def readDataFile(self, filename):
+        self.reads += 1
+        return self.body
+
+
+class ActionAddViewTests(unittest.TestCase):
+
+    layer = ExportImportZCMLLayer
+
+    def setUp(self):
+        from ...browser.actions import _action_paths
+
+        self.addCleanup(_action_paths.clear)
+
+    def _makeOne(self):
+        from ...browser.actions import ActionAddView
+
+        return ActionAddView()
+
+    def test_getActionPaths_cached(self):
+        view = self._makeOne()
+        context = DummyProfileContext(_ACTIONSTOOL_BODY, 1)
+        key = ('stool', 'profile', 'CMF Action')
+
+        self.assertEqual(view._getActionPaths(context, key),
+                         ('foo_category/foo_action',))
+        self.assertEqual(view._getActionPaths(context, key),
+                         ('foo_category/foo_action',))
+        self.assertEqual(context.reads, 1)
+
+        # A new modification time invalidates the cached paths.
+        context.body = _EMPTY_EXPORT
+        context.mtime = 2
+        self.assertEqual(view._getActionPaths(context, key), ())
+        self.assertEqual(context.reads, 2)
+
+    def test_getActionPaths_unknown_mtime(self):
+        from ...browser.actions import _action_paths
+
+        view = self._makeOne()
+        context = DummyProfileContext(_ACTIONSTOOL_BODY, None)
+        key = ('stool', 'profile', 'CMF Action')
+
+        self.assertEqual(view._getActionPaths(context, key),
+                         ('foo_category/foo_action',))
+        context.body = _EMPTY_EXPORT
+        self.assertEqual(view._getActionPaths(context, key), ())
+        self.assertEqual(context.reads, 2)
+        self.assertEqual(_action_paths, {})
+
+    def test_getActionPaths_bounded(self):
+        from ...browser import actions
+
+        view = self._makeOne()
+        context = DummyProfileContext(_ACTIONSTOOL_BODY, 1)
+        for i in range(actions.MAX_ACTION_PATHS + 1):
+            view._getActionPaths(context, ('stool', str(i), 'CMF Action'))
+        self.assertEqual(len(actions._action_paths), 1)
+
+
 def test_suite():
     loadTestsFromTestCase = unittest.defaultTestLoader.loadTestsFromTestCase
     return unittest.TestSuite((
@@ -602,4 +719,6 @@ def test_suite():
         loadTestsFromTestCase(ActionsToolXMLAdapterTests),
         loadTestsFromTestCase(exportActionProvidersTests),
         loadTestsFromTestCase(importActionProvidersTests),
+        loadTestsFromTestCase(iterActionPathsTests),
+        loadTestsFromTestCase(ActionAddViewTests),
     ))
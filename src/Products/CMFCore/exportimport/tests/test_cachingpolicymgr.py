@@ -37,6 +37,19 @@ _CP_XML = b"""\
    proxy_revalidate="False" public="False" vary=""/>
 """
 
+_CP_FILTERED_XML = b"""\
+<caching-policy name="foo_policy" enable_304s="False" etag_func=""
+   last_modified="True" max_age_secs="0" mtime_func="object/modified"
+   must_revalidate="False" no_cache="False" no_store="False"
+   no_transform="False" predicate="python:1" private="False"
+   proxy_revalidate="False" public="False" vary="">
+ <view-name value="foo_view"/>
+ <portal-type value="Foo"/>
+ <portal-type value="Foo Bar"/>
+ <meta-type value="Foo Content"/>
+</caching-policy>
+"""
+
 _CPM_BODY = b"""\
 <?xml version="1.0" encoding="utf-8"?>
 <object name="caching_policy_manager" meta_type="CMF Caching Policy Manager">
@@ -66,6 +79,31 @@ class CachingPolicyNodeAdapterTests(NodeAdapterTestCase, unittest.TestCase):
         self._XML = _CP_XML
 
 
+class FilteredCachingPolicyNodeAdapterTests(NodeAdapterTestCase,
+                                            unittest.TestCase):
+
+    layer = ExportImportZCMLLayer
+
+    def _getTargetClass(self):
+        from ..cachingpolicymgr import CachingPolicyNodeAdapter
+
+        return CachingPolicyNodeAdapter
+
+    def _verifyImport(self, obj):
+        self.assertEqual(obj.getViewNames(), ('foo_view',))
+        self.assertEqual(obj.getPortalTypes(), ('Foo', 'Foo Bar'))
+        self.assertEqual(obj.getMetaTypes(), ('Foo Content',))
+
+    def setUp(self):
+        from ...CachingPolicyManager import CachingPolicy
+
+        self._obj = CachingPolicy('foo_policy', max_age_secs=0,
+                                  view_names=('foo_view',),
+                                  portal_types=('Foo', 'Foo Bar'),
+                                  meta_types=('Foo Content',))
+        self._XML = _CP_FILTERED_XML
+
+
 class CachingPolicyManagerXMLAdapterTests(BodyAdapterTestCase,
                                           unittest.TestCase):
 
@@ -215,6 +253,7 @@ def test_suite():
     loadTestsFromTestCase = unittest.defaultTestLoader.loadTestsFromTestCase
     return unittest.TestSuite((
         loadTestsFromTestCase(CachingPolicyNodeAdapterTests),
+        loadTestsFromTestCase(FilteredCachingPolicyNodeAdapterTests),
         loadTestsFromTestCase(CachingPolicyManagerXMLAdapterTests),
         loadTestsFromTestCase(exportCachingPolicyManagerTests),
         loadTestsFromTestCase(importCachingPolicyManagerTests),
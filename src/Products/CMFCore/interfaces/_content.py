@@ -596,17 +596,23 @@ class IFolderish(Interface):
 
     __module__ = 'Products.CMFCore.interfaces'
 
-    def contentItems(filter=None):
+    def contentItems(filter=None, b_start=0, b_size=None):
         """ Return a sequence of (object ID, object) tuples for
             IContentish and IFolderish sub-objects.
 
         o Provide a filtered view onto 'objectItems', allowing only
           "content space" objects to show through.
 
+        o Return only 'b_size' items starting at 'b_start', if 'b_size'
+          is passed.
+
+        o Folders may answer the query from the catalog, returning a lazy
+          sequence.
+
         o Permission:  Public (not publishable)
         """
 
-    def contentIds(filter=None):
+    def contentIds(filter=None, b_start=0, b_size=None):
         """ Return a sequence of IDs of IContentish and IFolderish sub-objects.
 
         o Provide a filtered view onto 'objectIds', allowing only
@@ -617,7 +623,7 @@ class IFolderish(Interface):
         Returns -- List of object IDs
         """
 
-    def contentValues(filter=None):
+    def contentValues(filter=None, b_start=0, b_size=None):
         """ Return a sequence of IContentish and IFolderish sub-objects.
 
         o Provide a filtered view onto 'objectValues', allowing only
@@ -628,7 +634,34 @@ class IFolderish(Interface):
         Returns -- List of objects
         """
 
-    def listFolderContents(contentFilter=None):
+    def iterContentItems(filter=None, start=0, limit=None):
+        """ Iterate over (object ID, object) tuples for IContentish and
+            IFolderish sub-objects.
+
+        o Like 'contentItems', but stop after 'limit' items starting at
+          'start', if 'limit' is passed.
+
+        o Permission:  Public (not publishable)
+        """
+
+    def iterContentIds(filter=None, start=0, limit=None):
+        """ Iterate over IDs of IContentish and IFolderish sub-objects.
+
+        o Like 'contentIds'.
+
+        o Permission:  Public (not publishable)
+        """
+
+    def iterContentValues(filter=None, start=0, limit=None):
+        """ Iterate over IContentish and IFolderish sub-objects.
+
+        o Like 'contentValues', but stop after 'limit' objects starting
+          at 'start', if 'limit' is passed.
+
+        o Permission:  Public (not publishable)
+        """
+
+    def listFolderContents(contentFilter=None, b_start=0, b_size=None):
         """ Return a sequence of IContentish and IFolderish sub-objects,
             filtered by the current user's possession of the View permission.
 
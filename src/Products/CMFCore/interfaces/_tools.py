@@ -314,6 +314,24 @@ class ICachingPolicy(Interface):
         """
         """
 
+    def getViewNames():
+        """Return the view names this policy is restricted to.
+
+        An empty sequence means the policy applies to all views.
+        """
+
+    def getPortalTypes():
+        """Return the content portal types this policy is restricted to.
+
+        An empty sequence means the policy applies to all portal types.
+        """
+
+    def getMetaTypes():
+        """Return the content meta types this policy is restricted to.
+
+        An empty sequence means the policy applies to all meta types.
+        """
+
     def testPredicate(expr_context):
         """Does this request match our predicate?
         """
@@ -591,13 +609,17 @@ class IMemberDataTool(Interface):
         o Permission:  Private (Python-only)
         """
 
-    def pruneMemberDataContents():
+    def pruneMemberDataContents(batch_size=1000, commit=False):
         """ Delete member data of all members not findable in acl_users.
 
         o Compare the user IDs stored in the member data tool with the
           list in the actual underlying acl_users and delete any records whose
           user cannot be found.
 
+        o A savepoint is made every 'batch_size' deletions.  If 'commit'
+          is true, the transaction is committed instead; don't pass it
+          when called during a request.
+
         o Permission:  Private (Python only)
         """
 
@@ -617,6 +639,35 @@ class IMemberDataTool(Interface):
         o Permission:  Private (Python only)
         """
 
+    def searchMemberIds(search_param, search_term, exact=False):
+        """ Return the IDs of the members whose value of a property contains
+            the given term, using the property index.
+
+        o 'search_param' is the property ID to be searched.
+
+        o 'search_term' is the value to be searched;  if 'exact' is True
+          the value has to match completely.
+
+        o Return None if the property is not indexed.  Only the values
+          stored in the member data are indexed;  members without a stored
+          value match if the tool's default or, if that is empty, their
+          user object's value does, like in 'getProperty'.
+
+        o Permission:  Private (Python only)
+        """
+
+    def getIndexedProperties():
+        """ Return the IDs of the indexed member properties.
+
+        o Permission:  Manage portal
+        """
+
+    def setIndexedProperties(ids):
+        """ Index the member properties 'ids', dropping other indexes.
+
+        o Permission:  Manage portal
+        """
+
     def registerMemberData(m, id):
         """ Add the given member data to the _members btree.
 
@@ -661,6 +712,22 @@ class IMemberData(Interface):
         o Permission:  Set own properties
         """
 
+    def getProperties(ids=None, default=_marker):
+        """ Return a mapping of property IDs to the member's values.
+
+        o 'ids' defaults to the IDs of all properties of the member data
+          tool.
+
+        o Values are resolved like 'getProperty' does, from the member
+          data, the tool's defaults and the user object.  The tool's
+          defaults are read once per request.
+
+        o Properties not found anywhere get 'default', if passed;
+          otherwise a ValueError is raised.
+
+        o Permission:  Public
+        """
+
 
 class IMember(IUser, IMemberData):
 
@@ -702,6 +769,9 @@ class IMembershipTool(Interface):
         o If no valid credentials are passed in the request, return
           the Anonymous User.
 
+        o The wrapped member is memoized on the request until the user
+          changes or 'credentialsChanged' is called.
+
         o Permission:  Public
         """
 
@@ -789,20 +859,43 @@ class IMembershipTool(Interface):
         o Permission:  Manage users
         """
 
-    def listMemberIds():
+    def listMemberIds(b_start=0, b_size=None, sort_on=None):
         """ Return a sequence of ids of all members.
 
-        o This may eventually be replaced with a set of methods for querying
-          pieces of the list rather than the entire list at once.
+        o If 'b_size' is passed, return only that many ids starting at
+          'b_start'.
+
+        o 'sort_on' may be 'id' to sort the ids; otherwise they are in the
+          order of the user folder.
 
         o Permission:  Manage users
         """
 
-    def listMembers():
+    def listMembers(b_start=0, b_size=None, sort_on=None):
         """ Return a sequence of all IMember instances.
 
-        o This may eventually be replaced with a set of methods for querying
-          pieces of the list rather than the entire list at once.
+        o 'b_start', 'b_size' and 'sort_on' are handled like in
+          'listMemberIds'.
+
+        o Permission:  Manage users
+        """
+
+    def iterMemberIds(start=0, limit=None, sort_on=None):
+        """ Iterate over the ids of the members.
+
+        o Like 'listMemberIds', but stop after 'limit' ids starting at
+          'start', if 'limit' is passed.
+
+        o Users are not loaded if the user folder has a 'getUserIds'
+          method.
+
+        o Permission:  Manage users
+        """
+
+    def iterMembers(start=0, limit=None, sort_on=None):
+        """ Iterate over IMember instances.
+
+        o Like 'iterMemberIds'; only the users returned are wrapped.
 
         o Permission:  Manage users
         """
@@ -846,6 +939,9 @@ class IMembershipTool(Interface):
           actually deleted.
 
         o If 'recursive' is True, recurse over all subobjects of 'object'.
+          Tools may instead look up the subobjects granting the members
+          a local role in the catalog's 'allowedRolesAndUsers' index, and
+          reindex only the objects changed.
 
         o Return True if any local roles were actually deleted, else False.
 
@@ -932,6 +1028,27 @@ class IMembershipTool(Interface):
         o Permission:  Public # ????
         """
 
+    def createMemberAreas(member_ids, batch_size=1000, commit=False,
+                          progress=None):
+        """ Create the member areas of the given members.
+
+        o If member area creation is disabled, create nothing.
+
+        o Members which already have a member area are skipped.
+
+        o Process the queued indexing operations and make a savepoint
+          every 'batch_size' members.  If 'commit' is True, commit the
+          transaction instead; don't pass it when called during a request.
+
+        o 'progress', if passed, is called with the number of processed
+          members and the total after each batch.
+
+        o Return a list of the IDs of the members whose area was created
+          and a list of (member ID, exception) for the members which failed.
+
+        o Permission:  Private (Python only)
+        """
+
     def deleteMemberArea(member_id):
         """ Delete member area of specified member
 
@@ -1190,6 +1307,24 @@ class IRegistrationTool(Interface):
         o Permission:  Add portal member
         """
 
+    def addMembers(records, batch_size=1000, commit=False, progress=None):
+        """ Create a member for each mapping of 'records'.
+
+        o The keys of the mappings are the arguments of 'addMember'.
+
+        o Process the queued indexing operations and make a savepoint
+          every 'batch_size' records.  If 'commit' is True, commit the
+          transaction instead; don't pass it when called during a request.
+
+        o 'progress', if passed, is called with the number of processed
+          records and the total after each batch.
+
+        o Return a list of the IDs of the created members and a list of
+          (record, exception) for the records which failed.
+
+        o Permission:  Private (Python only)
+        """
+
     def isMemberIdAllowed(id):
         """ Return True if 'id' is not in use as a member ID and is not
             reserved, else False.
@@ -1815,6 +1950,22 @@ class IWorkflowTool(Interface):
         o Permission:  Public
         """
 
+    def doActionForMany(objects, action, wf_id=None, *args, **kw):
+        """ Perform the given workflow action on each of 'objects'.
+
+        o 'action', 'wf_id', 'args' and 'kw' are used as in 'doActionFor'.
+
+        o Objects are reindexed in one pass after all actions were performed.
+
+        o An error aborts the action on the object which raised it only.
+
+        o Return a list of (object, result) pairs for the objects the
+          action was performed on, and a list of (object, exception) pairs
+          for the others.
+
+        o Permission:  Public
+        """
+
     def getInfoFor(ob, name, default=_marker, wf_id=None):
         """ Get the given bit of workflow information for the object.
 
@@ -2148,6 +2299,37 @@ class IWorkflowDefinition(Interface):
         """
 
 
+class IIndexableWorkflowDefinition(IWorkflowDefinition):
+
+    """Workflow definition which knows its catalog variable names statically.
+    """
+
+    __module__ = 'Products.CMFCore.interfaces'
+
+    def getCatalogVariableNames():
+        """ Return the names of the attributes 'getCatalogVariablesFor'
+            returns for any object.
+
+        o Lets the workflow tool find the indexes to update after a
+          workflow action without computing the variable values.
+
+        o Permission:  Private (Python only)
+        """
+
+    def changesLocalSecurityOnly():
+        """ Return True if the actions of the workflow only change the
+            security of the object they are performed on, by its permission
+            role mappings and local roles.
+
+        o Lets the workflow tool skip reindexing the security of the object
+          and its subobjects if these settings didn't change.  Return False
+          if transitions or scripts may change the security of other
+          objects, or change it through adapters.
+
+        o Permission:  Private (Python only)
+        """
+
+
 class IWorkflowStatus(Interface):
 
     __module__ = 'Products.CMFCore.interfaces'
@@ -0,0 +1,2 @@
+""" Console scripts for CMF sites.
+"""
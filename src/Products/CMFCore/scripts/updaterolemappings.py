@@ -0,0 +1,78 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" Update the workflow role mappings of a CMF site in committed batches.
+
+Usage::
+
+  cmf-update-role-mappings etc/zope.conf /path/to/site [-w wf_id] [-b 1000]
+
+An interrupted run resumes after the last committed batch when it is
+started again with the same workflows; use '--restart' to start over.
+"""
+
+import argparse
+import sys
+
+
+def run(site, wf_ids=None, batch_size=1000, restart=False, out=sys.stdout):
+    """ Update the role mappings of 'site', reporting progress to 'out'.
+    """
+    from ..utils import getToolByName
+
+    wtool = getToolByName(site, 'portal_workflow')
+    if restart:
+        wtool._role_mappings_cursor = None
+
+    def progress(done, total):
+        out.write('%d/%d object(s) processed.\n' % (done, total))
+        out.flush()
+
+    count = wtool.updateRoleMappingsInBatches(wf_ids, batch_size,
+                                              commit=True, progress=progress)
+    out.write('%d object(s) updated.\n' % count)
+    return count
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Update the workflow role mappings of a CMF site.')
+    parser.add_argument('zopeconf', help='path to zope.conf')
+    parser.add_argument('site', help='physical path of the site')
+    parser.add_argument('-w', '--workflow', action='append', dest='wf_ids',
+                        help='id of a workflow to update (repeatable, '
+                             'default: all workflows)')
+    parser.add_argument('-b', '--batch-size', type=int, default=1000,
+                        help='number of objects per transaction')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore the cursor of an interrupted run')
+    namespace = parser.parse_args(args)
+
+    import Zope2
+    from AccessControl.SecurityManagement import newSecurityManager
+    from AccessControl.users import system as user
+    from Testing.makerequest import makerequest
+    from Zope2.Startup.run import make_wsgi_app
+    from zope.component.hooks import setSite
+    from zope.globalrequest import setRequest
+
+    make_wsgi_app({}, namespace.zopeconf)
+    app = makerequest(Zope2.app())
+    setRequest(app.REQUEST)
+    newSecurityManager(None, user)
+    site = app.unrestrictedTraverse(namespace.site)
+    setSite(site)
+    run(site, namespace.wf_ids, namespace.batch_size, namespace.restart)
+
+
+if __name__ == '__main__':
+    main()
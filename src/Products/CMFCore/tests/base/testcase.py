@@ -30,6 +30,7 @@ from Testing.ZopeTestCase.layer import ZopeLite
 from zope.component import getSiteManager
 
 from ...interfaces import ISkinsTool
+from ...utils import _clearStatCache
 from ...utils import getPackageLocation
 from .dummy import DummyFolder
 from .security import AnonymousUser
@@ -191,6 +192,8 @@ class WritableFSDVTest(FSDVTest):
             mtime2 = stat(thePath).st_mtime
         if use_dir_mtime:
             self._addedOrRemoved(dir_mtime)
+        # Changes have to be seen immediately.
+        _clearStatCache()
 
     def _deleteFile(self, filename, use_dir_mtime=False):
         if use_dir_mtime:
@@ -198,6 +201,8 @@ class WritableFSDVTest(FSDVTest):
         remove(join(self.skin_path_name, filename))
         if use_dir_mtime:
             self._addedOrRemoved(dir_mtime)
+        # Changes have to be seen immediately.
+        _clearStatCache()
 
     def _deleteDirectory(self, subdirname, use_dir_mtime=False):
         if use_dir_mtime:
@@ -205,6 +210,8 @@ class WritableFSDVTest(FSDVTest):
         rmdir(join(self.skin_path_name, subdirname))
         if use_dir_mtime:
             self._addedOrRemoved(dir_mtime)
+        # Changes have to be seen immediately.
+        _clearStatCache()
 
     def _addedOrRemoved(self, old_mtime):
         # Called after adding/removing a file from self.skin_path_name.
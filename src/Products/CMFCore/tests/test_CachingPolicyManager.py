@@ -58,6 +58,26 @@ class DummyContent2:
         return self.modified
 
 
+class DummyTypedContent(DummyContent2):
+
+    meta_type = 'Dummy'
+    portal_type = 'Dummy Content'
+
+
+class DummyRequest:
+
+    pass
+
+
+class CountingDummyContent(DummyContent2):
+
+    predicate_calls = 0
+
+    def isCacheable(self):
+        self.predicate_calls += 1
+        return True
+
+
 class CacheableDummyContent(Implicit, Cacheable):
 
     __allow_access_to_unprotected_subobjects__ = 1
@@ -92,6 +112,22 @@ class DummyView(CacheableDummyContent):
     meta_type = 'DTML Method'
 
 
+class RenderingDummyContent(CacheableDummyContent):
+
+    render_count = 0
+
+    def __call__(self):
+        """ """
+        result = self.ZCacheable_get(default=None)
+        if result is not None:
+            return result
+
+        self.render_count += 1
+        result = 'rendered %d' % self.render_count
+        self.ZCacheable_set(result)
+        return result
+
+
 class CachingPolicyTests(unittest.TestCase):
 
     layer = TraversingZCMLLayer
@@ -384,6 +420,30 @@ class CachingPolicyTests(unittest.TestCase):
         self.assertEqual(headers[2][0].lower(), 'cache-control')
         self.assertEqual(headers[2][1], 'no-cache, no-store')
 
+    def test_preFilters(self):
+        policy = self._makePolicy('empty')
+        self.assertEqual(policy.getViewNames(), ())
+        self.assertEqual(policy.getPortalTypes(), ())
+        self.assertEqual(policy.getMetaTypes(), ())
+
+        policy = self._makePolicy('filtered',
+                                  view_names='foo_view, bar_view',
+                                  portal_types=['Dummy Content', ''],
+                                  meta_types='Dummy\nOther Dummy\n')
+        self.assertEqual(policy.getViewNames(), ('foo_view', 'bar_view'))
+        self.assertEqual(policy.getPortalTypes(), ('Dummy Content',))
+        self.assertEqual(policy.getMetaTypes(), ('Dummy', 'Other Dummy'))
+
+    def test_cacheControlWithoutPrecomputedValue(self):
+        # Policies stored before the header value was precomputed
+        policy = self._makePolicy('old', max_age_secs=60, public=1)
+        del policy._cache_control
+        context = self._makeContext()
+        headers = policy.getHeaders(context)
+
+        self.assertEqual(headers[2][0].lower(), 'cache-control')
+        self.assertEqual(headers[2][1], 'max-age=60, public')
+
 
 class CachingPolicyManagerTests(unittest.TestCase):
 
@@ -573,6 +633,82 @@ class CachingPolicyManagerTests(unittest.TestCase):
         self.assertEqual(headers[2][0].lower(), 'cache-control')
         self.assertEqual(headers[2][1], 'max-age=86400')
 
+    def test_lookupPreFilters(self):
+        mgr = self._makeOne()
+        # The predicate of the first policy would fail if evaluated
+        mgr._addPolicy('other_view', 'python:nothing.boom', None, 10, 0, 0,
+                       0, '', '', view_names=('other_view',))
+        mgr._addPolicy('other_type', 'python:nothing.boom', None, 20, 0, 0,
+                       0, '', '', portal_types=('Other',))
+        mgr._addPolicy('dummy', 'python:1', None, 30, 0, 0, 0, '', '',
+                       view_names=('foo_view',),
+                       meta_types=('Dummy',))
+        content = DummyTypedContent(self._epoch)
+
+        headers = mgr.getHTTPCachingHeaders(content=content,
+                                            view_method='foo_view',
+                                            keywords={},
+                                            time=self._epoch)
+        self.assertEqual(headers[2][0].lower(), 'cache-control')
+        self.assertEqual(headers[2][1], 'max-age=30')
+
+        headers = mgr.getHTTPCachingHeaders(content=content,
+                                            view_method='bar_view',
+                                            keywords={},
+                                            time=self._epoch)
+        self.assertEqual(len(headers), 0)
+
+        # Changing a policy updates the index
+        mgr._updatePolicy('other_type', 'python:1', None, 20, 0, 0, 0, '',
+                          '', portal_types=('Dummy Content',))
+        headers = mgr.getHTTPCachingHeaders(content=content,
+                                            view_method='foo_view',
+                                            keywords={},
+                                            time=self._epoch)
+        self.assertEqual(headers[2][1], 'max-age=20')
+
+        mgr._removePolicy('other_type')
+        headers = mgr.getHTTPCachingHeaders(content=content,
+                                            view_method='foo_view',
+                                            keywords={},
+                                            time=self._epoch)
+        self.assertEqual(headers[2][1], 'max-age=30')
+
+    def test_evaluationSharedPerRequest(self):
+        mgr = self._makeOne()
+        mgr._addPolicy('counting', 'python:object.isCacheable()', None, 60,
+                       0, 0, 0, '', 'string:abc', enable_304s=1)
+        content = CountingDummyContent(self._epoch)
+        content.REQUEST = DummyRequest()
+
+        mtime, etag, _set_lm = mgr.getModTimeAndETag(content, 'foo_view', {})
+        headers = dict(mgr.getHTTPCachingHeaders(content, 'foo_view', {}))
+        self.assertEqual(content.predicate_calls, 1)
+        self.assertEqual(mtime, self._epoch)
+        self.assertEqual(etag, 'abc')
+        self.assertEqual(headers['ETag'], 'abc')
+
+        # The modification time is computed again on each call.
+        content.modified = self._epoch + 1
+        mtime, etag, _set_lm = mgr.getModTimeAndETag(content, 'foo_view', {})
+        self.assertEqual(content.predicate_calls, 1)
+        self.assertEqual(mtime, self._epoch + 1)
+
+        # Other keywords and changed policies require a new evaluation
+        mgr.getHTTPCachingHeaders(content, 'foo_view', {'foo': 1})
+        self.assertEqual(content.predicate_calls, 2)
+        mgr._updatePolicy('counting', 'python:object.isCacheable()', None,
+                          60, 0, 0, 0, '', 'string:xyz', enable_304s=1)
+        headers = dict(mgr.getHTTPCachingHeaders(content, 'foo_view',
+                                                 {'foo': 1}))
+        self.assertEqual(content.predicate_calls, 3)
+        self.assertEqual(headers['ETag'], 'xyz')
+
+        # A new request starts from scratch
+        content.REQUEST = DummyRequest()
+        mgr.getHTTPCachingHeaders(content, 'foo_view', {'foo': 1})
+        self.assertEqual(content.predicate_calls, 4)
+
 
 class CachingPolicyManager304Tests(SecurityTest, FSDVTest):
 
@@ -1199,6 +1335,7 @@ class OFSCacheTests(TransactionalTest):
         self.portal._setObject('doc1', CacheableDummyContent('doc1'))
         self.portal._setObject('doc2', CacheableDummyContent('doc2'))
         cpm = self._makeOne()
+        cpm._ram_cache = True
         self.portal._setObject('caching_policy_manager', cpm)
         sm = getSiteManager()
         sm.registerUtility(cpm, ICachingPolicyManager)
@@ -1218,13 +1355,23 @@ class OFSCacheTests(TransactionalTest):
                       enable_304s=0)
 
     def tearDown(self):
+        from ..CachingPolicyManager import caches
         from ..interfaces import ICachingPolicyManager
 
+        caches.clear()
         sm = getSiteManager()
         sm.unregisterUtility(provided=ICachingPolicyManager)
         sm.unregisterUtility(provided=IMembershipTool)
         TransactionalTest.tearDown(self)
 
+    def _makeRenderingContent(self, id='doc1'):
+        cpm = self.portal.caching_policy_manager
+        self.portal._delObject(id)
+        self.portal._setObject(id, RenderingDummyContent(id))
+        doc = getattr(self.portal, id)
+        doc.ZCacheable_setManagerId(cpm.getId())
+        return doc
+
     def test_empty(self):
         from ..CachingPolicyManager import CPMCache
 
@@ -1298,6 +1445,218 @@ class OFSCacheTests(TransactionalTest):
         self.assertEqual(headers.get('vary'), 'doc1')
         self.assertEqual(headers.get('cache-control'), 'max-age=100')
 
+    def test_ram_cache_hit(self):
+        doc1 = self._makeRenderingContent()
+
+        self.assertEqual(doc1(), 'rendered 1')
+        self.RESPONSE.headers.clear()
+        self.assertEqual(doc1(), 'rendered 1')
+        self.assertEqual(doc1.render_count, 1)
+
+        # Headers are set for cached output as well
+        headers = {k.lower(): v for k, v in self.RESPONSE.headers.items()}
+        self.assertEqual(headers.get('cache-control'), 'max-age=100')
+
+        cache = self.portal.caching_policy_manager.ZCacheManager_getCache()
+        self.assertEqual(cache.countEntries(), 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_ram_cache_disabled(self):
+        cpm = self.portal.caching_policy_manager
+        cpm._ram_cache = False
+        doc1 = self._makeRenderingContent()
+
+        self.assertEqual(doc1(), 'rendered 1')
+        self.assertEqual(doc1(), 'rendered 2')
+        self.assertEqual(cpm.ZCacheManager_getCache().countEntries(), 0)
+        # Caching headers are still set.
+        headers = {k.lower(): v for k, v in self.RESPONSE.headers.items()}
+        self.assertEqual(headers.get('cache-control'), 'max-age=100')
+
+        cpm._ram_cache = True
+        self.assertEqual(doc1(), 'rendered 3')
+        self.assertEqual(doc1(), 'rendered 3')
+        # Stored output isn't served once the RAM cache is disabled.
+        cpm._ram_cache = False
+        self.assertEqual(doc1(), 'rendered 4')
+
+    def test_ram_cache_vary(self):
+        doc1 = self._makeRenderingContent()
+
+        self.REQUEST.environ['HTTP_DOC1'] = 'a'
+        self.assertEqual(doc1(), 'rendered 1')
+        self.REQUEST.environ['HTTP_DOC1'] = 'b'
+        self.assertEqual(doc1(), 'rendered 2')
+        self.REQUEST.environ['HTTP_DOC1'] = 'a'
+        self.assertEqual(doc1(), 'rendered 1')
+
+    def test_ram_cache_no_match(self):
+        doc2 = self._makeRenderingContent('doc2')
+
+        self.assertEqual(doc2(), 'rendered 1')
+        self.assertEqual(doc2(), 'rendered 2')
+
+    def test_ram_cache_not_shared(self):
+        cpm = self.portal.caching_policy_manager
+        cpm.updatePolicy('policy_1', 'python:object.getId()=="doc1"', '',
+                         100, 0, 0, 0, 'doc1', '', private=1)
+        doc1 = self._makeRenderingContent()
+
+        self.assertEqual(doc1(), 'rendered 1')
+        self.assertEqual(doc1(), 'rendered 2')
+
+    def test_ram_cache_authenticated(self):
+        getSiteManager().registerUtility(DummyTool(anon=0), IMembershipTool)
+        doc1 = self._makeRenderingContent()
+
+        self.assertEqual(doc1(), 'rendered 1')
+        self.assertEqual(doc1(), 'rendered 2')
+
+    def test_ram_cache_expired(self):
+        from .. import CachingPolicyManager
+
+        doc1 = self._makeRenderingContent()
+        self.assertEqual(doc1(), 'rendered 1')
+
+        original_time = CachingPolicyManager._time.time
+        CachingPolicyManager._time.time = lambda: original_time() + 101
+        try:
+            self.assertEqual(doc1(), 'rendered 2')
+        finally:
+            CachingPolicyManager._time.time = original_time
+
+    def test_ram_cache_invalidate(self):
+        doc1 = self._makeRenderingContent()
+
+        self.assertEqual(doc1(), 'rendered 1')
+        doc1.ZCacheable_invalidate()
+        self.assertEqual(doc1(), 'rendered 2')
+
+    def test_ram_cache_bounded(self):
+        cache = self.portal.caching_policy_manager.ZCacheManager_getCache()
+        cache.max_entries = 1
+        doc1 = self._makeRenderingContent()
+
+        self.assertEqual(doc1(), 'rendered 1')
+        self.REQUEST.environ['QUERY_STRING'] = 'foo=bar'
+        self.assertEqual(doc1(), 'rendered 2')
+        self.assertEqual(cache.countEntries(), 1)
+        self.REQUEST.environ['QUERY_STRING'] = ''
+        self.assertEqual(doc1(), 'rendered 3')
+
+
+class FSObjectRAMCacheTests(TransactionalTest, FSObjMaker):
+
+    layer = FunctionalZCMLLayer
+
+    def setUp(self):
+        from ..CachingPolicyManager import CachingPolicyManager
+        from ..interfaces import ICachingPolicyManager
+
+        FSObjMaker.setUp(self)
+        TransactionalTest.setUp(self)
+
+        self.portal = DummySite(id='portal').__of__(self.app)
+        cpm = CachingPolicyManager()
+        cpm._ram_cache = True
+        self.portal._setObject('caching_policy_manager', cpm)
+        sm = getSiteManager()
+        sm.registerUtility(cpm, ICachingPolicyManager)
+        sm.registerUtility(DummyTool(), IMembershipTool)
+        cpm.addPolicy(policy_id='policy_fs',
+                      predicate='python:view in ("testPT", "testDTML")',
+                      mtime_func='',
+                      max_age_secs=100,
+                      no_cache=0,
+                      no_store=0,
+                      must_revalidate=0,
+                      vary='',
+                      etag_func='')
+
+    def tearDown(self):
+        from ..CachingPolicyManager import caches
+        from ..interfaces import ICachingPolicyManager
+
+        caches.clear()
+        sm = getSiteManager()
+        sm.unregisterUtility(provided=ICachingPolicyManager)
+        sm.unregisterUtility(provided=IMembershipTool)
+        TransactionalTest.tearDown(self)
+        FSObjMaker.tearDown(self)
+
+    def _makeCached(self, maker, id, filename):
+        # Render in the context of a content object.
+        content = DummyContent(id='content')
+        content.modified_date = DateTime()
+        self.portal._setObject('content', content)
+        self.portal._setObject(id, maker(id, filename))
+        ob = getattr(self.portal.content, id)
+        ob.ZCacheable_setManagerId('caching_policy_manager')
+        return ob
+
+    def _getCache(self):
+        return self.portal.caching_policy_manager.ZCacheManager_getCache()
+
+    def test_FSPageTemplate(self):
+        pt = self._makeCached(self._makeFSPageTemplate, 'testPT',
+                              'testPT.pt')
+        self.REQUEST.set('SERVER_NAME', 'foo')
+        self.assertEqual(pt().strip(), 'foo')
+        self.RESPONSE.headers.clear()
+        self.REQUEST.set('SERVER_NAME', 'bar')
+        self.assertEqual(pt().strip(), 'foo')
+        self.assertEqual(self._getCache().hits, 1)
+        self.assertTrue(self.RESPONSE.getHeader('Content-Type')
+                        .startswith('text/html'))
+        self.assertEqual(self.RESPONSE.getHeader('Cache-Control'),
+                         'max-age=100')
+
+    def test_FSDTMLMethod(self):
+        dtml = self._makeCached(self._makeFSDTMLMethod, 'testDTML',
+                                'testDTML.dtml')
+        content = self.portal.content
+        self.REQUEST.set('SERVER_NAME', 'foo')
+        self.assertEqual(dtml(content, self.REQUEST, self.RESPONSE).strip(),
+                         'foo')
+        content_type = self.RESPONSE.getHeader('Content-Type')
+        self.assertIsNotNone(content_type)
+        self.RESPONSE.headers.clear()
+        self.REQUEST.set('SERVER_NAME', 'bar')
+        self.assertEqual(dtml(content, self.REQUEST, self.RESPONSE).strip(),
+                         'foo')
+        self.assertEqual(self._getCache().hits, 1)
+        # The content type is restored for cached output.
+        self.assertEqual(self.RESPONSE.getHeader('Content-Type'),
+                         content_type)
+        self.assertEqual(self.RESPONSE.getHeader('Cache-Control'),
+                         'max-age=100')
+
+    def test_disabled(self):
+        self.portal.caching_policy_manager._ram_cache = False
+        pt = self._makeCached(self._makeFSPageTemplate, 'testPT',
+                              'testPT.pt')
+        self.REQUEST.set('SERVER_NAME', 'foo')
+        self.assertEqual(pt().strip(), 'foo')
+        self.REQUEST.set('SERVER_NAME', 'bar')
+        self.assertEqual(pt().strip(), 'bar')
+        self.assertEqual(self._getCache().countEntries(), 0)
+        self.assertEqual(self.RESPONSE.getHeader('Cache-Control'),
+                         'max-age=100')
+
+    def test_vary_records_bounded(self):
+        dtml = self._makeCached(self._makeFSDTMLMethod, 'testDTML',
+                                'testDTML.dtml')
+        cache = self._getCache()
+        cache.max_entries = 2
+        for i in range(5):
+            self.REQUEST.environ['QUERY_STRING'] = 'q=%d' % i
+            dtml(self.portal.content, self.REQUEST, self.RESPONSE)
+        self.assertEqual(cache.countEntries(), 2)
+        self.assertEqual(len(cache._vary), 2)
+        dtml.ZCacheable_invalidate()
+        self.assertEqual(cache.countEntries(), 0)
+        self.assertEqual(cache._vary, {})
+
 
 def test_suite():
     return unittest.TestSuite((
@@ -1308,4 +1667,6 @@ def test_suite():
             CachingPolicyManager304Tests),
         unittest.defaultTestLoader.loadTestsFromTestCase(NestedTemplateTests),
         unittest.defaultTestLoader.loadTestsFromTestCase(OFSCacheTests),
+        unittest.defaultTestLoader.loadTestsFromTestCase(
+            FSObjectRAMCacheTests),
     ))
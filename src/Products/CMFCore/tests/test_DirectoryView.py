@@ -309,6 +309,16 @@ class DebugModeTests(WritableFSDVTest):
         self._deleteDirectory('test_directory', self.use_dir_mtime)
         self.assertFalse(hasattr(self.ob.fake_skin, 'test_directory'))
 
+    def test_missing_directory_logged(self):
+        from Products.CMFCore.DirectoryView import _dirreg
+
+        info = _dirreg.getDirectoryInfo(self.ob.fake_skin._dirpath)
+        info._filepath = mktemp()
+        with self.assertLogs('CMFCore.DirectoryView', 'ERROR') as logs:
+            self.assertTrue(info._changed())
+        self.assertIn('Error checking for directory modification',
+                      logs.output[0])
+
 
 def test_suite():
     suite = unittest.TestSuite()
@@ -156,6 +156,68 @@ class DynamicTypeDefaultTraversalTests(unittest.TestCase):
         self.assertEqual(r.URL, '/foo/index.html')
         self.assertEqual(r.response.base, '/foo/')
 
+    def test_default_view_cached_until_registry_changes(self):
+        from zope.publisher.browser import TestRequest
+
+        from ..DynamicType import _queryDefaultView
+
+        ob = DummyContent()
+        request = TestRequest()
+        defineDefaultViewName('index.html', DummyContent)
+        self.assertIsNone(_queryDefaultView(ob, request))
+
+        adapters = getSiteManager().adapters
+        cache = adapters._v_cmf_default_views[1]
+        self.assertEqual(list(cache.values()), [None])
+
+        provideAdapter(
+            DummyView, (DummyContent, IBrowserRequest), IBrowserView,
+            'index.html')
+        self.assertEqual(_queryDefaultView(ob, request), 'index.html')
+        self.assertIsNot(adapters._v_cmf_default_views[1], cache)
+
+    def test_default_view_factory_returning_None(self):
+        from zope.publisher.browser import TestRequest
+
+        from ..DynamicType import _queryDefaultView
+
+        ob = DummyContent()
+        request = TestRequest()
+        defineDefaultViewName('index.html', DummyContent)
+        provideAdapter(
+            lambda ob, request: getattr(ob, 'view', None),
+            (DummyContent, IBrowserRequest), IBrowserView, 'index.html')
+        self.assertIsNone(_queryDefaultView(ob, request))
+        ob.view = DummyView(ob, request)
+        self.assertEqual(_queryDefaultView(ob, request), 'index.html')
+        del ob.view
+        self.assertIsNone(_queryDefaultView(ob, request))
+
+    def test_default_view_without_registry_generation(self):
+        from zope.publisher.browser import TestRequest
+
+        from .. import DynamicType as module
+        from ..DynamicType import _queryDefaultView
+
+        class DummyRegistry:
+            # An adapter registry without a generation counter.
+            def __init__(self, adapters):
+                self.lookup = adapters.lookup
+
+        class DummySiteManager:
+            adapters = DummyRegistry(getSiteManager().adapters)
+
+        defineDefaultViewName('index.html', DummyContent)
+        provideAdapter(
+            DummyView, (DummyContent, IBrowserRequest), IBrowserView,
+            'index.html')
+        module.getSiteManager = DummySiteManager
+        self.addCleanup(setattr, module, 'getSiteManager', getSiteManager)
+        self.assertEqual(_queryDefaultView(DummyContent(), TestRequest()),
+                         'index.html')
+        self.assertFalse(hasattr(DummySiteManager.adapters,
+                                 '_v_cmf_default_views'))
+
 
 class DynamicTypeSecurityTests(SecurityTest):
 
@@ -115,6 +115,47 @@ class FSReSTMethodTests(TransactionalTest, FSReSTMaker):
         self.assertIn('foo', self.RESPONSE.headers)
         self.assertIn('bar', self.RESPONSE.headers)
 
+    def test_cook_cached_until_reread(self):
+        script = self._makeOne('testReST', 'testReST.rst')
+        calls = []
+
+        def _cook(raw):
+            calls.append(raw)
+            return 'COOKED'
+
+        script._cook = _cook
+        script._v_cooked = None
+        self.assertEqual(script.cook(), 'COOKED')
+        self.assertEqual(script.cook(), 'COOKED')
+        self.assertEqual(len(calls), 1)
+        script._readFile(0)
+        self.assertEqual(script.cook(), 'COOKED')
+        self.assertEqual(len(calls), 2)
+
+    def test_cook_shared_render_cache(self):
+        import shutil
+        import tempfile
+
+        from .. import FSObject
+
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        old_dir = FSObject.RENDER_CACHE_DIR
+        FSObject.RENDER_CACHE_DIR = cache_dir
+        self.addCleanup(setattr, FSObject, 'RENDER_CACHE_DIR', old_dir)
+
+        cooked = self._makeOne('testReST', 'testReST.rst').cook()
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        script = self._makeOne('testReST', 'testReST.rst')
+        script._cook = None  # not called
+        self.assertEqual(script.cook(), cooked)
+
+        script = self._makeOne('testReST', 'testReST.rst')
+        script.report_level = 2
+        self.assertEqual(script.cook(), cooked)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
     def test_ownership(self):
         script = self._makeOne('testReST', 'testReST.rst')
         script = script.__of__(self.app)
@@ -143,6 +143,18 @@ class FSSTXMethodTests(TransactionalTest, FSSTXMaker, _TemplateSwitcher):
         self.assertIn('foo', self.RESPONSE.headers)
         self.assertIn('bar', self.RESPONSE.headers)
 
+    def test_cook_cached_until_reread(self):
+        script = self._makeOne('testSTX', 'testSTX.stx')
+        cooked = script.cook()
+        script._cook = None  # not called
+        self.assertIs(script.cook(), cooked)
+        del script._cook
+        script.raw = 'Other'
+        self.assertIs(script.cook(), cooked)
+        script._readFile(1)
+        self.assertEqual(script.cook(), cooked)
+        self.assertIsNot(script.cook(), cooked)
+
     def test_ownership(self):
         script = self._makeOne('testSTX', 'testSTX.stx')
         script = script.__of__(self.app)
@@ -13,10 +13,15 @@
 """Unit tests for FSZSQLMethod module.
 """
 
+import shutil
+import sqlite3
+import tempfile
 import unittest
 from os.path import join
 
 from Acquisition import aq_base
+from OFS.Folder import Folder
+from OFS.SimpleItem import SimpleItem
 from Testing import ZopeTestCase
 from zope.testing.cleanup import cleanUp
 
@@ -64,6 +69,126 @@ class FSZSQLMethodTests(FSDVTest):
         self.assertIsNotNone(zsql.allow_simple_one_argument_traversal)
 
 
+_SHARED_ZSQL = """\
+<dtml-comment>
+connection id : sqlite
+arguments : id
+max_cache : 10
+cache_time : 60
+shared_cache : true
+</dtml-comment>
+SELECT title FROM items WHERE <dtml-sqltest id type="int">
+"""
+
+
+class SQLiteConnection(SimpleItem):
+
+    """ Database adapter stand-in running queries on SQLite.
+    """
+
+    def __init__(self, id):
+        self.id = id
+        self.queries = 0
+        self.db = sqlite3.connect(':memory:')
+        self.db.execute('CREATE TABLE items (id INTEGER, title TEXT)')
+        self.db.executemany('INSERT INTO items VALUES (?, ?)',
+                            [(1, 'One'), (2, 'Two')])
+
+    def __call__(self):
+        return self
+
+    def sql_quote__(self, value):
+        return "'%s'" % value.replace("'", "''")
+
+    def query(self, query, max_rows):
+        self.queries += 1
+        cursor = self.db.execute(query.replace('\0', ''))
+        items = [{'name': d[0], 'type': 's', 'width': 0, 'null': 1}
+                 for d in cursor.description]
+        return items, cursor.fetchmany(max_rows)
+
+
+@unittest.skipUnless(HAVE_ZSQL, 'Products.ZSQLMethods not installed.')
+class FSZSQLMethodSharedCacheTests(SecurityTest):
+
+    def setUp(self):
+        from ..FSZSQLMethod import getSharedResultCache
+
+        SecurityTest.setUp(self)
+        self.tempdir = tempfile.mkdtemp()
+        self.filepath = join(self.tempdir, 'shared.zsql')
+        with open(self.filepath, 'w') as f:
+            f.write(_SHARED_ZSQL)
+        self.cache = getSharedResultCache()
+        self.cache.clear()
+
+    def tearDown(self):
+        self.cache.clear()
+        shutil.rmtree(self.tempdir)
+        SecurityTest.tearDown(self)
+
+    def _makeOne(self, folder):
+        from ..FSZSQLMethod import FSZSQLMethod
+
+        return FSZSQLMethod('shared', self.filepath).__of__(folder)
+
+    def _makeFolder(self, id):
+        folder = Folder(id)
+        self.app._setObject(id, folder)
+        folder = self.app._getOb(id)
+        folder._setObject('sqlite', SQLiteConnection('sqlite'))
+        return folder
+
+    def test_shared_between_instances(self):
+        folder = self._makeFolder('folder')
+        self.assertTrue(self._makeOne(folder).shared_cache_)
+        self.assertEqual(self._makeOne(folder)(id=1)[0].title, 'One')
+        self.assertEqual(self._makeOne(folder)(id=1)[0].title, 'One')
+        self.assertEqual(self._makeOne(folder)(id=2)[0].title, 'Two')
+        self.assertEqual(folder.sqlite.queries, 2)
+        stats = self.cache.getStatistics()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']),
+                         (2, 1, 2))
+
+        # Another connection of the same id gets its own results.
+        other = self._makeFolder('other')
+        self._makeOne(other)(id=1)
+        self.assertEqual(other.sqlite.queries, 1)
+
+    def test_invalidateSharedCache(self):
+        folder = self._makeFolder('folder')
+        zsql = self._makeOne(folder)
+        zsql(id=1)
+        folder.sqlite.db.execute("UPDATE items SET title = 'Uno'")
+        self.assertEqual(zsql(id=1)[0].title, 'One')
+        zsql.invalidateSharedCache()
+        self.assertEqual(zsql(id=1)[0].title, 'Uno')
+        self.assertEqual(folder.sqlite.queries, 2)
+
+    def test_invalidateSharedCache_permission(self):
+        from ..FSZSQLMethod import FSZSQLMethod
+        from ..permissions import ManagePortal
+        roles = FSZSQLMethod.invalidateSharedCache__roles__
+        self.assertEqual(roles.__name__, ManagePortal)
+
+    def test_expiry_and_eviction(self):
+        folder = self._makeFolder('folder')
+        zsql = self._makeOne(folder)
+        zsql.cache_time_ = -1
+        zsql(id=1)
+        zsql(id=1)
+        self.assertEqual(folder.sqlite.queries, 2)
+
+        zsql.cache_time_ = 60
+        self.addCleanup(setattr, self.cache, 'max_size', self.cache.max_size)
+        self.cache.max_size = 1
+        zsql(id=1)
+        zsql(id=2)
+        zsql(id=1)
+        self.assertEqual(folder.sqlite.queries, 5)
+        self.assertEqual(self.cache.getStatistics()['evictions'], 2)
+
+
 @unittest.skipUnless(HAVE_ZSQL, 'Products.ZSQLMethods not installed.')
 class FSZSQLMethodCustomizationTests(SecurityTest, FSZSQLMaker):
 
@@ -130,6 +255,8 @@ class FSZSQLMethodCustomizationTests(SecurityTest, FSZSQLMaker):
 def test_suite():
     return unittest.TestSuite((
         unittest.defaultTestLoader.loadTestsFromTestCase(FSZSQLMethodTests),
+        unittest.defaultTestLoader.loadTestsFromTestCase(
+            FSZSQLMethodSharedCacheTests),
         unittest.defaultTestLoader.loadTestsFromTestCase(
             FSZSQLMethodCustomizationTests),
     ))
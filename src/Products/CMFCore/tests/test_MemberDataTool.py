@@ -23,6 +23,7 @@ from zope.interface.verify import verifyClass
 from zope.testing.cleanup import cleanUp
 
 from ..exceptions import BadRequest
+from ..interfaces import IMemberDataTool
 from ..interfaces import IMembershipTool
 from .base.security import DummyUser as BaseDummyUser
 
@@ -46,6 +47,10 @@ class DummyUserFolder(Acquisition.Implicit):
     def getUsers(self):
         return self._users.values()
 
+    def getUserById(self, id, default=None):
+        user = self._users.get(id)
+        return default if user is None else user.__of__(self)
+
 
 class DummyUser(BaseDummyUser):
 
@@ -123,6 +128,83 @@ class MemberDataToolTests(unittest.TestCase):
         self.assertEqual(info_dict['member_count'], 0)
         self.assertEqual(info_dict['orphan_count'], 0)
 
+    def test_pruneMemberData_batched(self):
+        from OFS.Folder import Folder
+
+        from ..MemberDataTool import MemberData
+        from ..MembershipTool import MembershipTool
+        folder = Folder('test')
+        folder._setObject('portal_memberdata', self._makeOne())
+        sm = getSiteManager()
+        sm.registerUtility(MembershipTool().__of__(folder), IMembershipTool)
+        folder._setObject('acl_users', DummyUserFolder())
+        tool = folder.portal_memberdata
+        tool.setIndexedProperties(('email',))
+
+        for i in range(10):
+            m = MemberData('user_%i' % i)
+            m.email = 'user_%i@example.com' % i
+            tool.registerMemberData(m, 'user_%i' % i)
+        for i in range(0, 10, 3):
+            folder.acl_users._addUser(DummyUser('user_%i' % i, '', (), ()))
+
+        info_dict = tool.getMemberDataContents()[0]
+        self.assertEqual(info_dict['member_count'], 10)
+        self.assertEqual(info_dict['orphan_count'], 6)
+
+        tool.pruneMemberDataContents(batch_size=4)
+        self.assertEqual(sorted(tool._members.keys()),
+                         ['user_0', 'user_3', 'user_6', 'user_9'])
+        self.assertEqual(tool.searchMemberIds('email', 'user_1@'), [])
+        self.assertEqual(tool.searchMemberIds('email', 'user_3@'),
+                         ['user_3'])
+        info_dict = tool.getMemberDataContents()[0]
+        self.assertEqual(info_dict['member_count'], 4)
+        self.assertEqual(info_dict['orphan_count'], 0)
+
+    def test_property_index(self):
+        from ..MemberDataTool import MemberData
+
+        tool = self._makeOne()
+        # Members without an email get the default one.
+        tool._updateProperty('email', 'nobody@localhost')
+        for id, email in (('foo', 'foo@example.org'),
+                          ('bar', 'bar@example.com'),
+                          ('baz', None)):
+            m = MemberData(id)
+            if email is not None:
+                m.email = email
+            tool.registerMemberData(m, id)
+        self.assertEqual(tool.searchMemberIds('email', 'example'), None)
+
+        tool.setIndexedProperties(['email', 'id'])
+        self.assertEqual(tool.getIndexedProperties(), ('email', 'id'))
+        self.assertEqual(tool.searchMemberIds('email', 'example'),
+                         ['bar', 'foo'])
+        self.assertEqual(tool.searchMemberIds('email', 'example.org'),
+                         ['foo'])
+        self.assertEqual(tool.searchMemberIds('email', '.c'), ['bar'])
+        self.assertEqual(tool.searchMemberIds('email', 'example', True), [])
+        self.assertEqual(tool.searchMemberIds('email', 'bar@example.com',
+                                              exact=True), ['bar'])
+        self.assertEqual(tool.searchMemberIds('username', 'ba'),
+                         ['bar', 'baz'])
+        # Empty terms also match members without a value.
+        self.assertEqual(tool.searchMemberIds('email', ''), None)
+
+        m = MemberData('baz')
+        m.email = 'baz@example.org'
+        tool.registerMemberData(m, 'baz')
+        self.assertEqual(tool.searchMemberIds('email', 'example.org'),
+                         ['baz', 'foo'])
+        tool.deleteMemberData('foo')
+        self.assertEqual(tool.searchMemberIds('email', 'example.org'),
+                         ['baz'])
+        self.assertEqual(tool.searchMemberIds('id', 'foo'), [])
+
+        tool.setIndexedProperties(['id'])
+        self.assertEqual(tool.searchMemberIds('email', 'example'), None)
+
 
 class MemberAdapterTests(unittest.TestCase):
 
@@ -170,6 +252,43 @@ class MemberAdapterTests(unittest.TestCase):
         member.notifyModified()
         self.assertIn(user.getId(), self.site.portal_memberdata._members)
 
+    def test_getProperties(self):
+        from Testing.makerequest import makerequest
+        from zope.globalrequest import clearRequest
+        from zope.globalrequest import getRequest
+        from zope.globalrequest import setRequest
+
+        from ..MemberDataTool import PROPERTY_DEFAULTS
+        user = DummyUser('bob', 'pw', ['Role'], [])
+        user.fullname = 'Bob'
+        tool = self.site.portal_memberdata
+        tool.manage_changeProperties(email='default@example.com')
+        member = self._makeOne(user, tool)
+        member._md.email = 'bob@example.com'
+        self.assertEqual(member.getProperties(('email', 'fullname',
+                                               'listed')),
+                         {'email': 'bob@example.com', 'fullname': 'Bob',
+                          'listed': False})
+        self.assertEqual(sorted(member.getProperties()),
+                         sorted(tool.propertyIds()))
+        self.assertEqual(member.getProperties(['foo'], None), {'foo': None})
+        self.assertRaises(ValueError, member.getProperties, ['foo'])
+
+        # The tool's defaults are read once per request.
+        setRequest(makerequest(self.site).REQUEST)
+        self.addCleanup(clearRequest)
+        other = self._makeOne(DummyUser('jim', 'pw', [], []), tool)
+        self.assertEqual(other.getProperty('email'), 'default@example.com')
+        self.assertEqual(member.getProperty('email'), 'bob@example.com')
+        request = getRequest()
+        defaults = getattr(request, PROPERTY_DEFAULTS)[1]
+        self.assertEqual(other.getProperty('listed'), False)
+        self.assertIs(getattr(request, PROPERTY_DEFAULTS)[1], defaults)
+
+        # Changing the tool's properties invalidates them.
+        tool.manage_changeProperties(email='new@example.com')
+        self.assertEqual(other.getProperty('email'), 'new@example.com')
+
     def test_setProperties(self):
         user = DummyUser('bob', 'pw', ['Role'], [])
         user = user.__of__(self.site.acl_users)
@@ -191,6 +310,53 @@ class MemberAdapterTests(unittest.TestCase):
         self.assertEqual(member.getProperty('login_time'),
                          DateTime('2000/02/02 00:00:00'))
 
+    def test_setMemberProperties_updates_index(self):
+        tool = self.site.portal_memberdata
+        tool.setIndexedProperties(['email'])
+        user = DummyUser('bob', 'pw', ['Role'], [])
+        member = self._makeOne(user, tool)
+        member.setMemberProperties({'email': 'bob@example.org'})
+        self.assertEqual(tool.searchMemberIds('email', 'bob@'), ['bob'])
+        member.setMemberProperties({'email': 'robert@example.org'})
+        self.assertEqual(tool.searchMemberIds('email', 'bob@'), [])
+        self.assertEqual(tool.searchMemberIds('email', 'robert'), ['bob'])
+
+    def test_searchMemberIds_without_stored_value(self):
+        from zope.component import provideAdapter
+
+        from ..MemberDataTool import MemberAdapter
+        from ..MemberDataTool import MemberData
+        from ..MembershipTool import MembershipTool
+
+        provideAdapter(MemberAdapter)
+        self.site._setObject('portal_membership', MembershipTool())
+        getSiteManager().registerUtility(self.site.portal_membership,
+                                         IMembershipTool)
+        getSiteManager().registerUtility(self.site.portal_memberdata,
+                                         IMemberDataTool)
+        tool = self.site.portal_memberdata
+        for id, email in (('bob', 'bob@example.org'), ('jim', None),
+                          ('tom', None)):
+            self.site.acl_users._addUser(DummyUser(id, 'pw', ['Role'], []))
+            m = MemberData(id)
+            if email is not None:
+                m.email = email
+            tool.registerMemberData(m, id)
+        self.site.acl_users._users['tom'].email = 'tom@example.com'
+        tool.setIndexedProperties(['email'])
+        self.assertEqual(tool.searchMemberIds('email', 'example'),
+                         ['bob', 'tom'])
+        self.assertEqual(tool.searchMemberIds('email', 'tom@example.com',
+                                              exact=True), ['tom'])
+
+        tool._updateProperty('email', 'info@example.org')
+        self.assertEqual(tool.searchMemberIds('email', 'example.org'),
+                         ['bob', 'jim', 'tom'])
+        self.assertEqual(tool.searchMemberIds('email', 'bob'), ['bob'])
+        self.assertEqual(tool.searchMemberData('email', 'info'),
+                         [{'username': 'jim', 'email': 'info@example.org'},
+                          {'username': 'tom', 'email': 'info@example.org'}])
+
     def test_setSecurityProfile(self):
         user = DummyUser('bob', 'pw', ['Role'], ['domain'])
         self.site.acl_users._addUser(user)
@@ -94,6 +94,77 @@ class MembershipToolSecurityTests(SecurityTest):
         newSecurityManager(None, acl_users.all_powerful_Oz)
         self.assertTrue(mtool.isMemberAccessAllowed('user_foo'))
 
+    def test_getAuthenticatedMember_memoized(self):
+        from Testing.makerequest import makerequest
+        from zope.globalrequest import clearRequest
+        from zope.globalrequest import setRequest
+        site = self._makeSite()
+        mtool = site.portal_membership
+        acl_users = site._setObject('acl_users', DummyUserFolder())
+        wrapped = []
+
+        def wrapUser(u, wrap_anon=0):
+            wrapped.append(u.getId())
+            return u
+        mtool.wrapUser = wrapUser
+        newSecurityManager(None, acl_users.user_foo)
+        mtool.getAuthenticatedMember()
+        mtool.getAuthenticatedMember()
+        self.assertEqual(wrapped, ['user_foo', 'user_foo'])
+
+        setRequest(makerequest(self.app).REQUEST)
+        self.addCleanup(clearRequest)
+        del wrapped[:]
+        member = mtool.getAuthenticatedMember()
+        self.assertEqual(member.getId(), 'user_foo')
+        self.assertIs(mtool.getAuthenticatedMember(), member)
+        self.assertEqual(wrapped, ['user_foo'])
+
+        # Changing the user or the credentials invalidates the member.
+        newSecurityManager(None, acl_users.user_bar)
+        self.assertEqual(mtool.getAuthenticatedMember().getId(), 'user_bar')
+        mtool.getAuthenticatedMember()
+        mtool.credentialsChanged('secret')
+        mtool.getAuthenticatedMember()
+        self.assertEqual(wrapped, ['user_foo', 'user_bar', 'user_bar'])
+
+    def test_iterMembers(self):
+        from AccessControl.userfolder import UserFolder
+        site = self._makeSite()
+        mtool = site.portal_membership
+        acl_users = site._setObject('acl_users', UserFolder())
+        for i in (3, 1, 4, 0, 2):
+            acl_users._doAddUser('user_%i' % i, 'secret', (), ())
+        acl_users.getUsers = None  # the users are not loaded
+        wrapped = []
+
+        def wrapUser(u, wrap_anon=0):
+            wrapped.append(u.getId())
+            return u
+        mtool.wrapUser = wrapUser
+
+        self.assertEqual(list(mtool.iterMemberIds(sort_on='id')),
+                         ['user_0', 'user_1', 'user_2', 'user_3', 'user_4'])
+        self.assertEqual(mtool.listMemberIds(1, 2), ['user_1', 'user_2'])
+        self.assertEqual(wrapped, [])
+        members = mtool.iterMembers(start=3, limit=5)
+        self.assertEqual([m.getId() for m in members], ['user_3', 'user_4'])
+        self.assertEqual(wrapped, ['user_3', 'user_4'])
+        self.assertEqual([m.getId() for m in mtool.listMembers(4)],
+                         ['user_4'])
+        self.assertRaises(ValueError, mtool.listMembers, sort_on='email')
+
+    def test_iterMembers_getUsers(self):
+        site = self._makeSite()
+        mtool = site.portal_membership
+        acl_users = site._setObject('acl_users', DummyUserFolder())
+        acl_users.getUsers = lambda: [acl_users.user_foo, acl_users.user_bar]
+        self.assertEqual(mtool.listMemberIds(), ['user_foo', 'user_bar'])
+        self.assertEqual(mtool.listMemberIds(sort_on='id'),
+                         ['user_bar', 'user_foo'])
+        self.assertEqual([m.getId() for m in mtool.iterMembers(1)],
+                         ['user_bar'])
+
     def test_getMemberById_nonesuch(self):
         INVALID_USER_ID = 'nonesuch'
 
@@ -214,6 +285,30 @@ class MembershipToolMemberAreaTests(SecurityTest):
             self.assertEqual(roles, ['Manager', 'Owner', 'Reviewer'])
             self.assertEqual(bool(f.acquiredRolesAreUsedBy(p)), False)
 
+    def test_createMemberAreas(self):
+        site = self._makeSite()
+        mtool = site.portal_membership
+        members = site._setObject('Members', PortalFolder('Members'))
+        acl_users = site._setObject('acl_users', DummyUserFolder())
+        newSecurityManager(None, acl_users.all_powerful_Oz)
+        ids = ['user_foo', 'user_bar', 'nonesuch']
+        mtool.setMemberareaCreationFlag()
+        self.assertEqual(mtool.createMemberAreas(ids, commit=False), ([], []))
+
+        mtool.setMemberareaCreationFlag()
+        progress = []
+        created, errors = mtool.createMemberAreas(
+            ids, batch_size=2, commit=False,
+            progress=lambda *args: progress.append(args))
+        self.assertEqual(created, ['user_foo', 'user_bar'])
+        self.assertEqual([e[0] for e in errors], ['nonesuch'])
+        self.assertIsInstance(errors[0][1], ValueError)
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+        self.assertEqual(members.user_foo.getOwner(), acl_users.user_foo)
+        self.assertEqual(members.user_bar.getPortalTypeName(), 'Folder')
+        self.assertEqual(mtool.createMemberAreas(ids[:2], commit=False),
+                         ([], []))
+
     def test_createMemberAreaCMFBTreeFolder(self):
         # Test member area creation if the toplevel "Members" folder is
         # a CMFBTreeFolder (https://bugs.launchpad.net/zope-cmf/+bug/161668)
@@ -434,6 +529,73 @@ class MembershipToolDeleteLocalRolesTests(SecurityTest):
         self.assertFalse(result)
         self.assertEqual(reindex_calls, [])
 
+    def test_recursive_from_catalog(self):
+        from ..CatalogTool import CatalogTool
+        from ..interfaces import ICatalogTool
+        mtool = self.site.portal_membership
+        mtool._catalog_local_roles = True
+        self.app._setObject('portal_catalog', CatalogTool())
+        ctool = self.app.portal_catalog
+        ctool.addIndex('path', 'PathIndex')
+        ctool.addIndex('allowedRolesAndUsers', 'KeywordIndex')
+        getSiteManager().registerUtility(ctool, ICatalogTool)
+
+        self.app._setObject('root', PortalFolder('root'))
+        root = self.app.root
+        reindexed = []
+        for path in ('a', 'a/b', 'c', 'd'):
+            parent = root.unrestrictedTraverse(path.rpartition('/')[0])
+            id = path.rpartition('/')[2]
+            ob = parent._getOb(parent._setObject(id, PortalFolder(id)))
+            ob.reindexObjectSecurity = (lambda path=path:
+                                        reindexed.append(path))
+            if path != 'c':
+                ob.manage_setLocalRoles('user_foo', ['Manager'])
+            if path != 'd':
+                ctool.catalog_object(ob, '/'.join(ob.getPhysicalPath()))
+        root.reindexObjectSecurity = lambda: reindexed.append('root')
+
+        self.assertTrue(mtool.deleteLocalRoles(root, ['user_foo'],
+                                               recursive=1))
+        self.assertFalse(root.a.get_local_roles_for_userid('user_foo'))
+        self.assertFalse(root.a.b.get_local_roles_for_userid('user_foo'))
+        # Only objects found in the catalog are visited, and reindexing
+        # 'a' covers 'a/b'.
+        self.assertTrue(root.d.get_local_roles_for_userid('user_foo'))
+        self.assertEqual(reindexed, ['a'])
+
+        self.assertFalse(mtool.deleteLocalRoles(root, ['user_foo'],
+                                                recursive=1))
+
+    def test_recursive_from_catalog_batches(self):
+        from ..CatalogTool import CatalogTool
+        from ..interfaces import ICatalogTool
+        mtool = self.site.portal_membership
+        self.app._setObject('portal_catalog', CatalogTool())
+        ctool = self.app.portal_catalog
+        ctool.addIndex('path', 'PathIndex')
+        ctool.addIndex('allowedRolesAndUsers', 'KeywordIndex')
+        getSiteManager().registerUtility(ctool, ICatalogTool)
+
+        # Savepoints are made, so don't patch instances.
+        reindexed = []
+        PortalFolder.reindexObjectSecurity = (lambda self:
+                                              reindexed.append(self.getId()))
+        self.addCleanup(delattr, PortalFolder, 'reindexObjectSecurity')
+        self.app._setObject('root', PortalFolder('root'))
+        root = self.app.root
+        a = root._getOb(root._setObject('a', PortalFolder('a')))
+        b = a._getOb(a._setObject('b', PortalFolder('b')))
+        for ob in (a, b):
+            ob.manage_setLocalRoles('user_foo', ['Manager'])
+            ctool.catalog_object(ob, '/'.join(ob.getPhysicalPath()))
+
+        self.assertTrue(mtool._deleteCatalogLocalRoles(
+            root, ['user_foo'], True, batch_size=1))
+        # The reindexing of 'a' was processed with the first batch, before
+        # the local roles of 'a/b' were deleted.
+        self.assertEqual(reindexed, ['a', 'b'])
+
 
 def test_suite():
     return unittest.TestSuite((
@@ -245,6 +245,201 @@ class PortalFolderSecurityTests(SecurityTest):
         self.assertEqual(f.listFolderContents(), [f.sub1])
         self.assertEqual(f.listDAVObjects(), [f.sub1, f.hidden_sub2])
 
+    def test_contents_methods_batched(self):
+        acl_users = self.site._setObject('acl_users', DummyUserFolder())
+        newSecurityManager(None, acl_users.all_powerful_Oz)
+        ttool = TypesTool()
+        getSiteManager().registerUtility(ttool, ITypesTool)
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+
+        f = self._makeOne('foo')
+        for id in ('a', 'b', 'c', 'd'):
+            f._setObject(id, DummyContent(id))
+        self.assertEqual(f.contentIds(b_size=2), ['a', 'b'])
+        self.assertEqual(f.contentIds(b_start=1, b_size=2), ['b', 'c'])
+        self.assertEqual(f.contentIds(b_start=3), ['d'])
+        self.assertEqual(f.contentValues(b_start=2, b_size=1), [f.c])
+        self.assertEqual(f.listFolderContents(b_start=4), [])
+
+    def test_contents_iterators(self):
+        acl_users = self.site._setObject('acl_users', DummyUserFolder())
+        newSecurityManager(None, acl_users.all_powerful_Oz)
+        ttool = TypesTool()
+        getSiteManager().registerUtility(ttool, ITypesTool)
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+
+        f = self._makeOne('foo')
+        for id in ('a', 'b', 'c', 'd'):
+            f._setObject(id, DummyContent(id))
+        f._getOb('c').title = 'C'
+        items = f.iterContentItems()
+        self.assertEqual(next(items), ('a', f.a))
+        self.assertEqual(list(f.iterContentIds(start=1, limit=2)),
+                         ['b', 'c'])
+        self.assertEqual(list(f.iterContentValues({'Title': 'C'})), [f.c])
+        self.assertEqual(list(f.iterContentValues(start=3, limit=5)), [f.d])
+
+    def test_contentIds_matches_contentItems(self):
+        ttool = TypesTool()
+        getSiteManager().registerUtility(ttool, ITypesTool)
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+        fti = FTIDATA_DUMMY[0].copy()
+        fti['id'] = 'Other Content'
+        fti['meta_type'] = 'Other'
+        ttool._setObject('Other Content', FTI(**fti))
+        # 'b' has the meta type of 'Dummy Content' but not its portal type.
+        f = self._makeOne('foo')
+        f._setObject('a', DummyContent('a'))
+        f._setObject('b', DummyContent('b'))
+        f.b.portal_type = 'Other Content'
+
+        for portal_type in ('Dummy Content', 'Other Content'):
+            filt = {'portal_type': portal_type}
+            self.assertEqual(f.contentIds(filt),
+                             [id for id, _ in f.contentItems(filt)])
+        self.assertEqual(f.contentIds({'portal_type': 'Other Content'}),
+                         ['b'])
+
+    def test_contentIds_from_meta_types(self):
+        from ..CMFBTreeFolder import CMFBTreeFolder
+
+        ttool = TypesTool()
+        getSiteManager().registerUtility(ttool, ITypesTool)
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+        f = self.site._setObject('foo', CMFBTreeFolder('foo'))
+        f._meta_type_listing = True
+        for id in ('d', 'c', 'b', 'a'):
+            f._setObject(id, DummyContent(id))
+
+        def _getOb(id, default=None):
+            raise AssertionError('%s loaded' % id)
+
+        f._getOb = _getOb
+        self.assertEqual(f.contentIds(), ['a', 'b', 'c', 'd'])
+        self.assertEqual(f.contentIds({'portal_type': 'Dummy Content'},
+                                      b_start=1, b_size=2), ['b', 'c'])
+        self.assertEqual(f.contentIds({'portal_type': 'Other'}), [])
+        self.assertEqual(list(f.iterContentIds(start=3)), ['d'])
+
+        # Another type sharing the meta type requires checking objects.
+        fti = FTIDATA_DUMMY[0].copy()
+        fti['id'] = 'Other Content'
+        ttool._setObject('Other Content', FTI(**fti))
+        self.assertRaises(AssertionError, f.contentIds,
+                          {'portal_type': 'Dummy Content'})
+        del f._getOb
+        self.assertEqual(f.contentIds({'portal_type': 'Dummy Content'}),
+                         ['a', 'b', 'c', 'd'])
+
+    def test_contents_methods_from_catalog(self):
+        from ..CatalogTool import CatalogTool
+
+        acl_users = self.site._setObject('acl_users', DummyUserFolder())
+        newSecurityManager(None, acl_users.all_powerful_Oz)
+        ttool = TypesTool()
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+        ctool = CatalogTool()
+        ctool.addIndex('path', 'PathIndex')
+        ctool.addIndex('getId', 'FieldIndex')
+        ctool.addIndex('portal_type', 'FieldIndex')
+        ctool.addIndex('Subject', 'KeywordIndex')
+        sm = getSiteManager()
+        sm.registerUtility(ttool, ITypesTool)
+        sm.registerUtility(ctool, ICatalogTool)
+
+        f = self._makeOne('foo')
+        f._catalog_listing = True
+        sub = f._getOb(f._setObject('sub', self._getTargetClass()('sub')))
+        for id in ('d', 'c', 'b', 'a'):
+            ob = f._getOb(f._setObject(id, DummyContent(id, catalog=1)))
+            ob.subject = (id == 'c') and ('x',) or ()
+            ob.title = id.upper()
+            ctool.catalog_object(ob, '/'.join(ob.getPhysicalPath()))
+        sub._setObject('e', DummyContent('e', catalog=1))
+        ctool.catalog_object(sub.e, '/'.join(sub.e.getPhysicalPath()))
+        # Not cataloged, so not listed.
+        f._setObject('z', DummyContent('z'))
+
+        self.assertEqual(f.contentIds(), ['d', 'c', 'b', 'a'])
+        self.assertEqual(f.contentIds(b_start=1, b_size=2), ['c', 'b'])
+        self.assertEqual(f.contentIds(b_size=0), [])
+        self.assertEqual(list(f.contentValues(b_size=1)), [f.d])
+        self.assertEqual(f.contentItems({'Subject': 'x'})[0], ('c', f.c))
+        self.assertEqual(f.contentIds({'portal_type': 'Other'}), [])
+        # Title can't be expressed as a catalog query.
+        self.assertEqual(f.contentIds({'Title': '[BD]'}), ['d', 'b'])
+        self.assertEqual(f.contentIds({'Title': '[BD]'}, b_start=1), ['b'])
+        self.assertEqual(f.contentIds({'Title': '[BD]'}, b_size=0), [])
+        self.assertEqual(f.listFolderContents(b_size=3), [f.d, f.c, f.b])
+
+        # The order is that of the folder.
+        f._catalog_listing = False
+        self.assertEqual([id for id in f.contentIds() if id != 'z'],
+                         ['d', 'c', 'b', 'a'])
+        f._catalog_listing = True
+
+        # Objects removed without uncataloging them are skipped.
+        f._delOb('c')
+        f._objects = tuple(i for i in f._objects if i['id'] != 'c')
+        self.assertEqual(f.contentIds(), ['d', 'b', 'a'])
+        self.assertEqual(list(f.contentValues()), [f.d, f.b, f.a])
+        self.assertEqual(f.contentIds({'Title': '[BCD]'}), ['d', 'b'])
+
+    def test_listFolderContents_from_catalog(self):
+        from ..CatalogTool import CatalogTool
+
+        acl_users = self.site._setObject('acl_users', DummyUserFolder())
+        newSecurityManager(None, acl_users.all_powerful_Oz)
+        ttool = TypesTool()
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+        ctool = CatalogTool()
+        ctool.addIndex('path', 'PathIndex')
+        ctool.addIndex('allowedRolesAndUsers', 'KeywordIndex')
+        ctool.addIndex('expires', 'DateIndex')
+        sm = getSiteManager()
+        sm.registerUtility(ttool, ITypesTool)
+        sm.registerUtility(ctool, ICatalogTool)
+
+        f = self._makeOne('foo')
+        for id in ('b', 'a'):
+            ob = f._getOb(f._setObject(id, DummyContent(id, catalog=1)))
+            ob.expires = DateTime('2000/01/01')
+            ctool.catalog_object(ob, '/'.join(ob.getPhysicalPath()))
+
+        def searchResults(**kw):
+            raise AssertionError('inactive content filtered')
+
+        ctool.searchResults = searchResults
+        expected = f.listFolderContents()
+        self.assertEqual(expected, [f.b, f.a])
+        f._catalog_listing = True
+        self.assertEqual(f.listFolderContents(), expected)
+
+    def test_contentIds_from_catalog_sorted(self):
+        from ..CatalogTool import CatalogTool
+        from ..CMFBTreeFolder import CMFBTreeFolder
+
+        ttool = TypesTool()
+        ttool._setObject('Dummy Content', FTI(**FTIDATA_DUMMY[0].copy()))
+        ctool = CatalogTool()
+        ctool.addIndex('path', 'PathIndex')
+        sm = getSiteManager()
+        sm.registerUtility(ttool, ITypesTool)
+        sm.registerUtility(ctool, ICatalogTool)
+
+        f = self.site._setObject('foo', CMFBTreeFolder('foo'))
+        f._catalog_listing = True
+        for id in ('d', 'c', 'b', 'a'):
+            ob = f._getOb(f._setObject(id, DummyContent(id, catalog=1)))
+            ctool.catalog_object(ob, '/'.join(ob.getPhysicalPath()))
+
+        def objectIds(spec=None):
+            raise AssertionError('all IDs walked')
+
+        f.objectIds = objectIds
+        self.assertEqual(f.contentIds(), ['a', 'b', 'c', 'd'])
+        self.assertEqual(f.contentIds(b_start=1, b_size=2), ['b', 'c'])
+
     def test_deletePropagation(self):
         acl_users = self.site._setObject('acl_users', DummyUserFolder())
         newSecurityManager(None, acl_users.all_powerful_Oz)
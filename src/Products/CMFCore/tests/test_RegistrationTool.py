@@ -15,11 +15,28 @@
 
 import unittest
 
+from zope.component import getSiteManager
 from zope.interface.verify import verifyClass
+from zope.testing.cleanup import cleanUp
+
+
+class FakeMembershipTool:
+
+    def __init__(self):
+        self.members = {}
+
+    def getMemberById(self, id):
+        return self.members.get(id)
+
+    def addMember(self, id, password, roles, domains, properties=None):
+        self.members[id] = (id, password, roles)
 
 
 class RegistrationToolTests(unittest.TestCase):
 
+    def tearDown(self):
+        cleanUp()
+
     def _makeOne(self):
         from ..RegistrationTool import RegistrationTool
 
@@ -34,3 +51,27 @@ class RegistrationToolTests(unittest.TestCase):
     def test_generatePassword(self):
         rtool = self._makeOne()
         self.assertGreaterEqual(len(rtool.generatePassword()), 5)
+
+    def test_addMembers(self):
+        from AccessControl import Unauthorized
+
+        from ..interfaces import IMembershipTool
+
+        mtool = FakeMembershipTool()
+        getSiteManager().registerUtility(mtool, IMembershipTool)
+        rtool = self._makeOne()
+        rtool.testPasswordValidity = lambda password, confirm=None: None
+        progress = []
+        records = [{'id': 'foo', 'password': 'secret'},
+                   {'id': 'foo', 'password': 'secret'},
+                   {'id': 'bar', 'password': 'secret', 'roles': ['Manager']},
+                   {'id': 'baz', 'password': 'secret', 'roles': ['Member']}]
+        created, errors = rtool.addMembers(
+            records, batch_size=3, commit=False,
+            progress=lambda *args: progress.append(args))
+        self.assertEqual(created, ['foo', 'baz'])
+        self.assertEqual([e[0] for e in errors], records[1:3])
+        self.assertIsInstance(errors[0][1], ValueError)
+        self.assertIsInstance(errors[1][1], Unauthorized)
+        self.assertEqual(progress, [(3, 4), (4, 4)])
+        self.assertEqual(mtool.members['baz'], ('baz', 'secret', ['Member']))
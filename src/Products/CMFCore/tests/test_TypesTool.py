@@ -52,6 +52,17 @@ class TypesToolTests(unittest.TestCase):
         from ..interfaces import IActionProvider
         verifyClass(IActionProvider, self._getTargetClass())
 
+    def test_TypeInformation__checkConstructionAllowed(self):
+        from zope.testing.cleanup import cleanUp
+
+        from ..TypesTool import TypeInformation
+        ti = TypeInformation('Foo')
+        self.assertTrue(ti._checkConstructionAllowed(None))
+        self.addCleanup(cleanUp)
+        getSiteManager().registerUtility(
+            DummyWorkflowTool(DummyWorkflow(False)), IWorkflowTool)
+        self.assertFalse(ti._checkConstructionAllowed(None))
+
     def test_instance_conforms_to_ITypesTool(self):
         from zope.interface.verify import verifyObject
 
@@ -83,6 +94,35 @@ class TypesToolTests(unittest.TestCase):
         self.assertEqual(ti._action_info, 'fake_info')
         self.assertEqual(ti._action_obj, dummy)
 
+    def test_type_index(self):
+        from ..TypesTool import FactoryTypeInformation as FTI
+
+        tool = self._makeOne()
+        tool._setObject('b', FTI('b'))
+        tool._setObject('a', FTI('a'))
+
+        self.assertEqual([ti.getId() for ti in tool.listTypeInfo()],
+                         ['b', 'a'])
+        self.assertEqual(tool.listContentTypes(), ['a', 'b'])
+        self.assertTrue(tool.getTypeInfo('a').aq_parent is tool)
+        self.assertIsNone(tool.getTypeInfo('c'))
+
+        tool._setObject('c', FTI('c'))
+        self.assertEqual(tool.listContentTypes(), ['a', 'b', 'c'])
+        self.assertEqual(tool.getTypeInfo('c').getId(), 'c')
+
+        tool.moveObjectsToTop(['c'])
+        self.assertEqual([ti.getId() for ti in tool.listTypeInfo()],
+                         ['c', 'b', 'a'])
+
+        tool._delObject('b')
+        self.assertEqual(tool.listContentTypes(), ['a', 'c'])
+        self.assertIsNone(tool.getTypeInfo('b'))
+
+        # The returned list is a copy.
+        tool.listContentTypes().append('d')
+        self.assertEqual(tool.listContentTypes(), ['a', 'c'])
+
 
 class TypesToolFunctionalTests(SecurityTest):
 
@@ -127,6 +167,81 @@ class TypesToolFunctionalTests(SecurityTest):
         self.assertIn('Scriptable Type Information', meta_types)
         self.assertIn('Factory-based Type Information', meta_types)
 
+    def test_isConstructionAllowed_memoized_on_request(self):
+        from AccessControl.SecurityManagement import newSecurityManager
+        from Testing.makerequest import makerequest
+        from zope.component import getSiteManager
+        from zope.component.interfaces import IFactory
+        from zope.globalrequest import clearRequest
+        from zope.globalrequest import setRequest
+
+        from ..TypesTool import FactoryTypeInformation as FTI
+        from .base.dummy import DummyFolder
+
+        class CountingFolder(DummyFolder):
+            calls = 0
+
+            def all_meta_types(self):
+                self.calls += 1
+                return [{'name': 'Other', 'permission': 'Manage portal'},
+                        {'name': 'Dummy', 'permission': 'View'}]
+
+        getSiteManager().registerUtility(lambda id: None, IFactory,
+                                         'cmf.dummy')
+        site = self._makeSite().__of__(self.app)
+        tool = self._makeOne().__of__(site)
+        for i in range(100):
+            tool._setObject('T%03d' % i, FTI('T%03d' % i, factory='cmf.dummy',
+                                             content_meta_type='Dummy'))
+        folder = CountingFolder('folder').__of__(site)
+        infos = tool.listTypeInfo()
+
+        self.assertTrue(all(ti.isConstructionAllowed(folder) for ti in infos))
+        self.assertEqual(folder.calls, 100)
+
+        setRequest(makerequest(self.app).REQUEST)
+        try:
+            for ti in infos + infos:
+                self.assertTrue(ti.isConstructionAllowed(folder))
+            self.assertEqual(folder.calls, 101)
+
+            # Results depend on the user.
+            newSecurityManager(None, site.acl_users.all_powerful_Oz)
+            self.assertTrue(infos[0].isConstructionAllowed(folder))
+            # 101 type checks and the meta types of the folder
+            self.assertEqual(len(self._getChecks()), 102)
+        finally:
+            clearRequest()
+
+    def test_constructInstance_not_memoized(self):
+        from AccessControl import Unauthorized
+        from Testing.makerequest import makerequest
+        from zope.globalrequest import clearRequest
+        from zope.globalrequest import setRequest
+
+        from ..TypesTool import FactoryTypeInformation as FTI
+        from .base.dummy import DummyFolder
+        site = self._makeSite().__of__(self.app)
+        tool = self._makeOne().__of__(site)
+        tool._setObject('Dummy', FTI('Dummy', factory='cmf.dummy'))
+        ti = tool.Dummy
+        folder = DummyFolder('folder').__of__(site)
+        results = [True, False]
+        ti._checkConstructionAllowed = lambda container: results.pop(0)
+
+        setRequest(makerequest(self.app).REQUEST)
+        self.addCleanup(clearRequest)
+        self.assertTrue(ti.isConstructionAllowed(folder))
+        # E.g. a local role was revoked since.
+        self.assertRaises(Unauthorized, ti.constructInstance, folder, 'foo')
+        self.assertTrue(ti.isConstructionAllowed(folder))
+
+    def _getChecks(self):
+        from zope.globalrequest import getRequest
+
+        from ..TypesTool import CONSTRUCTION_CHECKS
+        return getattr(getRequest(), CONSTRUCTION_CHECKS)
+
     def test_constructContent_simple_FTI(self):
         from AccessControl.SecurityManagement import newSecurityManager
         from AccessControl.SecurityManager import setSecurityPolicy
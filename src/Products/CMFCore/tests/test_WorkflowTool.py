@@ -26,11 +26,14 @@ from zope.testing.cleanup import cleanUp
 from ..interfaces import IActionRaisedExceptionEvent
 from ..interfaces import IActionSucceededEvent
 from ..interfaces import IActionWillBeInvokedEvent
+from ..interfaces import ICatalogTool
 from ..interfaces import IContentish
+from ..interfaces import IIndexableWorkflowDefinition
 from ..interfaces import ITypesTool
 from ..interfaces import IWorkflowAware
 from ..interfaces import IWorkflowDefinition
 from ..testing import TraversingEventZCMLLayer
+from ..WorkflowCore import WorkflowException
 
 
 class Dummy(SimpleItem):
@@ -159,6 +162,76 @@ class DummyTypesTool(SimpleItem):
         return None
 
 
+class DummyMappingWorkflow(DummyWorkflow):
+
+    def updateRoleMappingsFor(self, ob):
+        ob.updated = ob.updated + 1
+        return True
+
+
+class DummyIndexedContent(DummyContent):
+
+    updated = 0
+    reindexed = 0
+
+    def reindexObject(self, idxs=[]):
+        self.reindexed = self.reindexed + 1
+
+
+@implementer(IIndexableWorkflowDefinition)
+class DummyIndexableWorkflow(DummyWorkflow):
+
+    local_security = True
+
+    def getCatalogVariablesFor(self, ob):
+        raise AssertionError('values computed')
+
+    def getCatalogVariableNames(self):
+        return ('dummy',)
+
+    def changesLocalSecurityOnly(self):
+        return self.local_security
+
+    def doActionFor(self, ob, action, *args, **kw):
+        DummyWorkflow.doActionFor(self, ob, action, *args, **kw)
+        if action == 'hide':
+            ob._View_Permission = ('Manager',)
+
+
+class DummyReindexedContent(DummyContent):
+
+    def __init__(self, id):
+        DummyContent.__init__(self, id)
+        self.reindexed = []
+        self.security_reindexed = 0
+
+    def reindexObject(self, idxs=[]):
+        self.reindexed.append(idxs)
+
+    def reindexObjectSecurity(self):
+        self.security_reindexed = self.security_reindexed + 1
+
+
+class DummyBrain:
+
+    def __init__(self, path):
+        self._path = path
+
+    def getPath(self):
+        return self._path
+
+
+class DummyCatalog(SimpleItem):
+
+    def __init__(self, paths):
+        self._paths = paths
+        self.queries = []
+
+    def unrestrictedSearchResults(self, **kw):
+        self.queries.append(kw)
+        return [DummyBrain(path) for path in self._paths]
+
+
 class WorkflowToolTests(unittest.TestCase):
 
     layer = TraversingEventZCMLLayer
@@ -302,6 +375,31 @@ class WorkflowToolTests(unittest.TestCase):
         tool.setDefaultChain('a, b')
         self.assertEqual(tool.getDefaultChain(), tool.getChainFor(dummy))
 
+    def test_getWorkflowsFor_cached(self):
+        from Acquisition import aq_base
+        from Acquisition import aq_parent
+
+        tool = self._makeWithTypesAndChain()
+        dummy = DummyContent('dummy')
+
+        wfs = tool.getWorkflowsFor(dummy)
+        self.assertEqual([wf.getId() for wf in wfs], ['a', 'b'])
+        self.assertTrue(aq_base(aq_parent(wfs[0])) is aq_base(tool))
+        self.assertEqual(list(tool._v_workflow_chains), [('a', 'b')])
+
+        tool.setChainForPortalTypes(('Dummy Content',), ('b',))
+        wfs = tool.getWorkflowsFor(dummy)
+        self.assertEqual([wf.getId() for wf in wfs], ['b'])
+
+        tool._delObject('b')
+        self.assertIsNone(tool._v_workflow_chains)
+        self.assertEqual(tool.getWorkflowsFor(dummy), [])
+
+        tool._setObject('b', DummyWorkflow('b'))
+        self.assertIsNone(tool._v_workflow_chains)
+        wfs = tool.getWorkflowsFor(dummy)
+        self.assertEqual([wf.getId() for wf in wfs], ['b'])
+
     def test_getCatalogVariablesFor(self):
         tool = self._makeWithTypesAndChain()
         dummy = DummyContent('dummy')
@@ -332,6 +430,166 @@ class WorkflowToolTests(unittest.TestCase):
         self.assertTrue(tool.a.didAction('action'))
         self.assertFalse(tool.b.didAction('action'))
 
+    def test_doActionFor_reindexes_security_if_changed(self):
+        tool = self._makeOne()
+        tool._setObject('a', DummyIndexableWorkflow('a'))
+        tool = tool.__of__(self._makeRoot())
+        tool.setChainForPortalTypes(('Dummy Content',), ('a',))
+        tool.a.setKnownActions(('edit', 'hide'))
+        dummy = DummyReindexedContent('dummy')
+
+        tool.doActionFor(dummy, 'edit')
+        self.assertEqual(dummy.reindexed, [['dummy']])
+        self.assertEqual(dummy.security_reindexed, 0)
+
+        tool.doActionFor(dummy, 'hide')
+        self.assertEqual(dummy.reindexed, [['dummy'], ['dummy']])
+        self.assertEqual(dummy.security_reindexed, 1)
+
+        tool.doActionFor(dummy, 'hide')
+        self.assertEqual(dummy.security_reindexed, 1)
+
+    def test_doActionFor_reindexes_security_by_default(self):
+        tool = self._makeOne()
+        tool._setObject('a', DummyIndexableWorkflow('a'))
+        tool._setObject('b', DummyWorkflow('b'))
+        tool = tool.__of__(self._makeRoot())
+        tool.a.setKnownActions(('edit',))
+        tool.b.setKnownActions(('edit',))
+        dummy = DummyReindexedContent('dummy')
+
+        # The workflow may change the security of other objects.
+        tool.a.local_security = False
+        tool.setChainForPortalTypes(('Dummy Content',), ('a',))
+        tool.doActionFor(dummy, 'edit')
+        self.assertEqual(dummy.security_reindexed, 1)
+
+        # Workflows not declaring anything.
+        tool.setChainForPortalTypes(('Dummy Content',), ('b',))
+        tool.doActionFor(dummy, 'edit')
+        self.assertEqual(dummy.security_reindexed, 2)
+
+        tool.a.local_security = True
+        tool.setChainForPortalTypes(('Dummy Content',), ('a', 'b'))
+        tool.doActionFor(dummy, 'edit')
+        self.assertEqual(dummy.security_reindexed, 3)
+
+    def test_doActionForMany(self):
+        tool = self._makeOne()
+        tool._setObject('a', DummyIndexableWorkflow('a'))
+        root = self._makeRoot()
+        tool = tool.__of__(root)
+        tool.setChainForPortalTypes(('Dummy Content',), ('a',))
+        tool.a.setKnownActions(('hide',))
+        for id in ('parent', 'child', 'parent2'):
+            root._setObject(id, DummyReindexedContent(id),
+                            suppress_events=True)
+        parent = root.parent
+        child = root.child
+        parent2 = root.parent2
+        # Make 'child' a subobject of 'parent' by path.
+        path = parent.getPhysicalPath() + ('child',)
+        child.getPhysicalPath = lambda: path
+        other = DummyNotReallyContent('other')
+
+        results, errors = tool.doActionForMany(
+            [parent, other, child, parent2], 'hide')
+
+        self.assertEqual([ob for ob, res in results],
+                         [parent, child, parent2])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0][0] is other)
+        self.assertIsInstance(errors[0][1], WorkflowException)
+        self.assertEqual(tool.a.didAction('hide'), [parent, child, parent2])
+        for ob in parent, child, parent2:
+            self.assertEqual(ob.reindexed, [['dummy']])
+        self.assertEqual(parent.security_reindexed, 1)
+        self.assertEqual(child.security_reindexed, 0)
+        self.assertEqual(parent2.security_reindexed, 1)
+
+    def test_doActionForMany_rolls_back_failed_action(self):
+        import transaction
+        from ZODB.DB import DB
+        from ZODB.MappingStorage import MappingStorage
+
+        class FailingWorkflow(DummyIndexableWorkflow):
+
+            def doActionFor(self, ob, action, *args, **kw):
+                ob.state = action
+                if ob.getId() == 'bad':
+                    raise ValueError('failed')
+
+        tool = self._makeOne()
+        tool._setObject('a', FailingWorkflow('a'))
+        tool = tool.__of__(self._makeRoot())
+        tool.setChainForPortalTypes(('Dummy Content',), ('a',))
+        tool.a.setKnownActions(('hide',))
+
+        db = DB(MappingStorage())
+        try:
+            conn = db.open()
+            root = conn.root()
+            for id in ('one', 'bad', 'two'):
+                root[id] = DummyReindexedContent(id)
+                root[id].state = 'new'
+            transaction.commit()
+
+            objects = [root['one'], root['bad'], root['two']]
+            results, errors = tool.doActionForMany(objects, 'hide')
+
+            self.assertEqual([ob for ob, res in results],
+                             [root['one'], root['two']])
+            self.assertEqual(len(errors), 1)
+            self.assertTrue(errors[0][0] is root['bad'])
+            self.assertIsInstance(errors[0][1], ValueError)
+            self.assertEqual(root['one'].state, 'hide')
+            self.assertEqual(root['bad'].state, 'new')
+            self.assertEqual(root['two'].state, 'hide')
+            self.assertEqual(root['bad'].reindexed, [])
+        finally:
+            transaction.abort()
+            db.close()
+
+    def test_doActionForMany_without_savepoints(self):
+        import transaction
+
+        class NoSavepointDataManager:
+
+            transaction_manager = transaction.manager
+
+            def abort(self, txn):
+                pass
+
+            def sortKey(self):
+                return 'nosavepoint'
+
+        class FailingWorkflow(DummyIndexableWorkflow):
+
+            def doActionFor(self, ob, action, *args, **kw):
+                raise ValueError('failed')
+
+        tool = self._makeOne()
+        tool._setObject('a', FailingWorkflow('a'))
+        tool = tool.__of__(self._makeRoot())
+        tool.setChainForPortalTypes(('Dummy Content',), ('a',))
+        tool.a.setKnownActions(('hide',))
+        transaction.get().join(NoSavepointDataManager())
+        try:
+            # The action can't be rolled back, so its error is raised.
+            self.assertRaises(ValueError, tool.doActionForMany,
+                              [DummyContent('dummy')], 'hide')
+        finally:
+            transaction.abort()
+
+    def test_getCatalogVariableNamesFor(self):
+        tool = self._makeWithTypesAndChain()
+        tool._setObject('c', DummyIndexableWorkflow('c'))
+        dummy = DummyContent('dummy')
+
+        self.assertEqual(tool.getCatalogVariableNamesFor(dummy), ['dummy'])
+        tool.setChainForPortalTypes(('Dummy Content',), ('c',))
+        self.assertEqual(tool.getCatalogVariableNamesFor(dummy), ['dummy'])
+
     def test_notifyCreated(self):
         tool = self._makeWithTypesAndChain()
 
@@ -438,6 +696,87 @@ class WorkflowToolTests(unittest.TestCase):
         self.assertEqual(ob.workflow_history['a'][0], dummy_status0)
         self.assertEqual(ob.workflow_history['a'][1], dummy_status1)
 
+    def _makeSiteWithContent(self, count):
+        from OFS.Application import Application
+        from OFS.Folder import Folder
+
+        from ..WorkflowTool import WorkflowTool
+
+        app = Application()
+        app._setObject('site', Folder('site'))
+        site = app.site
+        getSiteManager().registerUtility(DummyTypesTool(), ITypesTool)
+        site._setObject('portal_workflow', WorkflowTool())
+        tool = site.portal_workflow
+        tool._setObject('a', DummyMappingWorkflow('a'))
+        tool.setChainForPortalTypes(('Dummy Content',), ('a',))
+        paths = []
+        for i in range(count):
+            id = 'ob%02d' % i
+            site._setObject(id, DummyIndexedContent(id),
+                            suppress_events=True)
+            paths.append('/site/%s' % id)
+        catalog = DummyCatalog(paths)
+        getSiteManager().registerUtility(catalog, ICatalogTool)
+        return site, tool, catalog
+
+    def test_updateRoleMappingsInBatches(self):
+        site, tool, catalog = self._makeSiteWithContent(5)
+        progress = []
+
+        count = tool.updateRoleMappingsInBatches(
+            batch_size=2, commit=False,
+            progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(count, 5)
+        self.assertEqual(catalog.queries, [{'portal_type': ['Dummy Content']}])
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        for ob in site.objectValues('Dummy'):
+            self.assertEqual(ob.updated, 1)
+            self.assertEqual(ob.reindexed, 1)
+        self.assertIsNone(tool._role_mappings_cursor)
+
+    def test_updateRoleMappingsInBatches_resumes(self):
+        site, tool, catalog = self._makeSiteWithContent(5)
+        tool._role_mappings_cursor = (('a',), '/site/ob02')
+
+        count = tool.updateRoleMappingsInBatches(batch_size=2, commit=False)
+
+        self.assertEqual(count, 2)
+        self.assertEqual([ob.updated for ob in site.objectValues('Dummy')],
+                         [0, 0, 0, 1, 1])
+
+    def test_updateRoleMappingsInBatches_other_workflow(self):
+        site, tool, catalog = self._makeSiteWithContent(2)
+        tool._setObject('b', DummyMappingWorkflow('b'))
+
+        count = tool.updateRoleMappingsInBatches(('b',), commit=False)
+
+        self.assertEqual(count, 0)
+        self.assertEqual(catalog.queries, [])
+
+    def test_updateRoleMappingsInBatches_wf_ids_string(self):
+        site, tool, catalog = self._makeSiteWithContent(2)
+        tool._setObject('ab', DummyMappingWorkflow('ab'))
+
+        self.assertEqual(list(tool._getRoleMappingWorkflows('ab')), ['ab'])
+        self.assertEqual(tool.updateRoleMappingsInBatches('ab'), 0)
+        self.assertEqual(tool.updateRoleMappingsInBatches('a'), 2)
+
+    def test_updateRoleMappings_console_script(self):
+        from io import StringIO
+
+        from ..scripts.updaterolemappings import run
+
+        site, tool, catalog = self._makeSiteWithContent(3)
+        tool._role_mappings_cursor = (('a',), '/site/ob01')
+        out = StringIO()
+        self.assertEqual(run(site, batch_size=2, restart=True, out=out), 3)
+        self.assertEqual(out.getvalue(),
+                         '2/3 object(s) processed.\n'
+                         '3/3 object(s) processed.\n'
+                         '3 object(s) updated.\n')
+
     def xxx_test_updateRoleMappings(self):
         """
             Build a tree of objects, invoke tool.updateRoleMappings,
@@ -446,6 +785,133 @@ class WorkflowToolTests(unittest.TestCase):
         """
 
 
+class WorkflowHistoryTests(unittest.TestCase):
+
+    def _makeOne(self, records=(), bucket_size=3):
+        from ..WorkflowTool import WorkflowHistory
+
+        return WorkflowHistory(records, bucket_size)
+
+    def test_sequence(self):
+        history = self._makeOne(range(8))
+
+        self.assertEqual(len(history), 8)
+        self.assertEqual(len(history._buckets), 2)
+        self.assertEqual(history._head, (6, 7))
+        history = self._makeOne(range(6))
+        self.assertEqual(len(history._buckets), 1)
+        self.assertEqual(history._head, (3, 4, 5))
+        history.append(6)
+        self.assertEqual(len(history._buckets), 2)
+        self.assertEqual(history._head, (6,))
+        history.append(7)
+        self.assertEqual(tuple(history), tuple(range(8)))
+        self.assertEqual(list(reversed(history)), list(range(7, -1, -1)))
+        self.assertEqual([history[i] for i in range(-8, 8)],
+                         list(range(8)) * 2)
+        self.assertEqual(history[2:5], (2, 3, 4))
+        self.assertEqual(history + (8,), tuple(range(9)))
+        self.assertRaises(IndexError, history.__getitem__, 8)
+        self.assertRaises(IndexError, history.__getitem__, -9)
+
+    def test_tuple_compatibility(self):
+        history = self._makeOne((1, 2, 1, 3, 1))
+
+        self.assertEqual(history, (1, 2, 1, 3, 1))
+        self.assertEqual((1, 2, 1, 3, 1), history)
+        self.assertEqual(history, self._makeOne((1, 2, 1, 3, 1), 2))
+        self.assertNotEqual(history, (1, 2, 1, 3))
+        self.assertNotEqual(history, [1, 2, 1, 3, 1])
+        self.assertEqual(history.index(3), 3)
+        self.assertEqual(history.index(1, 1), 2)
+        self.assertRaises(ValueError, history.index, 4)
+        self.assertEqual(history.count(1), 3)
+        self.assertEqual(history.count(4), 0)
+
+    def test_empty(self):
+        history = self._makeOne()
+
+        self.assertFalse(history)
+        self.assertEqual(tuple(history), ())
+        self.assertRaises(IndexError, history.__getitem__, -1)
+
+    def test_latest_record_does_not_load_buckets(self):
+        import transaction
+        from ZODB.DB import DB
+        from ZODB.MappingStorage import MappingStorage
+
+        db = DB(MappingStorage())
+        try:
+            conn = db.open()
+            conn.root()['history'] = self._makeOne(range(9))
+            transaction.commit()
+            conn.close()
+
+            conn = db.open()
+            conn.cacheMinimize()
+            history = conn.root()['history']
+            self.assertEqual(history[-1], 8)
+            self.assertEqual(len(history), 9)
+            for bucket in history._buckets:
+                self.assertIsNone(bucket._p_changed)
+
+            history.append(9)
+            transaction.commit()
+            for bucket in history._buckets[:2]:
+                self.assertIsNone(bucket._p_changed)
+            self.assertEqual(tuple(history), tuple(range(10)))
+            conn.close()
+        finally:
+            transaction.abort()
+            db.close()
+
+    def test_BucketedWorkflowStatus(self):
+        from ..WorkflowTool import BucketedWorkflowStatus
+        from ..WorkflowTool import DefaultWorkflowStatus
+        from ..WorkflowTool import WorkflowHistory
+
+        ob = DummyContent('dummy')
+        ob.workflow_history = {'a': ('old',)}
+        wf = DummyWorkflow('a')
+
+        BucketedWorkflowStatus(ob, wf).set('new')
+        history = ob.workflow_history['a']
+        self.assertIsInstance(history, WorkflowHistory)
+        self.assertEqual(tuple(history), ('old', 'new'))
+
+        status = DefaultWorkflowStatus(ob, wf)
+        status.set('newer')
+        self.assertTrue(ob.workflow_history['a'] is history)
+        self.assertEqual(status.get(), 'newer')
+        self.assertEqual(len(history), 3)
+
+    def test_bucketedhistory_zcml(self):
+        from zope.component import getMultiAdapter
+        from zope.configuration.xmlconfig import string
+
+        from ..interfaces import IWorkflowStatus
+        from ..WorkflowTool import BucketedWorkflowStatus
+        from ..WorkflowTool import WorkflowHistory
+
+        self.addCleanup(cleanUp)
+        string("""
+            <configure xmlns="http://namespaces.zope.org/zope">
+              <include package="Products.Five" file="meta.zcml" />
+              <include package="Products.CMFCore" file="tool.zcml" />
+              <includeOverrides
+                  package="Products.CMFCore" file="bucketedhistory.zcml" />
+            </configure>""")
+
+        ob = DummyContent('dummy')
+        status = getMultiAdapter((ob, DummyWorkflow('a')), IWorkflowStatus)
+        self.assertIsInstance(status, BucketedWorkflowStatus)
+        status.set('new')
+        self.assertIsInstance(ob.workflow_history['a'], WorkflowHistory)
+        self.assertEqual(ob.workflow_history['a'], ('new',))
+
+
 def test_suite():
     return unittest.TestSuite((
-        unittest.defaultTestLoader.loadTestsFromTestCase(WorkflowToolTests),))
+        unittest.defaultTestLoader.loadTestsFromTestCase(WorkflowToolTests),
+        unittest.defaultTestLoader.loadTestsFromTestCase(WorkflowHistoryTests),
+    ))
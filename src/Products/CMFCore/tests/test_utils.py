@@ -128,6 +128,35 @@ class CoreUtilsTests(unittest.TestCase):
         self.assertEqual(obj.REQUEST.RESPONSE.getHeader('Last-Modified'),
                          _FILE_RFC_DATE)
 
+    def test__parseHTTPDate(self):
+        from ..utils import _parseHTTPDate
+
+        self.assertEqual(_parseHTTPDate('Sun, 06 Nov 1994 08:49:37 GMT'),
+                         784111777)
+        self.assertEqual(_parseHTTPDate('Sunday, 06-Nov-94 08:49:37 GMT'),
+                         784111777)
+        self.assertEqual(_parseHTTPDate('Sun, 06 Nov 1994 10:49:37 +0200'),
+                         784111777)
+        self.assertEqual(
+            _parseHTTPDate('Sun, 06 Nov 1994 08:49:37 GMT; length=42'),
+            784111777)
+        # Formats only understood by DateTime
+        self.assertEqual(_parseHTTPDate('1994/11/06 08:49:37 GMT'),
+                         784111777)
+        self.assertEqual(_parseHTTPDate('Fri, 37 Feb 3121 29:64:46'), None)
+        self.assertEqual(_parseHTTPDate('garbage'), None)
+
+    def test__parseETags(self):
+        from ..utils import _parsed_etags
+        from ..utils import _parseETags
+
+        _parsed_etags.clear()
+        self.assertEqual(_parseETags('"abc", "def","xyz"'),
+                         ('abc', 'def', 'xyz'))
+        self.assertEqual(_parseETags('*'), ('*',))
+        self.assertEqual(_parsed_etags['*'], ('*',))
+        _parsed_etags.clear()
+
     def test__FSCacheHeaders(self):
         from ..utils import _FSCacheHeaders
 
@@ -157,6 +186,48 @@ class CoreUtilsTests(unittest.TestCase):
         self.assertEqual(obj.REQUEST.RESPONSE.getHeader('Last-Modified'),
                          _FILE_RFC_DATE)
 
+    def test__getModTime(self):
+        import os
+        import tempfile
+
+        from .. import utils
+        from ..utils import _clearStatCache
+        from ..utils import _getModTime
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(_clearStatCache)
+        os.utime(path, (1000, 1000))
+        self.assertEqual(_getModTime(path), 1000)
+        os.utime(path, (2000, 2000))
+        self.assertEqual(_getModTime(path), 1000)
+        _clearStatCache()
+        self.assertEqual(_getModTime(path), 2000)
+        os.remove(path)
+        self.assertEqual(_getModTime(path), 2000)
+
+        old_ttl = utils.STAT_CACHE_TTL
+        utils.STAT_CACHE_TTL = 0
+        self.addCleanup(setattr, utils, 'STAT_CACHE_TTL', old_ttl)
+        _clearStatCache()
+        self.assertEqual(_getModTime(path), 0.0)
+        self.assertEqual(utils._stat_cache, {})
+
+    def test__getStatCacheTTL(self):
+        import os
+        from unittest import mock
+
+        from ..utils import STAT_CACHE_ENV_KEY
+        from ..utils import _getStatCacheTTL
+
+        with mock.patch.dict(os.environ, {STAT_CACHE_ENV_KEY: ''}):
+            self.assertEqual(_getStatCacheTTL(), 1.0)
+        with mock.patch.dict(os.environ, {STAT_CACHE_ENV_KEY: '0.5'}):
+            self.assertEqual(_getStatCacheTTL(), 0.5)
+        with mock.patch.dict(os.environ, {STAT_CACHE_ENV_KEY: 'one'}):
+            with self.assertLogs('CMFCore.utils', 'WARNING'):
+                self.assertEqual(_getStatCacheTTL(), 1.0)
+
 
 class CoreUtilsSecurityTests(SecurityTest):
 
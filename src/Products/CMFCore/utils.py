@@ -14,14 +14,19 @@
 """
 
 import base64
+import logging
+import os
 import re
 import sys
 from _thread import allocate_lock
 from copy import deepcopy
+from email.utils import mktime_tz
+from email.utils import parsedate_tz
 from importlib.metadata import PackageNotFoundError
 from importlib.metadata import distribution
 from os import path as os_path
 from os.path import abspath
+from time import time
 from warnings import warn
 
 from AccessControl.class_init import InitializeClass
@@ -39,7 +44,6 @@ from App.Common import package_home
 from App.ImageFile import ImageFile
 from App.special_dtml import HTMLFile
 from DateTime.DateTime import DateTime
-from DateTime.interfaces import DateTimeError
 from ExtensionClass import Base
 from OFS.misc_ import Misc_ as MiscImage
 from OFS.misc_ import misc_ as misc_images
@@ -60,6 +64,8 @@ from .exceptions import NotFound
 from .interfaces import ICachingPolicyManager
 
 
+logger = logging.getLogger('CMFCore.utils')
+
 HAS_ZSERVER = True
 try:
     dist = distribution('ZServer')
@@ -366,6 +372,57 @@ def parse_etags(text,
     return parse_etags(*(text[tl:], result))
 
 
+# Maximum number of distinct If-None-Match values remembered
+MAX_PARSED_ETAGS = 1000
+_parsed_etags = {}
+
+
+def _parseETags(text):
+    """Return the ETags listed in an If-None-Match header as a tuple.
+
+    Clients revalidating a resource tend to send the same header values
+    over and over again, so results are remembered in a bounded cache.
+    """
+    try:
+        return _parsed_etags[text]
+    except KeyError:
+        pass
+    etags = tuple(parse_etags(text))
+    if len(_parsed_etags) >= MAX_PARSED_ETAGS:
+        _parsed_etags.clear()
+    _parsed_etags[text] = etags
+    return etags
+
+
+def _parseHTTPDate(text):
+    """Return an HTTP date header value as integer seconds since the epoch.
+
+    Returns None for dates which cannot be parsed.
+    """
+    # from CMFCore/FSFile.py:
+    text = text.split(';')[0]
+    parsed = parsedate_tz(text)
+    # parsedate_tz does not validate its results; leave odd values and
+    # dates without time zone to DateTime
+    if parsed is not None and parsed[9] is not None and \
+            1 <= parsed[1] <= 12 and 1 <= parsed[2] <= 31 and \
+            parsed[3] <= 23 and parsed[4] <= 59 and parsed[5] <= 61:
+        try:
+            return int(mktime_tz(parsed))
+        except (OverflowError, ValueError):
+            pass
+    # Some proxies seem to send invalid date strings for this
+    # header. If the date string is not valid, we ignore it
+    # rather than raise an error to be generally consistent
+    # with common servers such as Apache (which can usually
+    # understand the screwy date string as a lucky side effect
+    # of the way they parse it).
+    try:
+        return int(DateTime(text).timeTime())
+    except Exception:
+        return None
+
+
 def _checkConditionalGET(obj, extra_context):
     """A conditional GET is done using one or both of the request
        headers:
@@ -421,22 +478,11 @@ def _checkConditionalGET(obj, extra_context):
         mod_time_secs = None
 
     if if_modified_since:
-        # from CMFCore/FSFile.py:
-        if_modified_since = if_modified_since.split(';')[0]
-        # Some proxies seem to send invalid date strings for this
-        # header. If the date string is not valid, we ignore it
-        # rather than raise an error to be generally consistent
-        # with common servers such as Apache (which can usually
-        # understand the screwy date string as a lucky side effect
-        # of the way they parse it).
-        try:
-            if_modified_since = int(DateTime(if_modified_since).timeTime())
-        except Exception:
-            if_modified_since = None
+        if_modified_since = _parseHTTPDate(if_modified_since)
 
     client_etags = None
     if if_none_match:
-        client_etags = parse_etags(if_none_match)
+        client_etags = _parseETags(if_none_match)
 
     if not if_modified_since and not client_etags:
         # not a conditional GET, or headers are messed up
@@ -517,6 +563,52 @@ class _ViewEmulator(Implicit):
         return self._view_name
 
 
+# Seconds for which the modification times of skin files and directories
+# are reused, to save stat calls when checking them for changes in debug
+# mode.
+STAT_CACHE_ENV_KEY = 'CMF_STAT_CACHE_TTL'
+_stat_cache = {}
+
+
+def _getStatCacheTTL():
+    value = os.environ.get(STAT_CACHE_ENV_KEY)
+    if not value:
+        return 1.0
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning('Invalid value %r for %s, using 1 second.',
+                       value, STAT_CACHE_ENV_KEY)
+        return 1.0
+
+
+STAT_CACHE_TTL = _getStatCacheTTL()
+
+
+def _getModTime(path):
+    """ Return the modification time of a file or directory.
+
+    o Returns 0.0 if the path can't be read.
+
+    o The result is shared for 'STAT_CACHE_TTL' seconds.
+    """
+    now = time()
+    cached = _stat_cache.get(path)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = 0.0
+    if STAT_CACHE_TTL > 0:
+        _stat_cache[path] = (now + STAT_CACHE_TTL, mtime)
+    return mtime
+
+
+def _clearStatCache():
+    _stat_cache.clear()
+
+
 #
 #   Base classes for tools
 #
@@ -846,19 +938,7 @@ def _OldCacheHeaders(obj):
     last_mod = int(obj.modified().timeTime())
 
     if header is not None:
-        header = header.split(';')[0]
-        # Some proxies seem to send invalid date strings for this
-        # header. If the date string is not valid, we ignore it
-        # rather than raise an error to be generally consistent
-        # with common servers such as Apache (which can usually
-        # understand the screwy date string as a lucky side effect
-        # of the way they parse it).
-        try:
-            mod_since = DateTime(header)
-            mod_since = int(mod_since.timeTime())
-        except (TypeError, DateTimeError):
-            mod_since = None
-
+        mod_since = _parseHTTPDate(header)
         if mod_since is not None:
             if last_mod > 0 and last_mod <= mod_since:
                 RESPONSE.setStatus(304)
@@ -883,19 +963,7 @@ def _FSCacheHeaders(obj):
     last_mod = int(obj._file_mod_time)
 
     if header is not None:
-        header = header.split(';')[0]
-        # Some proxies seem to send invalid date strings for this
-        # header. If the date string is not valid, we ignore it
-        # rather than raise an error to be generally consistent
-        # with common servers such as Apache (which can usually
-        # understand the screwy date string as a lucky side effect
-        # of the way they parse it).
-        try:
-            mod_since = DateTime(header)
-            mod_since = int(mod_since.timeTime())
-        except (TypeError, DateTimeError):
-            mod_since = None
-
+        mod_since = _parseHTTPDate(header)
         if mod_since is not None:
             if last_mod > 0 and last_mod <= mod_since:
                 RESPONSE.setStatus(304)